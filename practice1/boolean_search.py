@@ -1,17 +1,44 @@
+import heapq
+from bisect import bisect_left
+from itertools import islice
+
 from indexer import InvertedIndex
+from query_planner import Planner, parse_query, tokenize
+
+
+def gallop(sorted_list, target, low=0):
+    """
+    Première position >= low de sorted_list dont l'élément est >= target.
+    Recherche exponentielle (sauts de 1, 2, 4, ... depuis low) puis dichotomique :
+    O(log d) comparaisons pour une distance d, au lieu de parcourir les d éléments.
+    """
+    step = 1
+    high = low
+    while high < len(sorted_list) and sorted_list[high] < target:
+        low = high + 1
+        high += step
+        step *= 2
+    return bisect_left(sorted_list, target, low, min(high, len(sorted_list)))
 
 
 class BooleanSearch:
     def __init__(self, index: InvertedIndex):
         self.index = index
 
+    def _postings(self, term):
+        """Liste triée partagée de l'index pour un terme, sans copie : à ne pas modifier"""
+        term = term.lower()
+        if term in self.index.dictionary:
+            return self.index.sorted_postings[term]
+        return []
+
     @staticmethod
     def AND(list1_of_doc, list2_of_doc):
         """Trouve les documents qui contiennent les DEUX mots"""
         # Cette méthode est "static" car elle n'a pas besoin des données de l'instance.
         # Elle prend juste 2 listes et retourne leur intersection
         # Exemple : "chien AND chat" → documents avec chien ET chat en meme temps.
-        return sorted(list(set(list1_of_doc) & set(list2_of_doc))) # set pour enlever les doublons
+        return BooleanSearch.intersect([list1_of_doc, list2_of_doc])
 
     @staticmethod
     def OR(list1_of_doc, list2_of_doc):
@@ -19,81 +46,130 @@ class BooleanSearch:
         # Cette méthode est "static" car elle n'a pas besoin des données de l'instance.
         # Elle prend juste deux listes et retourne leur union
         # Exemple : "chien OR chat" → documents avec chien OU chat.
-        return sorted(list(set(list1_of_doc) | set(list2_of_doc))) # set pour enlever les doublons
+        return BooleanSearch.union([list1_of_doc, list2_of_doc])
 
     def NOT(self, list1_of_doc):
         """Trouve les documents qui NE CONTIENNENT PAS le mot"""
         # Cette méthode n'est PAS static car elle a besoin de connaître tous les documents
-        # Utilise self.index.doc_ids pour savoir quels documents existent
+        # Utilise self.index.sorted_doc_ids pour savoir quels documents existent
         # Exemple : "NOT chien" → tous les documents SAUF ceux avec "chien".
-        all_docs = set(self.index.doc_ids)    # set pour enlever les doublons
-        return sorted(list(all_docs - set(list1_of_doc)))
+        return list(self.complement(list1_of_doc))
+
+    def complement(self, list_of_doc):
+        """
+        Itérateur paresseux sur les documents absents de list_of_doc (triée) : on parcourt
+        les trous entre deux documents de la liste, repérés par gallop dans sorted_doc_ids.
+        Rien n'est alloué en proportion de la collection : les premiers résultats d'un
+        NOT arrivent sans construire l'ensemble des documents.
+        """
+        all_docs = self.index.sorted_doc_ids
+        start = 0
+        for doc_id in list_of_doc:
+            position = gallop(all_docs, doc_id, start)
+            for i in range(start, position):
+                yield all_docs[i]
+            start = position + 1 if position < len(all_docs) and all_docs[position] == doc_id else position
+        for i in range(start, len(all_docs)):
+            yield all_docs[i]
 
     def AND_NOT(self, list1_of_doc, list2_of_doc):
         """Trouve les documents avec le premier mot MAIS SANS le deuxième"""
         # Combine AND et NOT
         # Exemple : "chien AND NOT chat" → documents avec chien, mais pas chat
-        return self.AND(list1_of_doc, self.NOT(list2_of_doc))
+        # Différence directe : le complément de list2_of_doc n'est jamais construit
+        return self.difference(list1_of_doc, list2_of_doc)
 
-    def parse_boolean_query(self, query):
-        """Comprend une requête de l'utilisateur et trouve les documents"""
-        # Transforme la requête en mots : par exemple : "Citizen and Kane" → ['citizen', 'and', 'kane']
-        tokens = query.lower().split()
-        result = []  # Liste des documents trouvés
-        i = 0
-
-        while i < len(tokens):
-            # Ignore les mots 'and', 'or' (C'est pour dire qu'on les utilise comme des séparateurs pour combiner deux mots donc on ne doit pas les cherchés dans la liste des mots)
-            if tokens[i] in ['and', 'or']:
-                i += 1
-                continue
-
-            # Si on trouve "NOT", on cherche les documents SANS le mot suivant
-            if tokens[i] == 'not':
-                if i + 1 < len(tokens):
-                    term = tokens[i + 1]
-                    postings = self.index.get_postings(term)
-                    if not result:
-                        result = self.NOT(postings)
-                    else:
-                        result = self.AND(result, self.NOT(postings))
-                    i += 2  # Saute "not" et le terme
-                continue
-
-            # Pour un mot normal
-            term = tokens[i]
-            postings = self.index.get_postings(term)
-
-            # Premier mot de la requête
-            if not result:
-                result = postings
+    @staticmethod
+    def difference(list1_of_doc, list2_of_doc):
+        """Documents de list1_of_doc absents de list2_of_doc (deux listes triées)"""
+        return BooleanSearch.subtract(list1_of_doc, [list2_of_doc])
+
+    @staticmethod
+    def intersect(lists):
+        """
+        Intersection de n listes triées en une passe : chaque document de la plus courte
+        est cherché (gallop) dans les autres, le coût suit la liste la plus rare même si
+        les autres termes sont très fréquents.
+        """
+        lists = sorted(lists, key=len)
+        shortest, others = lists[0], lists[1:]
+        positions = [0] * len(others)
+        result = []
+        for doc_id in shortest:
+            for k, other in enumerate(others):
+                positions[k] = gallop(other, doc_id, positions[k])
+                if positions[k] == len(other):
+                    return result
+                if other[positions[k]] != doc_id:
+                    break
             else:
-                # Regarde l'opérateur avant ce mot
-                if i > 0 and tokens[i - 1] == 'or':
-                    result = self.OR(result, postings)
-                elif i > 0 and tokens[i - 1] == 'and not':
-                    result = self.AND_NOT(result, postings)
-                else:  # AND par défaut
-                    result = self.AND(result, postings)
-            i += 1
+                result.append(doc_id)
+        return result
+
+    @staticmethod
+    def union(lists):
+        """Fusion linéaire de n listes triées (un document commun n'est gardé qu'une fois)"""
+        result = []
+        for doc_id in heapq.merge(*lists):
+            if not result or result[-1] != doc_id:
+                result.append(doc_id)
+        return result
 
+    @staticmethod
+    def subtract(list_of_doc, excluded_lists):
+        """Documents de list_of_doc (triée) absents de toutes les listes triées excluded_lists"""
+        positions = [0] * len(excluded_lists)
+        result = []
+        for doc_id in list_of_doc:
+            for k, excluded in enumerate(excluded_lists):
+                positions[k] = gallop(excluded, doc_id, positions[k])
+                if positions[k] < len(excluded) and excluded[positions[k]] == doc_id:
+                    break
+            else:
+                result.append(doc_id)
         return result
 
+    def compile(self, query):
+        """
+        Compile la requête en plan d'exécution (voir query_planner) : priorité
+        NOT > AND > OR, parenthèses, AND rangés par df croissant, NOT en différences
+        """
+        return Planner(self.index).compile(parse_query(query))
+
+    def explain(self, query):
+        """Affiche (et renvoie) le plan choisi pour la requête avec ses coûts estimés"""
+        plan = "\n".join(self.compile(query).lines())
+        print(plan)
+        return plan
+
+    def parse_boolean_query(self, query):
+        """Comprend une requête de l'utilisateur et trouve les documents"""
+        # Par exemple : "citizen and (kane or not casablanca)" → arbre → plan → liste triée des documents
+        return list(self.compile(query).evaluate(self))
+
+    def iter_boolean_query(self, query):
+        """Documents de la requête dans l'ordre, produits à la demande (un NOT reste paresseux)"""
+        return self.compile(query).iterate(self)
+
+    def get_page(self, query, page=1, page_size=10):
+        """Page de résultats d'une requête (numérotée à partir de 1), sans calculer les suivantes"""
+        return list(islice(self.iter_boolean_query(query), (page - 1) * page_size, page * page_size))
+
     def print_query_results(self, queries):
         """Affiche les résultats de plusieurs requêtes"""
         for i, q in enumerate(queries, 1):
             print(f"\n{i}. {q}")
-            tokens = q.split()
+            tokens = tokenize(q)
 
             # Cas particulier : requêtes avec "NOT" seul (ex: "NOT citizen")
-            if tokens[0].lower() == "not":
+            if tokens[0] == "not":
                 term = tokens[1]
                 print(f"\t{term} => :", self.index.get_postings(term))
                 print(f"\tTous les documents => :", self.index.doc_ids)
             else:
                 # Affiche les postings pour chaque terme (sauf les opérateurs)
                 for token in tokens:
-                    if token.lower() not in ["and", "or", "not"]:
+                    if token not in ["and", "or", "not", "(", ")"]:
                         print(f"\t{token} => :", self.index.get_postings(token))
 
             # Exécute la requête et affiche le résultat
@@ -104,14 +180,14 @@ class BooleanSearch:
         """Affiche les résultats d'une requête"""
         print(f"\n{num}. {query}" if num else f"\nq{query}")
 
-        tokens = query.split()
-        if tokens[0].lower() == "not":
+        tokens = tokenize(query)
+        if tokens[0] == "not":
             term = tokens[1]
             print(f"\t{term} => :", self.index.get_postings(term))
             print(f"\tTous les documents => :", self.index.doc_ids)
         else:
             for token in tokens:
-                if token.lower() not in ["and", "or", "not"]:
+                if token not in ["and", "or", "not", "(", ")"]:
                     print(f"\t{token} => :", self.index.get_postings(token))
 
         result = self.parse_boolean_query(query)
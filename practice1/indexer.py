@@ -1,4 +1,5 @@
 import re # for regex operations
+from bisect import bisect_left, insort # for keeping lists sorted
 from collections import defaultdict, Counter # for dictionary and counting
 import string
 
@@ -8,6 +9,10 @@ class InvertedIndex:
         self.dictionary = defaultdict(dict)  
         # Liste de tous les identifiants de documents
         self.doc_ids = []                   
+        # Postings triés, tenus à jour à l'indexation : term -> [doc_id, ...] (pour BooleanSearch)
+        self.sorted_postings = defaultdict(list)
+        # Tous les identifiants de documents, triés (pour NOT)
+        self.sorted_doc_ids = []
 
     def preprocess_text(self, text):
         """Traitement basique du texte"""
@@ -27,9 +32,16 @@ class InvertedIndex:
         tokens = self.preprocess_text(text)
         # Compter les fréquences des termes
         term_freq = Counter(tokens)
+        # Tenir à jour les identifiants triés (pour NOT), sans doublon si le document est ré-ajouté
+        position = bisect_left(self.sorted_doc_ids, doc_id)
+        if position == len(self.sorted_doc_ids) or self.sorted_doc_ids[position] != doc_id:
+            self.sorted_doc_ids.insert(position, doc_id)
         
         # Mettre à jour le dictionnaire
         for term, freq in term_freq.items():
+            if doc_id not in self.dictionary[term]:
+                # insort : recherche dichotomique puis insertion (un ajout en fin si les docnos arrivent triés)
+                insort(self.sorted_postings[term], doc_id)
             self.dictionary[term][doc_id] = freq
     
     def build_from_file(self, filename):
@@ -70,10 +82,10 @@ class InvertedIndex:
                     print(f"    {doc_id}")
     
     def get_postings(self, term):
-        """Récupérer la liste de postings pour un terme"""
+        """Récupérer la liste de postings (triée) pour un terme (copie)"""
         term = term.lower()
         if term in self.dictionary:
-            return sorted(self.dictionary[term].keys())
+            return list(self.sorted_postings[term])
         return []
     
     def get_document_frequency(self, term):
@@ -49,5 +49,11 @@ def main():
     search.print_query(q5, 5)
     search.print_query(q6, 6)
 
+    # Requête avec parenthèses : plan d'exécution choisi (AND par df croissant, NOT en différence)
+    q7 = "the and not (godfather or wizard)"
+    search.print_query(q7, 7)
+    print("\n=== PLAN D'EXÉCUTION ===")
+    search.explain(q7)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
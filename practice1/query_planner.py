@@ -0,0 +1,339 @@
+"""
+Compilation des requêtes booléennes : texte -> arbre syntaxique -> plan d'exécution.
+
+Grammaire (priorité NOT > AND > OR, AND implicite entre deux opérandes) :
+    requête  := ou
+    ou       := et ('or' et)*
+    et       := non (['and'] non)*
+    non      := 'not' non | primaire
+    primaire := '(' ou ')' | terme
+
+Le plan est construit à partir des df de l'index :
+    - les AND et OR imbriqués sont aplatis et évalués en une fois (n listes)
+    - les opérandes d'un AND sont rangés par df croissant : l'intersection part de la
+      liste la plus courte et saute (gallop) dans les autres
+    - les NOT d'un AND deviennent des différences (AND-NOT) : le complément n'est
+      construit que pour un NOT sans opérande positif (NOT a AND NOT b = NOT (a OR b)),
+      et il est parcouru paresseusement (trous entre les documents de l'opérande)
+    - dans un AND, un opérande composé (OR, NOT, AND imbriqué) est sondé pour les seuls
+      candidats restants quand c'est moins coûteux que de le calculer entièrement
+Les coûts estimés comptent les postings lus (ou sautés, en log) par chaque opérateur.
+"""
+
+import math
+import re
+
+
+TOKEN_PATTERN = re.compile(r'[()]|[^\s()]+')
+OPERATORS = ('and', 'or', 'not')
+
+
+def tokenize(query):
+    """Découpe la requête en termes, opérateurs et parenthèses (en minuscules)"""
+    return TOKEN_PATTERN.findall(query.lower())
+
+
+class Term:
+    def __init__(self, term):
+        self.term = term
+
+
+class Not:
+    def __init__(self, child):
+        self.child = child
+
+
+class And:
+    def __init__(self, children):
+        self.children = children
+
+
+class Or:
+    def __init__(self, children):
+        self.children = children
+
+
+class Parser:
+    """Analyse descendante récursive d'une requête booléenne en arbre (Term, Not, And, Or)"""
+
+    def __init__(self, query):
+        self.query = query
+        self.tokens = tokenize(query)
+        self.position = 0
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _next(self):
+        token = self._peek()
+        self.position += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise ValueError(f"Requête vide : '{self.query}'")
+        node = self._or()
+        if self._peek() is not None:
+            raise ValueError(f"Symbole inattendu dans la requête '{self.query}' : {self._peek()}")
+        return node
+
+    def _or(self):
+        children = [self._and()]
+        while self._peek() == 'or':
+            self._next()
+            children.append(self._and())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def _and(self):
+        children = [self._not()]
+        while self._peek() not in (None, 'or', ')'):
+            if self._peek() == 'and':
+                self._next()
+            children.append(self._not())
+        return children[0] if len(children) == 1 else And(children)
+
+    def _not(self):
+        if self._peek() == 'not':
+            self._next()
+            return Not(self._not())
+        return self._primary()
+
+    def _primary(self):
+        token = self._next()
+        if token is None:
+            raise ValueError(f"Requête incomplète : '{self.query}'")
+        if token == '(':
+            node = self._or()
+            if self._next() != ')':
+                raise ValueError(f"Parenthèse fermante manquante : '{self.query}'")
+            return node
+        if token == ')' or token in OPERATORS:
+            raise ValueError(f"Terme attendu dans la requête '{self.query}' : {token}")
+        return Term(token)
+
+
+def parse_query(query):
+    """Arbre syntaxique d'une requête booléenne"""
+    return Parser(query).parse()
+
+
+def _gallop_cost(short, long):
+    """Comparaisons d'une recherche galopante de short éléments dans une liste de long éléments"""
+    return short * math.log2(1 + long / short) if short else 0.0
+
+
+class TermPlan:
+    """Postings triés d'un terme"""
+
+    def __init__(self, term, df):
+        self.term = term
+        self.size = df
+        self.cost = 0.0
+
+    def evaluate(self, search):
+        return search._postings(self.term)
+
+    def iterate(self, search):
+        return iter(self.evaluate(search))
+
+    def probe_cost(self, candidates):
+        return _gallop_cost(min(candidates, self.size), max(candidates, self.size))
+
+    def filter(self, search, candidates):
+        """Candidats (liste triée) présents dans le résultat du plan"""
+        return search.intersect([candidates, self.evaluate(search)])
+
+    def lines(self):
+        return [f"{self.term}  (df {self.size})"]
+
+
+class IntersectPlan:
+    """
+    AND n-aire : la liste la plus courte (driver) est intersectée en une passe avec les
+    listes des termes, puis filtrée par les autres opérandes (OR, NOT, ...) et privée des
+    documents exclus. Un opérande composé est soit sondé (ses listes ne sont parcourues
+    que pour les candidats restants), soit calculé puis fusionné : le moins coûteux des deux.
+    """
+
+    def __init__(self, included, excluded):
+        included = sorted(included, key=lambda plan: plan.size)
+        self.driver = included[0]
+        self.terms = [plan for plan in included[1:] if isinstance(plan, TermPlan)]
+        self.excluded_terms = [plan for plan in excluded if isinstance(plan, TermPlan)]
+        cost = self.driver.cost + self.driver.size
+        candidates = self.driver.size
+        for plan in self.terms:
+            cost += _gallop_cost(candidates, plan.size)
+            candidates = min(candidates, plan.size)
+
+        # Opérandes composés, les plus sélectifs d'abord
+        self.filters = []  # (plan, sondé ?)
+        for plan in sorted((plan for plan in included[1:] if not isinstance(plan, TermPlan)),
+                           key=lambda plan: plan.size):
+            probe = plan.probe_cost(candidates) < plan.cost + plan.size
+            cost += plan.probe_cost(candidates) if probe else plan.cost + plan.size + candidates
+            self.filters.append((plan, probe))
+            candidates = min(candidates, plan.size)
+        self.size = candidates
+
+        cost += sum(_gallop_cost(candidates, plan.size) for plan in self.excluded_terms)
+        self.excluded_filters = []
+        for plan in sorted((plan for plan in excluded if not isinstance(plan, TermPlan)), key=lambda plan: plan.size):
+            probe = plan.probe_cost(candidates) < plan.cost + plan.size
+            cost += plan.probe_cost(candidates) if probe else plan.cost + plan.size + candidates
+            self.excluded_filters.append((plan, probe))
+        self.cost = cost
+
+    def evaluate(self, search):
+        result = self.driver.evaluate(search)
+        if self.terms:
+            result = search.intersect([result] + [plan.evaluate(search) for plan in self.terms])
+        for plan, probe in self.filters:
+            if not result:
+                return result
+            result = plan.filter(search, result) if probe else search.intersect([result, plan.evaluate(search)])
+        if result and self.excluded_terms:
+            result = search.subtract(result, [plan.evaluate(search) for plan in self.excluded_terms])
+        for plan, probe in self.excluded_filters:
+            if not result:
+                return result
+            result = search.subtract(result, [plan.filter(search, result) if probe else plan.evaluate(search)])
+        return result
+
+    def operands(self):
+        return [self.driver] + self.terms + [plan for plan, _ in self.filters]
+
+    def excluded(self):
+        return self.excluded_terms + [plan for plan, _ in self.excluded_filters]
+
+    def iterate(self, search):
+        return iter(self.evaluate(search))
+
+    def probe_cost(self, candidates):
+        return sum(plan.probe_cost(candidates) for plan in self.operands() + self.excluded())
+
+    def filter(self, search, candidates):
+        for plan in self.operands():
+            candidates = plan.filter(search, candidates)
+        for plan in self.excluded():
+            candidates = search.subtract(candidates, [plan.filter(search, candidates)])
+        return candidates
+
+    def lines(self):
+        name = "AND-NOT" if self.excluded() else "AND"
+        lines = [f"{name}  (≤ {self.size} docs, coût ≈ {self.cost:.0f})"]
+        modes = {id(plan): "sondé" if probe else "fusionné" for plan, probe in self.filters + self.excluded_filters}
+        for plan in self.operands():
+            lines.extend(_indent(plan, modes.get(id(plan))))
+        for plan in self.excluded():
+            lines.append("  - sauf")
+            lines.extend("  " + line for line in _indent(plan, modes.get(id(plan))))
+        return lines
+
+
+class UnionPlan:
+    """OR n-aire : fusion des listes en une passe"""
+
+    def __init__(self, children, doc_count):
+        self.children = children
+        self.size = min(doc_count, sum(plan.size for plan in children))
+        self.cost = sum(plan.cost + plan.size for plan in children)
+
+    def evaluate(self, search):
+        return search.union([plan.evaluate(search) for plan in self.children])
+
+    def iterate(self, search):
+        return iter(self.evaluate(search))
+
+    def probe_cost(self, candidates):
+        return sum(plan.probe_cost(candidates) for plan in self.children) + candidates
+
+    def filter(self, search, candidates):
+        return search.union([plan.filter(search, candidates) for plan in self.children])
+
+    def lines(self):
+        lines = [f"OR  (≤ {self.size} docs, coût ≈ {self.cost:.0f})"]
+        for plan in self.children:
+            lines.extend(_indent(plan))
+        return lines
+
+
+class ComplementPlan:
+    """Tous les documents sauf ceux de la liste"""
+
+    def __init__(self, child, doc_count):
+        self.child = child
+        self.size = doc_count - child.size if isinstance(child, TermPlan) else doc_count
+        self.cost = child.cost + doc_count
+
+    def evaluate(self, search):
+        return search.NOT(self.child.evaluate(search))
+
+    def iterate(self, search):
+        """Complément paresseux : seule la liste de l'opérande est calculée"""
+        return search.complement(self.child.evaluate(search))
+
+    def probe_cost(self, candidates):
+        return self.child.probe_cost(candidates) + candidates
+
+    def filter(self, search, candidates):
+        return search.subtract(candidates, [self.child.filter(search, candidates)])
+
+    def lines(self):
+        lines = [f"NOT  (≤ {self.size} docs, coût ≈ {self.cost:.0f})"]
+        lines.extend(_indent(self.child))
+        return lines
+
+
+def _indent(plan, mode=None):
+    """Lignes d'un sous-plan décalées, avec son mode d'évaluation dans un AND"""
+    lines = plan.lines()
+    if mode:
+        lines[0] += f"  [{mode}]"
+    return ["  " + line for line in lines]
+
+
+class Planner:
+    """Compile un arbre syntaxique en plan, à partir des df de l'index"""
+
+    def __init__(self, index):
+        self.index = index
+        self.doc_count = len(index.sorted_doc_ids)
+
+    def compile(self, node):
+        if isinstance(node, Term):
+            return TermPlan(node.term, self.index.get_document_frequency(node.term))
+        if isinstance(node, Not):
+            if isinstance(node.child, Not):
+                return self.compile(node.child.child)  # NOT NOT a = a
+            return ComplementPlan(self.compile(node.child), self.doc_count)
+        if isinstance(node, Or):
+            children = self._flatten(node, Or)
+            if all(isinstance(child, Not) for child in children):
+                # NOT a OR NOT b = NOT (a AND b) : un seul complément, paresseux
+                return self.compile(Not(And([child.child for child in children])))
+            return UnionPlan([self.compile(child) for child in children], self.doc_count)
+
+        included, excluded = [], []
+        for child in self._flatten(node, And):
+            if isinstance(child, Not):
+                excluded.append(child.child)
+            else:
+                included.append(child)
+        if not included:
+            # NOT a AND NOT b = NOT (a OR b) : un seul complément
+            child = excluded[0] if len(excluded) == 1 else Or(excluded)
+            return self.compile(Not(child))
+        return IntersectPlan([self.compile(child) for child in included],
+                             [self.compile(child) for child in excluded])
+
+    @staticmethod
+    def _flatten(node, kind):
+        """Opérandes d'un AND (ou OR) en aplatissant les AND (ou OR) imbriqués"""
+        children = []
+        for child in node.children:
+            if isinstance(child, kind):
+                children.extend(Planner._flatten(child, kind))
+            else:
+                children.append(child)
+        return children
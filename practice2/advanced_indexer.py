@@ -1,8 +1,10 @@
 import re
-from collections import defaultdict, Counter
+from collections import defaultdict, deque, Counter
 import gzip
+import multiprocessing
+import os
 import time
-from porterstemmer import PorterStemmer
+from porterstemmer import stem_word
 
 class AdvancedInvertedIndex:
     def __init__(self):
@@ -20,7 +22,7 @@ class AdvancedInvertedIndex:
         self.stop_word_active = False
         self.stemmer_active = False
         self.stop_words_set = set()
-        self.stemmer = PorterStemmer()
+        self.stemmer = stem_word  # fonction sans état (et avec cache), utilisable depuis plusieurs workers
     
     def reset(self):
         """Réinitialise complètement l'index"""
@@ -62,7 +64,7 @@ class AdvancedInvertedIndex:
         
         # Appliquer le stemming si activé
         if self.stemmer_active:
-            tokens = [self.stemmer.stem(token, 0, len(token)-1) for token in tokens]
+            tokens = [self.stemmer(token) for token in tokens]
         
         return tokens
     
@@ -79,8 +81,82 @@ class AdvancedInvertedIndex:
             print(f"- Erreur lecture {filename}: {e}")
             return None
     
-    def build_index(self, filename, is_zipped=True, verbose=False):
-        """Construit l'index depuis un fichier - STYLE UNIFIÉ"""
+    def add_document(self, doc_id, doc_text):
+        """Ajoute un document à l'index"""
+        doc_id = doc_id.strip()
+        doc_text = doc_text.strip()
+        
+        # Tokenisation simple
+        tokens = self.simple_tokenize(doc_text)
+        
+        # Traitement des tokens (stop words si TRUE, stemming si TRUE)
+        terms = self.process_tokens(tokens)
+        
+        # Mise à jour des statistiques
+        doc_length = len(terms)
+        self.doc_ids.append(doc_id)
+        self.doc_lengths[doc_id] = doc_length
+        self.total_tokens += doc_length
+        self.total_chars += sum(len(term) for term in terms)
+        self.total_documents += 1
+        
+        # Construction du dictionnaire inversé
+        term_freq = Counter(terms)
+        for term, freq in term_freq.items():
+            self.dictionary[term][doc_id] = freq
+    
+    def add_documents(self, documents):
+        """
+        Ajoute des documents (couples (doc_id, texte)) à l'index existant sans le reconstruire.
+        Les statistiques globales sont des compteurs : le coût ne dépend que du lot ajouté.
+        Renvoie le nombre de documents ajoutés.
+        """
+        count = 0
+        for doc_id, doc_text in documents:
+            self.add_document(doc_id, doc_text)
+            count += 1
+        return count
+    
+    def add_documents_parallel(self, documents, workers=None, batch_size=200):
+        """
+        Comme add_documents, mais l'analyse et l'inversion des lots de batch_size documents
+        sont réparties sur un pool de workers processus ; les index partiels sont fusionnés
+        dans l'ordre des lots, le résultat est identique à celui de add_documents.
+        Renvoie le nombre de documents ajoutés.
+        """
+        workers = workers or os.cpu_count() or 1
+        options = (self.stop_words_set if self.stop_word_active else set(),
+                   self.stemmer if self.stemmer_active else None)
+        count = 0
+        with multiprocessing.Pool(workers, _init_worker, options) as pool:
+            # Au plus deux lots en attente par worker : la mémoire reste bornée
+            for shard in _ordered_results(pool, _invert_batch, _split_batches(documents, batch_size), 2 * workers):
+                count += self._merge_shard(shard)
+        return count
+    
+    def _merge_shard(self, shard):
+        """Ajoute à l'index un index partiel renvoyé par _invert_batch, renvoie son nombre de documents"""
+        doc_ids, doc_lengths, dictionary, total_tokens, total_chars = shard
+        self.doc_ids.extend(doc_ids)
+        self.doc_lengths.update(doc_lengths)
+        self.total_tokens += total_tokens
+        self.total_chars += total_chars
+        self.total_documents += len(doc_ids)
+        for term, postings in dictionary.items():
+            self.dictionary[term].update(postings)
+        return len(doc_ids)
+    
+    def add_file(self, filename, is_zipped=True):
+        """Ajoute les documents d'un fichier à l'index existant, renvoie le nombre de documents ajoutés"""
+        content = self.read_file(filename, is_zipped)
+        if content is None:
+            return 0
+        
+        doc_pattern = r'<doc><docno>([^<]+)</docno>(.*?)</doc>'
+        return self.add_documents(re.findall(doc_pattern, content, re.DOTALL))
+    
+    def build_index(self, filename, is_zipped=True, verbose=False, workers=1):
+        """Construit l'index depuis un fichier - STYLE UNIFIÉ (en parallèle si workers > 1)"""
         #start_time = time.time()
         
         content = self.read_file(filename, is_zipped)
@@ -96,28 +172,10 @@ class AdvancedInvertedIndex:
         
         start_time = time.time()
         # Indexation de chaque document
-        for doc_id, doc_text in matches:
-            doc_id = doc_id.strip()
-            doc_text = doc_text.strip()
-            
-            # Tokenisation simple
-            tokens = self.simple_tokenize(doc_text)
-            
-            # Traitement des tokens (stop words si TRUE, stemming si TRUE)
-            terms = self.process_tokens(tokens)
-            
-            # Mise à jour des statistiques
-            doc_length = len(terms)
-            self.doc_ids.append(doc_id)
-            self.doc_lengths[doc_id] = doc_length
-            self.total_tokens += doc_length
-            self.total_chars += sum(len(term) for term in terms)
-            self.total_documents += 1
-            
-            # Construction du dictionnaire inversé
-            term_freq = Counter(terms)
-            for term, freq in term_freq.items():
-                self.dictionary[term][doc_id] = freq
+        if workers == 1:
+            self.add_documents(matches)
+        else:
+            self.add_documents_parallel(matches, workers)
         
         indexing_time = time.time() - start_time
         
@@ -147,4 +205,50 @@ class AdvancedInvertedIndex:
             'vocabulary_size': vocabulary_size,
             'total_documents': self.total_documents,
             'total_tokens': self.total_tokens
-        }
\ No newline at end of file
+        }
+
+
+# Options des index partiels d'un worker (fixées par _init_worker)
+_worker_options = None
+
+
+def _init_worker(stop_words, stemmer):
+    """Initialisation d'un worker de add_documents_parallel"""
+    global _worker_options
+    _worker_options = (stop_words, stemmer)
+
+
+def _split_batches(documents, batch_size):
+    """Découpe le flux de documents en lots de batch_size documents"""
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _ordered_results(pool, function, tasks, window):
+    """Comme pool.imap, mais sans lire plus de window tâches en avance"""
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.apply_async(function, (task,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def _invert_batch(documents):
+    """Index partiel d'un lot : (doc_ids, doc_lengths, dictionary, total_tokens, total_chars)"""
+    stop_words, stemmer = _worker_options
+    shard = AdvancedInvertedIndex()
+    shard.stop_word_active = bool(stop_words)
+    shard.stop_words_set = stop_words
+    if stemmer is not None:
+        shard.stemmer_active = True
+        shard.stemmer = stemmer
+    shard.add_documents(documents)
+    return shard.doc_ids, shard.doc_lengths, dict(shard.dictionary), shard.total_tokens, shard.total_chars
@@ -1,4 +1,5 @@
 import os
+import time
 import matplotlib.pyplot as plt
 from advanced_indexer import AdvancedInvertedIndex
 
@@ -32,8 +33,13 @@ class StatsAnalyzer:
         
         return collections
     
-    def run_indexation_experiment(self, config_name, stop_words=False, stemming=False, use_all_files=True):
-        """Exécute l'indexation avec une configuration spécifique"""
+    def run_indexation_experiment(self, config_name, stop_words=False, stemming=False, use_all_files=True,
+                                  incremental=False):
+        """
+        Exécute l'indexation avec une configuration spécifique.
+        incremental=True : chaque fichier est ajouté à l'index des fichiers précédents
+        (statistiques de la collection cumulée, sans réindexer les fichiers déjà vus).
+        """
         print(f"\nConfiguration: {config_name}")
         
         results = []
@@ -53,8 +59,14 @@ class StatsAnalyzer:
             if not os.path.exists(filename):
                 continue
             
-            # On construit l'index
-            indexing_time = index.build_index(filename, is_zipped=True, verbose=False)
+            # On construit l'index (ou on l'étend avec le nouveau fichier)
+            if incremental:
+                start_time = time.time()
+                if index.add_file(filename, is_zipped=True) == 0:
+                    continue
+                indexing_time = time.time() - start_time
+            else:
+                indexing_time = index.build_index(filename, is_zipped=True, verbose=False)
             
             if indexing_time is None:
                 continue
@@ -73,6 +85,8 @@ class StatsAnalyzer:
                   f"{stats['total_tokens']} tokens, indexé en {indexing_time:.2f}s")
             
             # Réinitialiser pour le fichier suivant
+            if incremental:
+                continue
             index.reset()
             if stop_words:
                 index.stop_word_active = True
@@ -2,9 +2,13 @@ import re
 from collections import defaultdict, Counter
 import gzip
 import time
-from porterstemmer import PorterStemmer
+from porterstemmer import stem_word
 
 
+# Motif d'un document de la collection : <doc><docno>...</docno>...</doc>
+DOC_PATTERN = re.compile(r'<doc><docno>([^<]+)</docno>(.*?)</doc>', re.DOTALL)
+DOC_END = '</doc>'
+
 class WeightedInvertedIndex:
     def __init__(self):
         self.dictionary = defaultdict(dict)  # term -> {doc_id: tf}
@@ -19,7 +23,7 @@ class WeightedInvertedIndex:
 
         # Options
         self.stop_words_set = set()
-        self.stemmer = PorterStemmer()
+        self.stemmer = stem_word  # fonction sans état (et avec cache)
         self.stop_word_active = False
         self.stemmer_active = False
 
@@ -61,7 +65,7 @@ class WeightedInvertedIndex:
 
         # stemming
         if self.stemmer_active:
-            tokens = [self.stemmer.stem(token, 0, len(token) - 1) for token in tokens]
+            tokens = [self.stemmer(token) for token in tokens]
 
         return tokens
 
@@ -80,20 +84,53 @@ class WeightedInvertedIndex:
 
         return content
 
+    def read_documents(self, filename, is_zipped, chunk_size=1 << 20):
+        """
+        Lecture en flux des documents d'un fichier zippé ou non.
+        Le fichier est lu par blocs de chunk_size caractères : un document coupé
+        entre deux blocs reste dans le tampon jusqu'à ce que sa balise </doc> arrive.
+        La mémoire est donc bornée par le plus gros document, pas par la collection.
+        Renvoie un générateur de couples (docno, texte).
+        """
+        if is_zipped:
+            opener = lambda: gzip.open(filename, 'rt', encoding='utf-8', errors='ignore')
+        else:
+            opener = lambda: open(filename, 'r', encoding='utf-8', errors='ignore')
+
+        try:
+            with opener() as file:
+                buffer = ""
+                while True:
+                    chunk = file.read(chunk_size)
+                    if not chunk:
+                        break
+
+                    # On ne relance la regex que si le bloc peut fermer un document
+                    # (la balise </doc> peut elle-même être coupée entre deux blocs)
+                    search_from = max(0, len(buffer) - len(DOC_END) + 1)
+                    buffer += chunk
+                    if buffer.find(DOC_END, search_from) == -1:
+                        continue
+
+                    # Un document complet trouvé dans le tampon est définitif :
+                    # la regex non gourmande s'arrête au premier </doc>
+                    last_end = 0
+                    for match in DOC_PATTERN.finditer(buffer):
+                        yield match.group(1), match.group(2)
+                        last_end = match.end()
+
+                    # On garde seulement la partie non consommée
+                    buffer = buffer[last_end:]
+        except OSError as e:
+            print(f"- Erreur lecture: {e}")
+
     def build_index(self, filename, is_zipped=False):
         """Construit l'index depuis le fichier"""
         start_time = time.time()
 
-        print(f"Lecture de {filename}...")
-        content = self.read_file(filename, is_zipped)
-
-        # Extraction des documents
-        doc_pattern = r'<doc><docno>([^<]+)</docno>(.*?)</doc>'
-        matches = re.findall(doc_pattern, content, re.DOTALL)
-
-        print(f"Indexation de {len(matches)} documents...")
+        print(f"Lecture en flux de {filename}...")
 
-        for doc_id, doc_text in matches:
+        for doc_id, doc_text in self.read_documents(filename, is_zipped):
             doc_id = doc_id.strip()
             doc_text = doc_text.strip()
 
@@ -120,6 +157,7 @@ class WeightedInvertedIndex:
                 self.dictionary[term][doc_id] = freq
 
         self.doc_count = len(self.doc_ids)
+        print(f"{self.doc_count} documents indexés")
         self.avg_doc_length = self.total_terms / self.doc_count if self.doc_count > 0 else 0
 
         end_time = time.time()
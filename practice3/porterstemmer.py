@@ -343,3 +343,177 @@ class PorterStemmer:
         self.step5()
         return self.b[self.k0:self.k+1]
 
+
+
+
+import re as _re
+from functools import lru_cache as _lru_cache
+
+_NOT_VOWEL = _re.compile('[^aeiouy]')
+_VOWELS_TO_V = str.maketrans('aeiou', 'vvvvv')
+_ASCII_TO_CV = str.maketrans({chr(i): 'v' if chr(i) in 'aeiou' else 'y' if chr(i) == 'y' else 'c'
+                              for i in range(128)})
+
+# Règles (suffixe, remplacement) indexées par l'avant-dernière lettre (étape 2)
+_STEP2_RULES = {
+    'a': (("ational", "ate"), ("tional", "tion")),
+    'c': (("enci", "ence"), ("anci", "ance")),
+    'e': (("izer", "ize"),),
+    'l': (("bli", "ble"), ("alli", "al"), ("entli", "ent"), ("eli", "e"), ("ousli", "ous")),
+    'o': (("ization", "ize"), ("ation", "ate"), ("ator", "ate")),
+    's': (("alism", "al"), ("iveness", "ive"), ("fulness", "ful"), ("ousness", "ous")),
+    't': (("aliti", "al"), ("iviti", "ive"), ("biliti", "ble")),
+    'g': (("logi", "log"),),
+}
+
+# Règles indexées par la dernière lettre (étape 3)
+_STEP3_RULES = {
+    'e': (("icate", "ic"), ("ative", ""), ("alize", "al")),
+    'i': (("iciti", "ic"),),
+    'l': (("ical", "ic"), ("ful", "")),
+    's': (("ness", ""),),
+}
+
+# Suffixes indexés par l'avant-dernière lettre (étape 4, le cas -ion est traité à part)
+_STEP4_SUFFIXES = {
+    'a': ("al",),
+    'c': ("ance", "ence"),
+    'e': ("er",),
+    'i': ("ic",),
+    'l': ("able", "ible"),
+    'n': ("ant", "ement", "ment", "ent"),
+    's': ("ism",),
+    't': ("ate", "iti"),
+    'u': ("ous",),
+    'v': ("ive",),
+    'z': ("ize",),
+}
+
+# Pour chaque lettre, tous les suffixes possibles : un seul endswith() suffit
+# à savoir si une règle peut s'appliquer (cas de loin le plus fréquent : aucune)
+_STEP2_ANY = {letter: tuple(suffix for suffix, _ in rules) for letter, rules in _STEP2_RULES.items()}
+_STEP3_ANY = {letter: tuple(suffix for suffix, _ in rules) for letter, rules in _STEP3_RULES.items()}
+
+
+def _consonant_pattern(b):
+    """Chaîne de même longueur que b : 'c' pour une consonne, 'v' pour une voyelle (cons() de la classe)"""
+    if b.isascii():
+        cv = b.translate(_ASCII_TO_CV)
+    else:
+        cv = _NOT_VOWEL.sub('c', b).translate(_VOWELS_TO_V)
+    if 'y' not in cv:
+        return cv
+    # y est une consonne en tête de mot ou après une voyelle, une voyelle sinon
+    cv = list(cv)
+    for i, ch in enumerate(cv):
+        if ch == 'y':
+            cv[i] = 'c' if i == 0 or cv[i - 1] == 'v' else 'v'
+    return ''.join(cv)
+
+
+def _cvc(b, cv, i):
+    """cvc(i) : consonne-voyelle-consonne en i-2, i-1, i, la dernière n'étant pas w, x ou y"""
+    return i >= 2 and cv[i - 2:i + 1] == 'cvc' and b[i] not in 'wxy'
+
+
+def _apply_rules(b, cv, k, rules, candidates):
+    """
+    Étapes 2 et 3 : la première règle dont le suffixe termine b[0..k] est retenue,
+    le remplacement n'a lieu que si m() > 0 devant le suffixe.
+    Renvoie (b, cv, k) éventuellement modifiés.
+    """
+    if candidates is None or not b.endswith(candidates, 0, k + 1):
+        return b, cv, k
+    for suffix, replacement in rules:
+        if b.endswith(suffix, 0, k + 1):
+            j = k - len(suffix)
+            # m() : nombre de séquences voyelles-consonnes dans b[0..j]
+            if cv.count('vc', 0, j + 1) > 0:
+                b = b[:j + 1] + replacement + b[j + len(replacement) + 1:]
+                return b, _consonant_pattern(b), j + len(replacement)
+            return b, cv, k
+    return b, cv, k
+
+
+@_lru_cache(maxsize=1 << 16)
+def stem_word(word):
+    """Racine de Porter d'un mot en minuscules (identique à PorterStemmer.stem)"""
+    b = word
+    k = len(word) - 1
+    if k <= 1:
+        return b  # --DEPARTURE-- voir PorterStemmer.stem
+    cv = _consonant_pattern(b)
+
+    # Step 1ab : pluriels, -ed, -ing
+    if b[k] == 's':
+        if b.endswith("sses", 0, k + 1):
+            k -= 2
+        elif b.endswith("ies", 0, k + 1):
+            b = b[:k - 2] + "i" + b[k - 1:]
+            cv = _consonant_pattern(b)
+            k -= 2
+        elif b[k - 1] != 's':
+            k -= 1
+    last = b[k]
+    if last == 'd' and b.endswith("eed", 0, k + 1):
+        if cv.count('vc', 0, k - 2) > 0:
+            k -= 1
+    elif last == 'd' and b.endswith("ed", 0, k + 1) or last == 'g' and b.endswith("ing", 0, k + 1):
+        j = k - (2 if last == 'd' else 3)
+        if 'v' in cv[:j + 1]:
+            k = j
+            last = b[k]
+            if last == 't' and b.endswith("at", 0, k + 1) \
+                    or last == 'l' and b.endswith("bl", 0, k + 1) \
+                    or last == 'z' and b.endswith("iz", 0, k + 1):
+                # at -> ate, bl -> ble, iz -> ize
+                b = b[:k + 1] + "e" + b[k + 2:]
+                cv = _consonant_pattern(b)
+                k += 1
+            elif k >= 1 and last == b[k - 1] and cv[k] == 'c':
+                if last not in 'lsz':
+                    k -= 1
+            elif cv.count('vc', 0, k + 1) == 1 and _cvc(b, cv, k):
+                b = b[:k + 1] + "e" + b[k + 2:]
+                cv = _consonant_pattern(b)
+                k += 1
+
+    # Step 1c : y final -> i s'il y a une autre voyelle
+    if b[k] == 'y' and 'v' in cv[:k]:
+        b = b[:k] + 'i' + b[k + 1:]
+        cv = _consonant_pattern(b)
+
+    # Step 2 : suffixes doubles (-ization -> -ize...)
+    letter = b[k - 1]
+    b, cv, k = _apply_rules(b, cv, k, _STEP2_RULES.get(letter), _STEP2_ANY.get(letter))
+
+    # Step 3 : -ic-, -full, -ness...
+    letter = b[k]
+    b, cv, k = _apply_rules(b, cv, k, _STEP3_RULES.get(letter), _STEP3_ANY.get(letter))
+
+    # Step 4 : -ant, -ence... dans le contexte <c>vcvc<v>
+    letter = b[k - 1]
+    j = -1
+    if letter == 'o':
+        if b.endswith("ion", 0, k + 1) and b[k - 3] in 'st':
+            j = k - 3
+        elif b.endswith("ou", 0, k + 1):
+            j = k - 2
+    else:
+        suffixes = _STEP4_SUFFIXES.get(letter)
+        if suffixes is not None and b.endswith(suffixes, 0, k + 1):
+            for suffix in suffixes:
+                if b.endswith(suffix, 0, k + 1):
+                    j = k - len(suffix)
+                    break
+    if j >= 0 and cv.count('vc', 0, j + 1) > 1:
+        k = j
+
+    # Step 5 : -e final et -ll (m() est mesuré sur b[0..k] d'origine)
+    m = cv.count('vc', 0, k + 1)
+    if b[k] == 'e' and (m > 1 or (m == 1 and not _cvc(b, cv, k - 1))):
+        k -= 1
+    if b[k] == 'l' and k >= 1 and b[k - 1] == 'l' and m > 1:
+        k -= 1
+
+    return b[:k + 1]
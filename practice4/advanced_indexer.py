@@ -1,27 +1,63 @@
+import math
 import re
-from collections import defaultdict, Counter
+from array import array
+from bisect import bisect_left
+from collections import defaultdict, deque, Counter
 import gzip
+import multiprocessing
+import os
 import time
-from porterstemmer import PorterStemmer
+from analyzer import Analyzer
+from porterstemmer import stem_word
+from postings import TAIL_RATIO, CompressedPostingList, PositionalPostings, PostingList, PostingStore
+from index_storage import (ContentFingerprint, MappedDictionary, map_dictionary, read_index, source_signature,
+                           write_index)
+from spimi import SpimiBuilder
 
 
+# Motif d'un document de la collection : <doc><docno>...</docno>...</doc>
+DOC_PATTERN = re.compile(r'<doc><docno>([^<]+)</docno>(.*?)</doc>', re.DOTALL)
+DOC_END = '</doc>'
+
 class WeightedInvertedIndex:
-    def __init__(self):
-        self.dictionary = defaultdict(dict)  # term -> {doc_id: tf}
-        self.doc_ids = []
-        self.doc_lengths = {}  # doc_id -> length in terms
+    def __init__(self, integer_postings=False, cosine_norms=True, positions=False):
+        if positions and not integer_postings:
+            raise ValueError("Les positions nécessitent integer_postings=True")
+        # Mode entier : doc ids denses attribués à l'ingestion, postings à plat dans des array('I')
+        self.integer_postings_active = integer_postings
+        if integer_postings:
+            self.dictionary = PostingStore()  # term -> PostingList [doc, tf, ...], rangées en CSR
+            self.doc_lengths = array('I')  # doc id entier -> length in terms
+        else:
+            self.dictionary = defaultdict(dict)  # term -> {doc_id: tf}
+            self.doc_lengths = {}  # doc_id -> length in terms
+        self.doc_ids = []  # doc id entier -> docno
+        self.doc_index = {}  # docno -> doc id entier
+        self.postings_encoding = None  # None, 'vbyte', 'gamma' ou 'delta' (voir compress_postings)
+        # Couche positionnelle optionnelle : term -> PositionalPostings alignées sur ses postings
+        # (gardée en mémoire seulement, save() ne l'écrit pas)
+        self.positions = defaultdict(PositionalPostings) if positions else None
+        # Normes cosinus suivies pendant l'indexation : sommes S0, S1, S2 par doc id
+        # (voir track_cosine_norms), ou normes float32 relues avec l'index (load)
+        self.norm_sums = [array('d') for _ in range(3)] if cosine_norms else None
+        self.stored_norms = None
+        self._fingerprint = None  # (generation, empreinte du contenu)
+        self.sources = []  # signatures des fichiers indexés avec add_file (voir index_storage.source_signature)
         self.doc_count = 0
         self.total_terms = 0
         self.total_tokens_bp = 0  # tokens avant traitement, bp = before processing
         self.distinct_tokens_bp = set()  # tokens distincts avant traitement
         self.total_chars_tokens = 0  # total caractères pour tokens
         self.avg_doc_length = 0
+        self.generation = 0  # incrémenté à chaque modification (invalide les caches des rankers)
 
         # Options
         self.stop_words_set = set()
-        self.stemmer = PorterStemmer()
+        self.stemmer = stem_word  # fonction sans état (et avec cache), utilisable depuis plusieurs workers
         self.stop_word_active = False
         self.stemmer_active = False
+        self._analyzer = None
+        self._analyzer_config = None
 
     def load_stop_words(self, stop_words_file="data/stop-words-english4.txt"):
         """Charge les stop words"""
@@ -32,18 +68,26 @@ class WeightedInvertedIndex:
         except FileNotFoundError:
             print(f"- Fichier {stop_words_file} non trouvé")
 
+    def get_analyzer(self):
+        """
+        Analyseur fusionné correspondant à la configuration courante
+        (stop_word_active, stop_words_set, stemmer_active, stemmer).
+        Il est reconstruit seulement si la configuration a changé.
+        """
+        stop_words = self.stop_words_set if self.stop_word_active else ()
+        stemmer = self.stemmer if self.stemmer_active else None
+        config = (id(stop_words), len(stop_words), stemmer)
+        if self._analyzer_config != config:
+            self._analyzer = Analyzer(stop_words, stemmer)
+            self._analyzer_config = config
+        return self._analyzer
+
     def apply_tokenization(self, text):
         """
         Extraction des tokens bruts du texte.
-        Retire ponctuation et chiffres si nécessaire.
+        Retire ponctuation et chiffres (seules les lettres a-z et A-Z forment les tokens).
         """
-        # Retirer chiffres et caractères spéciaux (laisser seulement a-z et A-Z)
-        text = re.sub(r'[^A-Za-z\s]', ' ', text)
-
-        # Séparer sur les espaces
-        tokens = [t for t in text.split() if len(t) > 0]
-
-        return tokens
+        return self.get_analyzer().tokenize(text)
 
     def process_tokens(self, tokens):
         """
@@ -52,18 +96,7 @@ class WeightedInvertedIndex:
         - Suppression des stop-words
         - Stemming
         """
-        # Case folding
-        tokens = [t.lower() for t in tokens]
-
-        # stop words
-        if self.stop_word_active:
-            tokens = [token for token in tokens if token not in self.stop_words_set]
-
-        # stemming
-        if self.stemmer_active:
-            tokens = [self.stemmer.stem(token, 0, len(token) - 1) for token in tokens]
-
-        return tokens
+        return self.get_analyzer().process(tokens)
 
     def read_file(self, filename, is_zipped):
         """Renvoie le contenu d'un fichier zippé ou non"""
@@ -80,47 +113,240 @@ class WeightedInvertedIndex:
 
         return content
 
-    def build_index(self, filename, is_zipped=False):
-        """Construit l'index depuis le fichier"""
-        start_time = time.time()
-
-        print(f"Lecture de {filename}...")
-        content = self.read_file(filename, is_zipped)
-
-        # Extraction des documents
-        doc_pattern = r'<doc><docno>([^<]+)</docno>(.*?)</doc>'
-        matches = re.findall(doc_pattern, content, re.DOTALL)
+    def read_documents(self, filename, is_zipped, chunk_size=1 << 20):
+        """
+        Lecture en flux des documents d'un fichier zippé ou non.
+        Le fichier est lu par blocs de chunk_size caractères : un document coupé
+        entre deux blocs reste dans le tampon jusqu'à ce que sa balise </doc> arrive.
+        La mémoire est donc bornée par le plus gros document, pas par la collection.
+        Renvoie un générateur de couples (docno, texte).
+        """
+        if is_zipped:
+            opener = lambda: gzip.open(filename, 'rt', encoding='utf-8', errors='ignore')
+        else:
+            opener = lambda: open(filename, 'r', encoding='utf-8', errors='ignore')
 
-        print(f"Indexation de {len(matches)} documents...")
+        try:
+            with opener() as file:
+                buffer = ""
+                while True:
+                    chunk = file.read(chunk_size)
+                    if not chunk:
+                        break
+
+                    # On ne relance la regex que si le bloc peut fermer un document
+                    # (la balise </doc> peut elle-même être coupée entre deux blocs)
+                    search_from = max(0, len(buffer) - len(DOC_END) + 1)
+                    buffer += chunk
+                    if buffer.find(DOC_END, search_from) == -1:
+                        continue
+
+                    # Un document complet trouvé dans le tampon est définitif :
+                    # la regex non gourmande s'arrête au premier </doc>
+                    last_end = 0
+                    for match in DOC_PATTERN.finditer(buffer):
+                        yield match.group(1), match.group(2)
+                        last_end = match.end()
+
+                    # On garde seulement la partie non consommée
+                    buffer = buffer[last_end:]
+        except OSError as e:
+            print(f"- Erreur lecture: {e}")
+
+    def add_document(self, doc_id, doc_text):
+        """
+        Ajoute un document à l'index (les statistiques globales doc_count et
+        avg_doc_length sont mises à jour par add_documents).
+        Renvoie le Counter des terms du document.
+        """
+        doc_id = doc_id.strip()
+        doc_text = doc_text.strip()
+
+        # Tokenisation et traitement (case folding, stop-words si TRUE, stemming si TRUE)
+        # en une passe : tokens bruts pour les statistiques, Counter des TERMS pour l'index
+        term_positions = None
+        if self.positions is not None:
+            tokens, term_freq, term_positions = self.get_analyzer().analyze_positions(doc_text)
+        else:
+            tokens, term_freq = self.get_analyzer().analyze(doc_text)
+
+        # Mise à jour des statistiques pour les TOKENS
+        self.total_tokens_bp += len(tokens)
+        self.distinct_tokens_bp.update(tokens)
+        self.total_chars_tokens += sum(map(len, tokens))
+
+        # Mise à jour des statistiques TERMS (après traitement)
+        doc_length = sum(term_freq.values())
+        doc_number = len(self.doc_ids)
+        self.doc_ids.append(doc_id)
+        self.doc_index[doc_id] = doc_number
+        self.total_terms += doc_length
+
+        # Construction du dictionnaire
+        doc_key = doc_number if self.integer_postings_active else doc_id
+        if self.integer_postings_active:
+            self.doc_lengths.append(doc_length)
+        else:
+            self.doc_lengths[doc_id] = doc_length
 
-        for doc_id, doc_text in matches:
-            doc_id = doc_id.strip()
-            doc_text = doc_text.strip()
+        if isinstance(self.dictionary, PostingStore):
+            # Postings à plat : les ajouts vont dans la queue (voir PostingStore)
+            self.dictionary.add_document(doc_key, term_freq)
+        elif isinstance(self.dictionary, MappedDictionary):
+            # Index chargé depuis le disque : les ajouts vont dans la couche en mémoire
+            for term, freq in term_freq.items():
+                self.dictionary.add_posting(term, doc_key, freq)
+        elif self.integer_postings_active:
+            for term, freq in term_freq.items():
+                self.dictionary[term].add(doc_key, freq)
+        else:
+            for term, freq in term_freq.items():
+                self.dictionary[term][doc_key] = freq
+        if term_positions is not None:
+            for term, positions in term_positions.items():
+                self.positions[term].add(positions)
 
-            # Tokenisation SIMPLE (sans traitement supplémentaire)
-            tokens = self.apply_tokenization(doc_text)
+        return term_freq
 
-            # Mise à jour des statistiques pour les TOKENS
-            self.total_tokens_bp += len(tokens)
-            self.distinct_tokens_bp.update(tokens)
-            self.total_chars_tokens += sum(len(token) for token in tokens)
+    def add_documents(self, documents):
+        """
+        Ajoute un lot de documents (couples (docno, texte)) à un index existant,
+        construit en mémoire ou chargé depuis le disque. df, doc_lengths,
+        avg_doc_length et les normes cosinus suivies sont mis à jour
+        incrémentalement : le coût dépend du lot, pas de l'index déjà construit.
+        Renvoie le nombre de documents ajoutés.
+        """
+        batch_start = len(self.doc_ids)
+        tracking_norms = self._resume_norm_tracking()
+        batch_term_freqs = []
+        previous_dfs = {}  # df avant le lot des terms touchés par le lot
+
+        for doc_id, doc_text in documents:
+            term_freq = self.add_document(doc_id, doc_text)
+            if tracking_norms:
+                batch_term_freqs.append(term_freq)
+                for term in term_freq:
+                    if term not in previous_dfs:
+                        # Le document courant est le premier du lot à contenir term
+                        previous_dfs[term] = self.get_document_frequency(term) - 1
+
+        if tracking_norms:
+            self._update_norm_sums(batch_start, batch_term_freqs, previous_dfs)
+
+        self._compact_postings()
+        self._update_collection_statistics()
+        return len(self.doc_ids) - batch_start
+
+    def add_documents_parallel(self, documents, workers=None, batch_size=200):
+        """
+        Variante parallèle de add_documents : le flux de documents est découpé en lots
+        de batch_size documents, chaque lot est analysé et inversé dans un pool de
+        workers processus (index partiel aux doc ids déjà décalés), puis les index
+        partiels sont fusionnés dans l'ordre des lots. doc ids, df, doc_lengths,
+        statistiques et normes suivies sont identiques à ceux d'une construction série.
+        Renvoie le nombre de documents ajoutés.
+        """
+        if self.positions is not None:
+            raise ValueError("Les positions ne sont gardées que par add_documents (indexation série)")
+        workers = workers or os.cpu_count() or 1
+        batch_start = len(self.doc_ids)
+        tracking_norms = self._resume_norm_tracking()
+        batch_term_freqs = []
+        previous_dfs = {}  # df avant le lot des terms touchés par le lot
+
+        options = (self.integer_postings_active,
+                   self.stop_words_set if self.stop_word_active else set(),
+                   self.stemmer if self.stemmer_active else None)
+        batches = _split_batches(documents, batch_start, batch_size, tracking_norms)
+        with multiprocessing.Pool(workers, _init_worker, options) as pool:
+            # Au plus deux lots en attente par worker : la mémoire reste bornée
+            for shard in _ordered_results(pool, _invert_batch, batches, 2 * workers):
+                if tracking_norms:
+                    for term in shard[2][0] if self.integer_postings_active else shard[2]:
+                        if term not in previous_dfs:
+                            previous_dfs[term] = self.get_document_frequency(term)
+                    batch_term_freqs.extend(shard[7])
+                self._merge_shard(shard)
+
+        if tracking_norms:
+            self._update_norm_sums(batch_start, batch_term_freqs, previous_dfs)
+
+        self._compact_postings()
+        self._update_collection_statistics()
+        return len(self.doc_ids) - batch_start
+
+    def _compact_postings(self):
+        """Après un lot : range la queue des postings à plat si elle est devenue grande (voir PostingStore)"""
+        if isinstance(self.dictionary, PostingStore):
+            self.dictionary.compact(TAIL_RATIO)
+
+    def _merge_shard(self, shard):
+        """Ajoute à l'index un index partiel renvoyé par _invert_batch"""
+        doc_ids, doc_lengths, dictionary, tokens_bp, distinct_tokens_bp, chars_tokens, terms, _ = shard
+
+        self.doc_index.update(zip(doc_ids, range(len(self.doc_ids), len(self.doc_ids) + len(doc_ids))))
+        self.doc_ids.extend(doc_ids)
+        if self.integer_postings_active:
+            self.doc_lengths.extend(doc_lengths)
+        else:
+            self.doc_lengths.update(doc_lengths)
+
+        self.total_tokens_bp += tokens_bp
+        self.distinct_tokens_bp.update(distinct_tokens_bp)
+        self.total_chars_tokens += chars_tokens
+        self.total_terms += terms
+
+        # Les lots sont fusionnés dans l'ordre : les postings restent triés par doc id
+        if self.integer_postings_active:
+            # Postings à plat (voir _invert_batch) : la tranche de chaque term est
+            # copiée directement, sans recréer une PostingList par term et par lot
+            terms, offsets, flat = dictionary
+            if isinstance(self.dictionary, PostingStore):
+                for term, start, end in zip(terms, offsets, offsets[1:]):
+                    self.dictionary.add_postings(term, flat[start // 4:end // 4])
+            elif isinstance(self.dictionary, MappedDictionary):
+                for term, start, end in zip(terms, offsets, offsets[1:]):
+                    for doc_key, tf in PostingList(flat[start // 4:end // 4]).pairs():
+                        self.dictionary.add_posting(term, doc_key, tf)
+            else:
+                for term, start, end in zip(terms, offsets, offsets[1:]):
+                    for doc_key, tf in PostingList(flat[start // 4:end // 4]).pairs():
+                        self.dictionary[term].add(doc_key, tf)
+        elif isinstance(self.dictionary, MappedDictionary):
+            for term, postings in dictionary.items():
+                for doc_key, tf in postings.items():
+                    self.dictionary.add_posting(term, doc_key, tf)
+        else:
+            for term, postings in dictionary.items():
+                self.dictionary[term].update(postings)
 
-            # Traitement TOKENS (case folding, stop-words si TRUE, stemming si TRUE) pour obtenir les TERMS
-            terms = self.process_tokens(tokens)
+    def add_file(self, filename, is_zipped=None, workers=1):
+        """
+        Ajoute tous les documents d'un fichier (zippé si son nom finit par .gz),
+        sur workers processus si workers > 1 (None = un par coeur)
+        """
+        if is_zipped is None:
+            is_zipped = filename.endswith('.gz')
+        self.sources.append(source_signature(filename))
+        documents = self.read_documents(filename, is_zipped)
+        if workers == 1:
+            return self.add_documents(documents)
+        return self.add_documents_parallel(documents, workers)
+
+    def _update_collection_statistics(self):
+        """Recalcule doc_count et avg_doc_length à partir des compteurs"""
+        self.generation += 1
+        self.doc_count = len(self.doc_ids)
+        self.avg_doc_length = self.total_terms / self.doc_count if self.doc_count > 0 else 0
 
-            # Mise à jour des statistiques TERMS (après traitement)
-            doc_length = len(terms)
-            self.doc_ids.append(doc_id)
-            self.doc_lengths[doc_id] = doc_length
-            self.total_terms += doc_length
+    def build_index(self, filename, is_zipped=False, workers=1):
+        """Construit l'index depuis le fichier (en parallèle si workers > 1, voir add_documents_parallel)"""
+        start_time = time.time()
 
-            # Construction du dictionnaire
-            term_freq = Counter(terms)
-            for term, freq in term_freq.items():
-                self.dictionary[term][doc_id] = freq
+        print(f"Lecture en flux de {filename}...")
 
-        self.doc_count = len(self.doc_ids)
-        self.avg_doc_length = self.total_terms / self.doc_count if self.doc_count > 0 else 0
+        self.add_file(filename, is_zipped, workers)
+        print(f"{self.doc_count} documents indexés")
 
         end_time = time.time()
         indexing_time = end_time - start_time
@@ -129,6 +355,277 @@ class WeightedInvertedIndex:
 
         return indexing_time
 
+    def build_index_spimi(self, filename, index_path, is_zipped=False, memory_budget=64 << 20,
+                          encoding=None, run_dir=None):
+        """
+        Construit l'index en SPIMI à mémoire bornée (voir spimi.py) : le dictionnaire est
+        écrit dans un run trié dès que sa taille estimée atteint memory_budget octets,
+        puis les runs sont fusionnés dans le fichier index_path, mappé ensuite comme
+        avec load(). L'index doit être vide et en mode entier.
+        """
+        if not self.integer_postings_active:
+            raise ValueError("SPIMI requiert des doc ids entiers (integer_postings=True)")
+        if self.doc_ids or isinstance(self.dictionary, MappedDictionary):
+            raise ValueError("SPIMI construit un nouvel index : l'index doit être vide")
+        if self.positions is not None:
+            raise ValueError("Les positions ne sont gardées que par add_documents (indexation série)")
+
+        start_time = time.time()
+        print(f"Lecture en flux de {filename} (SPIMI, budget {memory_budget / 2 ** 20:.0f} Mo)...")
+
+        self.sources.append(source_signature(filename))
+        builder = SpimiBuilder(self, memory_budget, run_dir)
+        builder.add_documents(self.read_documents(filename, is_zipped))
+        self._update_collection_statistics()
+        run_count, norms = builder.finish(index_path, encoding)
+        print(f"{self.doc_count} documents indexés, {run_count} run(s) fusionné(s) dans {index_path}")
+
+        # Les postings fusionnés sont lus depuis le fichier, comme après load()
+        self.dictionary = map_dictionary(index_path, self.doc_ids)
+        self.postings_encoding = encoding
+        if norms is not None:
+            # Normes calculées pendant la fusion, comme celles relues par load()
+            self.norm_sums = None
+            self.stored_norms = norms
+
+        indexing_time = time.time() - start_time
+        print(f"Index construit avec succès !")
+
+        return indexing_time
+
+    def track_cosine_norms(self):
+        """
+        Active (ou reconstruit depuis les postings) le suivi incrémental des normes cosinus (ltc).
+        Avec L = log10(N), l_t = log10(df_t) et a = 1 + log10(tf) :
+            norme(d)^2 = sum_t a^2 (L - l_t)^2 = L^2 S0 - 2 L S1 + S2
+        où S0 = sum a^2, S1 = sum a^2 l_t et S2 = sum a^2 l_t^2 sont gardées par document.
+        Un changement de N ne coûte donc rien ; un lot de documents ne corrige S1 et S2
+        que pour les documents contenant un term dont le df a changé.
+        """
+        self.norm_sums = [array('d', bytes(8 * len(self.doc_ids))) for _ in range(3)]
+        self.stored_norms = None
+        for term, df in self.get_document_frequencies().items():
+            log_df = math.log10(df)
+            for doc_number, tf in self.get_posting_list(term).pairs():
+                self._add_norm_sums(doc_number, tf, log_df, 1.0)
+
+    def tracks_cosine_norms(self):
+        """Vrai si l'index connaît les normes cosinus de tous ses documents"""
+        return self.norm_sums is not None or self.stored_norms is not None
+
+    def _resume_norm_tracking(self):
+        """
+        Avant un ajout de documents : les normes relues avec l'index ne peuvent pas être
+        mises à jour, les sommes S0, S1, S2 sont alors reconstruites (une fois) depuis les postings.
+        Renvoie vrai si les normes sont suivies.
+        """
+        if self.norm_sums is None and self.stored_norms is not None:
+            self.track_cosine_norms()
+        return self.norm_sums is not None
+
+    def _add_norm_sums(self, doc_number, tf, log_df, sign):
+        """Ajoute (sign = 1) ou retire (sign = -1) la contribution d'un term aux sommes du document"""
+        a2 = (1.0 + math.log10(tf)) ** 2
+        s0, s1, s2 = self.norm_sums
+        s0[doc_number] += sign * a2
+        s1[doc_number] += sign * a2 * log_df
+        s2[doc_number] += sign * a2 * log_df * log_df
+
+    def _update_norm_sums(self, batch_start, batch_term_freqs, previous_dfs):
+        """Met à jour les sommes des normes après l'ajout d'un lot de documents"""
+        for s in self.norm_sums:
+            s.extend(0.0 for _ in batch_term_freqs)
+
+        # Anciens documents : seule la partie log(df) des terms touchés change
+        for term, previous_df in previous_dfs.items():
+            if previous_df == 0:
+                continue
+            old_log_df = math.log10(previous_df)
+            new_log_df = math.log10(self.get_document_frequency(term))
+            for doc_number, tf in self.get_posting_list(term).pairs():
+                if doc_number >= batch_start:
+                    break
+                self._add_norm_sums(doc_number, tf, old_log_df, -1.0)
+                self._add_norm_sums(doc_number, tf, new_log_df, 1.0)
+
+        # Nouveaux documents : contribution complète avec les df à jour (les terms du lot
+        # sont exactement ceux de previous_dfs), sommée par document puis écrite une fois
+        log_dfs = {term: math.log10(self.get_document_frequency(term)) for term in previous_dfs}
+        s0, s1, s2 = self.norm_sums
+        for doc_number, term_freq in enumerate(batch_term_freqs, batch_start):
+            sum0 = sum1 = sum2 = 0.0
+            for term, tf in term_freq.items():
+                a2 = (1.0 + math.log10(tf)) ** 2
+                log_df = log_dfs[term]
+                sum0 += a2
+                sum1 += a2 * log_df
+                sum2 += a2 * log_df * log_df
+            s0[doc_number] = sum0
+            s1[doc_number] = sum1
+            s2[doc_number] = sum2
+
+    def _cosine_norms(self, sums):
+        """Normes cosinus en float64 calculées depuis des séquences de sommes (S0, S1, S2)"""
+        log_n = math.log10(self.doc_count) if self.doc_count > 0 else 0.0
+        for s0, s1, s2 in zip(*sums):
+            sum_of_squares = log_n * log_n * s0 - 2 * log_n * s1 + s2
+            # Les termes de df = N donnent une somme nulle aux erreurs d'arrondi près
+            yield math.sqrt(sum_of_squares) if sum_of_squares > 1e-12 else 1.0
+
+    def get_cosine_norm_array(self):
+        """
+        Normes cosinus (ltc) par doc id entier, en float32 : la précision stockée dans le
+        fichier d'index, pour que les scores ltc ne changent pas après save()/load()
+        """
+        if self.norm_sums is None:
+            return self.stored_norms
+        return array('f', self._cosine_norms(self.norm_sums))
+
+    def get_cosine_norm(self, doc_id):
+        """Norme cosinus (ltc) d'un document (docno), si l'index suit les normes"""
+        doc_number = self.doc_index[doc_id]
+        if self.norm_sums is None:
+            return self.stored_norms[doc_number]
+        sums = [(s[doc_number],) for s in self.norm_sums]
+        return array('f', self._cosine_norms(sums))[0]
+
+    def content_fingerprint(self):
+        """
+        Empreinte du contenu de l'index (voir index_storage.ContentFingerprint), calculée
+        une fois par état de l'index : elle identifie les normes et caches dérivés
+        """
+        if self._fingerprint is None or self._fingerprint[0] != self.generation:
+            fingerprint = ContentFingerprint(self.doc_ids, self.get_doc_length_array())
+            for term in sorted(self.dictionary.keys()):
+                postings = self.get_posting_list(term)
+                fingerprint.add_term(term, postings.doc_ids(), postings.tfs())
+            self._fingerprint = (self.generation, fingerprint.hexdigest())
+        return self._fingerprint[1]
+
+    def set_content_fingerprint(self, fingerprint):
+        """Empreinte déjà connue de l'état courant (relue avec l'index)"""
+        self._fingerprint = (self.generation, fingerprint)
+
+    def get_document_frequency(self, term):
+        """Renvoie le df d'un terme sans décoder ses postings (index chargé depuis le disque ou à plat)"""
+        if isinstance(self.dictionary, (MappedDictionary, PostingStore)):
+            return self.dictionary.document_frequency(term)
+        if term not in self.dictionary:
+            return 0
+        postings = self.dictionary[term]
+        return postings.document_frequency() if self.integer_postings_active else len(postings)
+
+    def get_document_frequencies(self):
+        """Renvoie le dictionnaire term -> df"""
+        if isinstance(self.dictionary, (MappedDictionary, PostingStore)):
+            return self.dictionary.document_frequencies()
+        if self.integer_postings_active:
+            return {term: postings.document_frequency() for term, postings in self.dictionary.items()}
+        return {term: len(postings) for term, postings in self.dictionary.items()}
+
+    def get_tf(self, term, doc_id):
+        """tf du terme dans le document (docno), 0 si absent"""
+        if term not in self.dictionary:
+            return 0
+        if self.integer_postings_active:
+            doc_number = self.doc_index.get(doc_id)
+            if doc_number is None:
+                return 0
+            if isinstance(self.dictionary, PostingStore):
+                return self.dictionary.get_tf(term, doc_number)
+            return self.dictionary[term].get_tf(doc_number)
+        return self.dictionary[term].get(doc_id, 0)
+
+    def get_doc_length(self, doc_id):
+        """Longueur en terms du document (docno)"""
+        if self.integer_postings_active:
+            return self.doc_lengths[self.doc_index[doc_id]]
+        return self.doc_lengths[doc_id]
+
+    def iter_postings(self, term):
+        """Itère sur les couples (docno, tf) d'un terme, quel que soit le mode"""
+        if term not in self.dictionary:
+            return iter(())
+        if self.integer_postings_active:
+            doc_ids = self.doc_ids
+            return ((doc_ids[doc_number], tf) for doc_number, tf in self.dictionary[term].pairs())
+        return iter(self.dictionary[term].items())
+
+    def get_posting_list(self, term):
+        """Renvoie la PostingList (doc ids entiers triés) d'un terme, quel que soit le mode"""
+        if term not in self.dictionary:
+            return PostingList()
+        if self.integer_postings_active:
+            return self.dictionary[term]
+        postings = PostingList()
+        for doc_number, tf in sorted((self.doc_index[doc_id], tf) for doc_id, tf in self.dictionary[term].items()):
+            postings.add(doc_number, tf)
+        return postings
+
+    def has_positions(self):
+        """Vrai si l'index garde les positions des terms (construit avec positions=True)"""
+        return self.positions is not None
+
+    def get_positions(self, term, doc_numbers):
+        """
+        Positions du terme dans chacun des documents doc_numbers (doc ids entiers
+        croissants, tous dans ses postings) : seules ces listes sont décodées
+        """
+        if not self.has_positions():
+            raise ValueError("L'index ne garde pas les positions (positions=True)")
+        doc_ids = self.get_posting_list(term).doc_ids()
+        term_positions = self.positions[term]
+        result = []
+        low = 0
+        for doc_number in doc_numbers:
+            low = bisect_left(doc_ids, doc_number, low)
+            result.append(term_positions.positions(low))
+        return result
+
+    def get_doc_length_array(self):
+        """Longueurs des documents indexées par doc id entier"""
+        if self.integer_postings_active:
+            return self.doc_lengths
+        return array('I', (self.doc_lengths[doc_id] for doc_id in self.doc_ids))
+
+    def compress_postings(self, encoding='vbyte'):
+        """
+        Remplace chaque PostingList par sa version compressée (écarts + tfs en
+        vbyte, gamma ou delta). Nécessite le mode entier ; les postings sont
+        ensuite décodés à la volée lors de la lecture.
+        """
+        if not self.integer_postings_active:
+            raise ValueError("La compression des postings nécessite integer_postings=True")
+
+        compressed = defaultdict(lambda: CompressedPostingList(encoding=encoding))
+        for term, postings in self.dictionary.items():
+            if isinstance(postings, CompressedPostingList):
+                postings = postings.decompress()
+            compressed[term] = CompressedPostingList.from_postings(postings, encoding)
+        self.dictionary = compressed
+        self.postings_encoding = encoding
+
+    def save(self, path, encoding=None):
+        """
+        Sauvegarde l'index au format binaire (voir index_storage).
+        encoding permet de compresser les postings du fichier même si l'index
+        en mémoire ne l'est pas ; par défaut on garde l'encodage courant.
+        """
+        write_index(self, path, encoding or self.postings_encoding)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Charge un index sauvegardé avec save().
+        Les postings sont mappés en mémoire et décodés à la demande (lecture seule).
+        """
+        return read_index(cls, path)
+
+    def close(self):
+        """Ferme le fichier mappé d'un index chargé avec load()"""
+        if isinstance(self.dictionary, MappedDictionary):
+            self.dictionary.close()
+
     def get_collection_statistics(self, indexing_time):
         """Calcule TOUTES les statistiques demandées dans l'exercice 1"""
 
@@ -161,3 +658,176 @@ class WeightedInvertedIndex:
             'avg_doc_length': avg_doc_length,
             'avg_term_length': avg_term_length
         }
+
+
+# Index modèle d'un worker (fixé par _init_worker)
+_worker_template = None
+
+# Configuration copiée du modèle vers l'index partiel de chaque lot
+_WORKER_ATTRIBUTES = ('stop_word_active', 'stop_words_set', 'stemmer_active', 'stemmer',
+                      '_analyzer', '_analyzer_config')
+
+
+def _init_worker(integer_postings, stop_words, stemmer):
+    """
+    Initialisation d'un worker de add_documents_parallel : un index vide configuré
+    dont l'analyseur (et son cache de racines) sert à tous les lots du worker
+    """
+    global _worker_template
+    template = WeightedInvertedIndex(integer_postings=integer_postings, cosine_norms=False)
+    template.stop_word_active = bool(stop_words)
+    template.stop_words_set = stop_words
+    if stemmer is not None:
+        template.stemmer_active = True
+        template.stemmer = stemmer
+    template.get_analyzer()
+    _worker_template = template
+
+
+def _split_batches(documents, first_doc, batch_size, keep_term_freqs):
+    """Découpe le flux en lots (doc id entier du premier document, documents, keep_term_freqs)"""
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) == batch_size:
+            yield first_doc, batch, keep_term_freqs
+            first_doc += len(batch)
+            batch = []
+    if batch:
+        yield first_doc, batch, keep_term_freqs
+
+
+def _ordered_results(pool, function, tasks, window):
+    """Comme pool.imap, mais sans lire plus de window tâches en avance"""
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.apply_async(function, (task,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def _invert_batch(batch):
+    """
+    Construit l'index partiel d'un lot dans un worker.
+    Renvoie (docnos, doc_lengths, dictionary, total_tokens_bp, distinct_tokens_bp,
+    total_chars_tokens, total_terms, Counters des documents si keep_term_freqs).
+    En mode entier, dictionary est mis à plat en (terms, offsets en octets, postings) :
+    trois objets à sérialiser au lieu d'une PostingList par term.
+    """
+    first_doc, documents, keep_term_freqs = batch
+    integer_postings = _worker_template.integer_postings_active
+
+    shard = WeightedInvertedIndex(integer_postings=integer_postings, cosine_norms=False)
+    for attribute in _WORKER_ATTRIBUTES:
+        setattr(shard, attribute, getattr(_worker_template, attribute))
+
+    term_freqs = []
+    for doc_id, doc_text in documents:
+        term_freq = shard.add_document(doc_id, doc_text)
+        if keep_term_freqs:
+            term_freqs.append(term_freq)
+
+    if integer_postings:
+        flat = PostingList()
+        offsets = array('Q', [0])
+        for postings in shard.dictionary.values():
+            flat.extend(postings)
+            offsets.append(flat.itemsize * len(flat))
+        # Doc ids locaux (0, 1, ...) -> doc ids de l'index final
+        flat[0::2] = array('I', [doc_number + first_doc for doc_number in flat[0::2]])
+        dictionary = (list(shard.dictionary), offsets, flat)
+    else:
+        dictionary = dict(shard.dictionary)
+
+    return (shard.doc_ids, shard.doc_lengths, dictionary, shard.total_tokens_bp,
+            shard.distinct_tokens_bp, shard.total_chars_tokens, shard.total_terms, term_freqs)
+
+
+def derive(index, stop_words=None, stemmer=None):
+    """
+    Construit une variante d'un index (stop words retirés et/ou stemming) en
+    réécrivant son vocabulaire, sans relire ni retokeniser la collection :
+    - un index avec stop words = l'index de base sans ces terms
+    - un index stemmé = l'index de base où les postings des terms de même racine
+      sont fusionnés (tfs additionnés), chaque term distinct n'étant stemmé qu'une fois
+    L'index de base doit être construit sans stemming. stemmer est une fonction
+    mot -> racine comme porterstemmer.stem_word.
+    """
+    if stemmer is not None and index.stemmer_active:
+        raise ValueError("L'index de base est déjà stemmé, impossible de le stemmer à nouveau")
+    stop_words = set(stop_words) if stop_words else set()
+
+    derived = WeightedInvertedIndex(integer_postings=index.integer_postings_active, cosine_norms=False)
+    derived.doc_ids = list(index.doc_ids)
+    derived.sources = list(index.sources)
+    derived.doc_index = dict(index.doc_index)
+
+    # Les statistiques des TOKENS (avant traitement) ne changent pas
+    derived.total_tokens_bp = index.total_tokens_bp
+    derived.distinct_tokens_bp = set(index.distinct_tokens_bp)
+    derived.total_chars_tokens = index.total_chars_tokens
+
+    # Options équivalentes à celles d'un index construit directement
+    derived.stop_word_active = index.stop_word_active or bool(stop_words)
+    derived.stop_words_set = (index.stop_words_set if index.stop_word_active else set()) | stop_words
+    derived.stemmer_active = index.stemmer_active or stemmer is not None
+    if stemmer is not None:
+        derived.stemmer = stemmer
+
+    # Regroupement des terms par nouveau term (racine)
+    groups = defaultdict(list)
+    removed_terms = []
+    for term in index.dictionary:
+        if term in stop_words:
+            removed_terms.append(term)
+        elif stemmer is not None:
+            groups[stemmer(term)].append(term)
+        else:
+            groups[term].append(term)
+
+    # Longueurs des documents : on retire les occurrences des stop words
+    doc_lengths = array('I', index.get_doc_length_array())
+    for term in removed_terms:
+        for doc_number, tf in index.get_posting_list(term).pairs():
+            doc_lengths[doc_number] -= tf
+
+    for new_term, terms in groups.items():
+        if len(terms) == 1 and not index.integer_postings_active:
+            derived.dictionary[new_term] = dict(index.dictionary[terms[0]])
+            continue
+
+        if len(terms) == 1:
+            postings = index.get_posting_list(terms[0])
+            if isinstance(postings, CompressedPostingList):
+                postings = postings.decompress()
+        else:
+            merged = Counter()
+            for term in terms:
+                for doc_number, tf in index.get_posting_list(term).pairs():
+                    merged[doc_number] += tf
+            postings = PostingList()
+            for doc_number in sorted(merged):
+                postings.add(doc_number, merged[doc_number])
+
+        if index.integer_postings_active:
+            derived.dictionary.add_postings(new_term, postings)
+        else:
+            doc_ids = derived.doc_ids
+            derived.dictionary[new_term] = {doc_ids[doc_number]: tf for doc_number, tf in postings.pairs()}
+
+    if index.integer_postings_active:
+        derived.dictionary.compact()
+        derived.doc_lengths = doc_lengths
+    else:
+        derived.doc_lengths = dict(zip(derived.doc_ids, doc_lengths))
+    derived.total_terms = sum(doc_lengths)
+    derived._update_collection_statistics()
+
+    if index.postings_encoding:
+        derived.compress_postings(index.postings_encoding)
+    if index.tracks_cosine_norms():
+        derived.track_cosine_norms()
+
+    return derived
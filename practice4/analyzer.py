@@ -0,0 +1,111 @@
+"""
+Chaîne d'analyse (tokenisation + traitement des tokens) fusionnée.
+
+Équivalente à apply_tokenization() suivi de process_tokens() :
+- tout caractère hors [A-Za-z] sépare les tokens (re.sub(r'[^A-Za-z\\s]', ' ', ...) + split())
+- case folding, puis suppression des stop words, puis stemming
+
+mais sans liste intermédiaire par étape :
+- une passe bytes.translate fait la classification des caractères (lettre
+  ASCII ou séparateur) ; pour une requête, la même passe met en minuscules
+- pour un document, les tokens bruts (casse conservée, pour les statistiques)
+  et les mots en minuscules sont découpés dans la même chaîne de lettres, le
+  passage en minuscules étant un str.lower() ASCII et non une seconde passe translate
+- les stop words sont retirés et les mots stemmés directement sur le Counter du
+  document : chaque token distinct d'un document n'est stemmé qu'une fois
+"""
+from collections import Counter, defaultdict
+
+
+def _translation_table(fold_case):
+    """Table 256 octets : lettres ASCII conservées (en minuscules si fold_case), tout le reste -> espace"""
+    table = bytearray(b' ' * 256)
+    for letter in range(ord('a'), ord('z') + 1):
+        table[letter] = letter
+        table[letter - 32] = letter if fold_case else letter - 32
+    return bytes(table)
+
+
+# Les octets UTF-8 d'un caractère non ASCII sont tous >= 128 : ils deviennent des séparateurs
+LETTERS = _translation_table(fold_case=False)
+FOLDED_LETTERS = _translation_table(fold_case=True)
+
+
+class Analyzer:
+    """
+    Analyseur construit pour une configuration d'index (stop words, stemmer).
+    stemmer est une fonction mot -> racine (porterstemmer.stem_word) ou None.
+    """
+
+    def __init__(self, stop_words=(), stemmer=None):
+        self.stop_words = frozenset(stop_words)
+        self.stemmer = stemmer
+
+    def tokenize(self, text):
+        """Tokens bruts (casse conservée), comme apply_tokenization()"""
+        return text.encode('utf-8', 'replace').translate(LETTERS).decode('ascii').split()
+
+    def fold(self, text):
+        """Tokens en minuscules, en une seule passe translate"""
+        return text.encode('utf-8', 'replace').translate(FOLDED_LETTERS).decode('ascii').split()
+
+    def process(self, tokens):
+        """Liste des terms, comme process_tokens() (les tokens peuvent ne pas être en minuscules)"""
+        stop_words = self.stop_words
+        stemmer = self.stemmer
+        if stemmer is None:
+            return [token for token in map(str.lower, tokens) if token not in stop_words]
+        return [stemmer(token) for token in map(str.lower, tokens) if token not in stop_words]
+
+    def term_frequencies(self, words):
+        """Counter des terms d'un document à partir de ses mots en minuscules"""
+        counts = Counter(words)
+        for stop_word in self.stop_words.intersection(counts):
+            del counts[stop_word]
+        if self.stemmer is None:
+            return counts
+
+        # Un seul appel au stemmer par mot distinct du document ; entre documents,
+        # c'est le cache LRU borné du stemmer (stem_word) qui évite de recalculer
+        term_freq = defaultdict(int)  # Counter.__missing__ est en Python : plus lent par term nouveau
+        stemmer = self.stemmer
+        for word, count in counts.items():
+            term_freq[stemmer(word)] += count
+        return Counter(term_freq)
+
+    def analyze(self, text):
+        """
+        Analyse d'un document : renvoie (tokens bruts, Counter des terms).
+        Les tokens bruts (casse conservée) servent aux statistiques avant traitement.
+        """
+        letters = text.encode('utf-8', 'replace').translate(LETTERS).decode('ascii')
+        tokens = letters.split()
+        words = letters.lower().split()
+        return tokens, self.term_frequencies(words)
+
+    def analyze_positions(self, text):
+        """
+        Comme analyze(), avec en plus les positions de chaque term : rang du mot dans le
+        document, stop words compris (une phrase garde ses écarts). Renvoie
+        (tokens bruts, Counter des terms, term -> liste croissante de positions).
+        """
+        letters = text.encode('utf-8', 'replace').translate(LETTERS).decode('ascii')
+        tokens = letters.split()
+        words = letters.lower().split()
+        stop_words = self.stop_words
+        stems = {}  # mot -> racine, pour ce document seulement
+        positions = defaultdict(list)
+        for position, word in enumerate(words):
+            if word in stop_words:
+                continue
+            if self.stemmer is not None:
+                stem = stems.get(word)
+                if stem is None:
+                    stem = stems[word] = self.stemmer(word)
+                word = stem
+            positions[word].append(position)
+        return tokens, Counter({term: len(term_positions) for term, term_positions in positions.items()}), positions
+
+    def analyze_query(self, text):
+        """Terms d'une requête (même traitement que les documents)"""
+        return self.process(self.fold(text))
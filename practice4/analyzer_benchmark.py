@@ -0,0 +1,101 @@
+import contextlib
+import io
+import os
+import re
+import time
+from collections import Counter
+
+from advanced_indexer import WeightedInvertedIndex
+from analyzer import Analyzer
+from porterstemmer import PorterStemmer, stem_word
+
+
+PRACTICE2_DATA = "../practice2/data/Practice_02_data"
+STOP_WORDS_FILE = "data/stop-words-english4.txt"
+CONFIGURATIONS = [(False, False), (True, False), (False, True), (True, True)]
+REPEAT = 5
+
+
+def legacy_analyze(text, stop_words, stemmer):
+    """
+    Ancienne chaîne, telle qu'avant l'analyseur fusionné : apply_tokenization (regex),
+    puis process_tokens (une liste par étape) avec PorterStemmer.stem et son memo
+    """
+    tokens = [t for t in re.sub(r'[^A-Za-z\s]', ' ', text).split() if len(t) > 0]
+    terms = [t.lower() for t in tokens]
+    if stop_words:
+        terms = [term for term in terms if term not in stop_words]
+    if stemmer is not None:
+        terms = [stemmer.stem(term, 0, len(term) - 1) for term in terms]
+    return tokens, Counter(terms)
+
+
+def legacy_run(documents, stop_words, use_stemmer):
+    """Ancienne chaîne sur tous les documents, avec un PorterStemmer neuf comme pour chaque index (memo vide)"""
+    stemmer = PorterStemmer() if use_stemmer else None
+    return [legacy_analyze(text, stop_words, stemmer) for _, text in documents]
+
+
+def load_collection():
+    """Tous les documents des fichiers de practice2 (couples (docno, texte))"""
+    reader = WeightedInvertedIndex()
+    documents = []
+    for filename in sorted(f for f in os.listdir(PRACTICE2_DATA) if f.endswith('.gz')):
+        documents.extend(reader.read_documents(os.path.join(PRACTICE2_DATA, filename), is_zipped=True))
+    return [(doc_id.strip(), text.strip()) for doc_id, text in documents]
+
+
+def best_time(function):
+    """Meilleur temps sur REPEAT exécutions (le cache de stem_word est vidé à chaque fois)"""
+    times = []
+    for _ in range(REPEAT):
+        stem_word.cache_clear()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def fused_analyze(documents, stop_words, stemmer):
+    """Analyse fusionnée de tous les documents"""
+    analyzer = Analyzer(stop_words, stemmer)
+    return [analyzer.analyze(text) for _, text in documents]
+
+
+def build(documents, use_stop_words, use_stemmer):
+    index = WeightedInvertedIndex(integer_postings=True)
+    index.stop_word_active = use_stop_words
+    index.stemmer_active = use_stemmer
+    if use_stop_words:
+        with contextlib.redirect_stdout(io.StringIO()):
+            index.load_stop_words(STOP_WORDS_FILE)
+    index.add_documents(documents)
+
+
+def main():
+    """Débit de l'analyse (ancienne chaîne / analyseur fusionné) et de la construction d'index"""
+    documents = load_collection()
+    megabytes = sum(len(text.encode('utf-8')) for _, text in documents) / 1e6
+    stop_words = WeightedInvertedIndex()
+    with contextlib.redirect_stdout(io.StringIO()):
+        stop_words.load_stop_words(STOP_WORDS_FILE)
+
+    print("=" * 60)
+    print(f"ANALYSE : {len(documents)} documents, {megabytes:.1f} Mo")
+    print("=" * 60)
+
+    for use_stop_words, use_stemmer in CONFIGURATIONS:
+        stops = stop_words.stop_words_set if use_stop_words else set()
+        stemmer = stem_word if use_stemmer else None
+        legacy = best_time(lambda: legacy_run(documents, stops, use_stemmer))
+        fused = best_time(lambda: fused_analyze(documents, stops, stemmer))
+        indexing = best_time(lambda: build(documents, use_stop_words, use_stemmer))
+
+        print(f"\nstop words={'oui' if use_stop_words else 'non'}, stemming={'oui' if use_stemmer else 'non'}")
+        for label, seconds in (("ancienne", legacy), ("fusionnée", fused), ("index", indexing)):
+            print(f"- {label:<9}: {seconds:6.3f} s  {len(documents) / seconds:8.0f} docs/s  {megabytes / seconds:6.2f} Mo/s")
+        print(f"- gain analyse : x{legacy / fused:.2f}")
+
+
+if __name__ == "__main__":
+    main()
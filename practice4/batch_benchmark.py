@@ -0,0 +1,62 @@
+import contextlib
+import io
+import random
+import time
+
+from advanced_indexer import WeightedInvertedIndex
+from pruning_benchmark import CACHE_DIR, QUERIES, load_collection
+from ranked_retrieval_optimized import RankedRetrieval
+
+
+TOPIC_COUNT = 300
+TOP_K = 1500
+REPEAT = 3
+
+
+def make_topics(documents, count, seed=0):
+    """Les requêtes TREC puis des pseudo-topics : 2 à 5 mots consécutifs tirés des documents"""
+    generator = random.Random(seed)
+    topics = list(QUERIES)
+    while len(topics) < count:
+        words = generator.choice(documents)[1].split()
+        if len(words) > 5:
+            start = generator.randrange(len(words) - 5)
+            topics.append(" ".join(words[start:start + generator.randint(2, 5)]))
+    return topics
+
+
+def best_time(function):
+    """Meilleur temps sur REPEAT exécutions et dernier résultat"""
+    times = []
+    result = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(REPEAT):
+            start = time.perf_counter()
+            result = function()
+            times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    """Débit de search_query requête par requête et de search_batch sur le même lot"""
+    documents = load_collection()
+    index = WeightedInvertedIndex(integer_postings=True)
+    index.add_documents(documents)
+    ranker = RankedRetrieval(index, cache_dir=CACHE_DIR)
+    topics = make_topics(documents, TOPIC_COUNT)
+
+    print("=" * 60)
+    print(f"LOT DE REQUÊTES : {index.doc_count} documents, {len(topics)} requêtes, top {TOP_K}, sans stop words")
+    print("=" * 60)
+
+    for scheme in ("ltn", "ltc", "bm25"):
+        single, expected = best_time(lambda: [ranker.search_query(topic, scheme, TOP_K) for topic in topics])
+        batch, results = best_time(lambda: ranker.search_batch(topics, scheme, TOP_K))
+        identical = "identique" if results == expected else "DIFFÉRENT"
+        print(f"\n{scheme} ({identical})")
+        print(f"- une par une : {single:6.3f} s  {len(topics) / single:7.1f} requêtes/s")
+        print(f"- en lot      : {batch:6.3f} s  {len(topics) / batch:7.1f} requêtes/s  x{single / batch:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Bitmaps compressés (à la Roaring) de doc ids entiers, en NumPy.
+
+L'espace des doc ids (uint32) est découpé en blocs de 2^16 : un bloc est identifié
+par les 16 bits de poids fort (clé) et ne stocke que les 16 bits de poids faible,
+dans l'un de deux conteneurs selon sa densité :
+    - tableau : uint16 triés, jusqu'à ARRAY_MAX valeurs (2 octets par doc id)
+    - bitset  : 1024 mots uint64 (8 Ko), au-delà de ARRAY_MAX valeurs
+Les deux tailles se croisent à 4096 valeurs : un bloc n'occupe jamais plus de 8 Ko.
+AND, OR et AND-NOT travaillent bloc par bloc (seules les clés communes comptent
+pour AND) avec l'algorithme propre à chaque paire de conteneurs, puis le résultat
+repasse en tableau ou en bitset selon sa taille.
+
+NumPy est une dépendance optionnelle : ce module n'est importé que par la
+recherche booléenne (boolean_search.py) quand des bitmaps sont utilisés.
+Le comptage des bits utilise np.bitwise_count (NumPy >= 2), remplacé par
+np.unpackbits sur les versions antérieures.
+"""
+
+import numpy as np
+
+
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+ARRAY_MAX = 4096
+WORDS = CHUNK_SIZE // 64
+BITWISE_COUNT = hasattr(np, 'bitwise_count')  # NumPy >= 2
+
+
+def _to_bitset(values):
+    """Bitset (uint64[WORDS]) des valeurs uint16 d'un bloc"""
+    bits = np.zeros(CHUNK_SIZE, dtype=np.uint8)
+    bits[values] = 1
+    return np.packbits(bits, bitorder='little').view('<u8')
+
+
+def _to_values(bitset):
+    """Valeurs (uint16 triées) d'un bitset"""
+    return np.flatnonzero(np.unpackbits(bitset.view(np.uint8), bitorder='little')).astype(np.uint16)
+
+
+def _cardinality(container):
+    if container.dtype == np.uint16:
+        return len(container)
+    if BITWISE_COUNT:
+        return int(np.bitwise_count(container).sum())
+    return int(np.unpackbits(container.view(np.uint8)).sum())
+
+
+def _contains(bitset, values):
+    """Masque des valeurs (uint16) présentes dans le bitset"""
+    values = values.astype(np.uint64)
+    return ((bitset[values >> np.uint64(6)] >> (values & np.uint64(63))) & np.uint64(1)).astype(bool)
+
+
+def _shrink(bitset):
+    """Un bitset passé sous ARRAY_MAX valeurs redevient un tableau (None s'il est vide)"""
+    count = _cardinality(bitset)
+    if count == 0:
+        return None
+    return _to_values(bitset) if count <= ARRAY_MAX else bitset
+
+
+def _grow(values):
+    """Un tableau passé au-dessus de ARRAY_MAX valeurs devient un bitset (None s'il est vide)"""
+    if len(values) == 0:
+        return None
+    return _to_bitset(values) if len(values) > ARRAY_MAX else values
+
+
+def _and(a, b):
+    if a.dtype == np.uint16 and b.dtype == np.uint16:
+        return _grow(np.intersect1d(a, b, assume_unique=True))
+    if a.dtype == np.uint16:
+        return _grow(a[_contains(b, a)])
+    if b.dtype == np.uint16:
+        return _grow(b[_contains(a, b)])
+    return _shrink(a & b)
+
+
+def _or(a, b):
+    if a.dtype == np.uint16 and b.dtype == np.uint16:
+        return _grow(np.union1d(a, b))
+    if a.dtype == np.uint16:
+        a, b = b, a
+    result = a.copy()
+    if b.dtype == np.uint16:
+        result |= _to_bitset(b)
+    else:
+        result |= b
+    return result
+
+
+def _and_not(a, b):
+    if a.dtype == np.uint16:
+        if b.dtype == np.uint16:
+            return _grow(np.setdiff1d(a, b, assume_unique=True))
+        return _grow(a[~_contains(b, a)])
+    if b.dtype == np.uint16:
+        b = _to_bitset(b)
+    return _shrink(a & ~b)
+
+
+class RoaringBitmap:
+    """Ensemble de doc ids entiers : clés des blocs triées et conteneurs alignés"""
+
+    def __init__(self, keys=None, containers=None):
+        self.keys = keys or []
+        self.containers = containers or []
+
+    @classmethod
+    def from_sorted(cls, doc_ids):
+        """Bitmap d'une suite croissante de doc ids (array('I'), liste ou tableau NumPy)"""
+        doc_ids = np.asarray(doc_ids, dtype=np.uint32)
+        high = doc_ids >> CHUNK_BITS
+        bounds = np.flatnonzero(np.diff(high)) + 1
+        keys, containers = [], []
+        for start, end in zip(np.concatenate(([0], bounds)), np.concatenate((bounds, [len(doc_ids)]))):
+            if start == end:
+                continue
+            keys.append(int(high[start]))
+            containers.append(_grow((doc_ids[start:end] & 0xFFFF).astype(np.uint16)))
+        return cls(keys, containers)
+
+    @classmethod
+    def full(cls, doc_count):
+        """Tous les doc ids de 0 à doc_count - 1"""
+        return cls.from_sorted(np.arange(doc_count, dtype=np.uint32))
+
+    def __len__(self):
+        return sum(_cardinality(container) for container in self.containers)
+
+    def _combine(self, other, operation, keep_self, keep_other):
+        """Applique operation aux blocs de même clé ; keep_* : garder les blocs d'un seul côté"""
+        keys, containers = [], []
+        i = j = 0
+        while i < len(self.keys) or j < len(other.keys):
+            key_a = self.keys[i] if i < len(self.keys) else None
+            key_b = other.keys[j] if j < len(other.keys) else None
+            if key_b is None or (key_a is not None and key_a < key_b):
+                if keep_self:
+                    keys.append(key_a)
+                    containers.append(self.containers[i])
+                i += 1
+            elif key_a is None or key_b < key_a:
+                if keep_other:
+                    keys.append(key_b)
+                    containers.append(other.containers[j])
+                j += 1
+            else:
+                container = operation(self.containers[i], other.containers[j])
+                if container is not None:
+                    keys.append(key_a)
+                    containers.append(container)
+                i += 1
+                j += 1
+        return RoaringBitmap(keys, containers)
+
+    def __and__(self, other):
+        return self._combine(other, _and, False, False)
+
+    def __or__(self, other):
+        return self._combine(other, _or, True, True)
+
+    def __sub__(self, other):
+        return self._combine(other, _and_not, True, False)
+
+    def flip(self, doc_count):
+        """Complément dans [0, doc_count)"""
+        return RoaringBitmap.full(doc_count) - self
+
+    def contains(self, doc_ids):
+        """Masque des doc ids (tableau croissant) présents dans le bitmap"""
+        doc_ids = np.asarray(doc_ids, dtype=np.uint32)
+        mask = np.zeros(len(doc_ids), dtype=bool)
+        high = doc_ids >> CHUNK_BITS
+        for key, container in zip(self.keys, self.containers):
+            start, end = np.searchsorted(high, [key, key + 1])
+            if start == end:
+                continue
+            values = (doc_ids[start:end] & 0xFFFF).astype(np.uint16)
+            if container.dtype == np.uint16:
+                mask[start:end] = np.isin(values, container, assume_unique=True)
+            else:
+                mask[start:end] = _contains(container, values)
+        return mask
+
+    def chunks(self):
+        """Doc ids (uint32 croissants) bloc par bloc"""
+        for key, container in zip(self.keys, self.containers):
+            values = container if container.dtype == np.uint16 else _to_values(container)
+            yield (np.uint32(key) << np.uint32(CHUNK_BITS)) | values.astype(np.uint32)
+
+    def to_array(self):
+        """Tous les doc ids, en tableau uint32 croissant"""
+        chunks = list(self.chunks())
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.uint32)
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            yield from chunk.tolist()
+
+    def memory_size(self):
+        """Octets occupés par les conteneurs"""
+        return sum(container.nbytes for container in self.containers)
@@ -0,0 +1,66 @@
+"""
+Balayage des paramètres (k1, b) de bm25 sur une série de requêtes.
+
+Les postings (doc ids et tfs) des termes des requêtes et leur idf sont lus une
+seule fois pour toute la grille ; chaque point de la grille ne recalcule que la
+normalisation de longueur de ses (k1, b) (un tableau par document, voir
+WeightTables.length_norms) et les poids, puis écrit son propre run TREC.
+Les résultats d'un point sont identiques à search_query(..., "bm25") avec ces (k1, b).
+"""
+
+import os
+
+from scoring import accumulate, select_top_k
+from trec_run import next_run_id, run_file_name, write_run
+
+
+def sweep_results(ranker, queries, k1_values, b_values, top_k=1500):
+    """
+    Générateur de ((k1, b), [(query id, [(docno, score), ...]), ...]) pour chaque point
+    de la grille k1_values x b_values ; queries associe un query id à son texte.
+    """
+    tables = ranker.weight_tables()
+    query_terms = [(query_id, ranker.process_query_terms(query)) for query_id, query in queries.items()]
+
+    # Postings des termes de la série, lus une fois pour toute la grille
+    postings = {}
+    for _, terms in query_terms:
+        for term in terms:
+            if term in ranker.df and term not in postings:
+                term_postings = ranker.index.get_posting_list(term)
+                postings[term] = (term_postings.doc_ids(), term_postings.tfs())
+
+    doc_ids = ranker.index.doc_ids
+    for k1 in k1_values:
+        for b in b_values:
+            kept = (k1, b) == (ranker.k1, ranker.b)  # normalisation du ranker, gardée pour search_query
+            results = []
+            for query_id, terms in query_terms:
+                weighted_postings = []
+                for term in terms:
+                    if term in postings:
+                        doc_numbers, tfs = postings[term]
+                        weigh = ranker.posting_weigher(term, "bm25", k1, b)
+                        weighted_postings.append(zip(doc_numbers, map(weigh, doc_numbers, tfs)))
+                top_docs = select_top_k(accumulate(weighted_postings), top_k)
+                results.append((query_id, [(doc_ids[doc_number], score) for doc_number, score in top_docs]))
+            if not kept:
+                tables.discard_length_norms(k1, b)
+            yield (k1, b), results
+
+
+def sweep(ranker, queries, k1_values=(0.6, 0.9, 1.2, 1.5, 1.8, 2.1), b_values=(0.3, 0.45, 0.6, 0.75, 0.9),
+          top_k=1500, run_dir="runs"):
+    """
+    Écrit un run TREC par point de la grille dans run_dir (numérotés à la suite des
+    runs existants) et renvoie la liste des (k1, b, chemin du run)
+    """
+    os.makedirs(run_dir, exist_ok=True)
+    run_id = next_run_id(run_dir)
+    written = []
+    for (k1, b), results in sweep_results(ranker, queries, k1_values, b_values, top_k):
+        path = os.path.join(run_dir, run_file_name(ranker.index, "bm25", run_id, k1, b))
+        write_run(path, results)
+        written.append((k1, b, path))
+        run_id += 1
+    return written
@@ -0,0 +1,215 @@
+"""
+Recherche booléenne sur un WeightedInvertedIndex (doc ids entiers denses).
+
+Les requêtes sont compilées comme dans practice1 (query_planner : priorités,
+parenthèses, AND rangés par df croissant, NOT en différences). Chaque liste de
+postings a l'une de deux représentations, choisie selon sa densité df / N :
+    - tableau NumPy uint32 trié, pour les termes rares : AND par recherche
+      dichotomique des éléments de la plus courte liste dans les autres (np.searchsorted)
+    - RoaringBitmap (bitmaps.py), à partir de bitmap_density : AND, OR et AND-NOT
+      par blocs de 2^16 doc ids, sur des bitsets pour les blocs denses
+Les opérateurs acceptent les deux représentations mélangées : un tableau est
+filtré par les bitmaps (test d'appartenance), un résultat de bitmaps redevient
+un tableau s'il est peu dense. bitmap_density=None garde partout les tableaux.
+
+Phrases ("a b") et proximité ("a b"~k) demandent un index construit avec
+positions=True : les positions ne sont décodées que pour les documents qui
+contiennent tous les mots (voir proximity.py).
+
+Ce module demande NumPy, qui reste une dépendance optionnelle de practice4 :
+seuls les scripts de recherche booléenne l'importent. bitmaps.py n'est importé
+que si bitmap_density est fixé.
+"""
+
+from itertools import islice
+
+import numpy as np
+
+from proximity import match_phrase, min_window
+from query_planner import Planner, parse_query
+
+
+BITMAP_DENSITY = 1 / 16  # df / N à partir duquel une liste est représentée en bitmap
+EMPTY = np.empty(0, dtype=np.uint32)
+
+
+def _members(doc_ids, sorted_list):
+    """Masque des doc ids (tableau trié) présents dans sorted_list (tableau trié)"""
+    if len(sorted_list) == 0:
+        return np.zeros(len(doc_ids), dtype=bool)
+    positions = np.minimum(np.searchsorted(sorted_list, doc_ids), len(sorted_list) - 1)
+    return sorted_list[positions] == doc_ids
+
+
+def _is_bitmap(postings):
+    """Vrai pour un RoaringBitmap (les autres listes sont des tableaux NumPy)"""
+    return not isinstance(postings, np.ndarray)
+
+
+class BooleanSearch:
+    def __init__(self, index, bitmap_density=BITMAP_DENSITY):
+        self.index = index
+        self.bitmap_density = bitmap_density
+        self._roaring = None
+        if bitmap_density is not None:
+            from bitmaps import RoaringBitmap  # import paresseux : seulement avec des bitmaps
+            self._roaring = RoaringBitmap
+        self._postings = {}  # terme de la requête -> tableau ou bitmap
+        self._generation = index.generation
+
+    def is_dense(self, size):
+        """Vrai si une liste de size documents est représentée en bitmap"""
+        return self.bitmap_density is not None and size >= self.bitmap_density * self.index.doc_count
+
+    def _index_terms(self, term):
+        """Terms de l'index d'un terme de la requête (tokenisation, stop words, stemming de l'index)"""
+        return self.index.process_tokens(self.index.apply_tokenization(term))
+
+    def document_frequency(self, term):
+        """df d'un terme de la requête (le plus petit df s'il donne plusieurs terms)"""
+        terms = self._index_terms(term)
+        return min((self.index.get_document_frequency(index_term) for index_term in terms), default=0)
+
+    def phrase_words(self, text):
+        """Couples (mot, rang dans la phrase) des mots de la phrase qui donnent un term de l'index"""
+        return [(word, offset) for offset, word in enumerate(self.index.apply_tokenization(text))
+                if self._index_terms(word)]
+
+    def postings(self, term):
+        """Liste d'un terme de la requête dans sa représentation (tableau ou bitmap), gardée en cache"""
+        if self._generation != self.index.generation:
+            self._postings = {}
+            self._generation = self.index.generation
+        if term not in self._postings:
+            lists = []
+            for index_term in self._index_terms(term):
+                doc_ids = np.frombuffer(self.index.get_posting_list(index_term).doc_ids(), dtype=np.uint32)
+                lists.append(self._roaring.from_sorted(doc_ids) if self.is_dense(len(doc_ids)) else doc_ids)
+            self._postings[term] = self.intersect(lists) if lists else EMPTY
+        return self._postings[term]
+
+    def _adapt(self, bitmap):
+        """Un bitmap résultat peu dense redevient un tableau (algorithmes de listes triées)"""
+        return bitmap if self.is_dense(len(bitmap)) else bitmap.to_array()
+
+    def intersect(self, lists):
+        """
+        AND de n listes. Les tableaux sont intersectés d'abord, à partir du plus court
+        (ses doc ids sont cherchés dans les autres), puis filtrés par les bitmaps ;
+        sans tableau, les bitmaps sont combinés bloc par bloc.
+        """
+        arrays = sorted((postings for postings in lists if not _is_bitmap(postings)), key=len)
+        bitmaps = sorted((postings for postings in lists if _is_bitmap(postings)), key=len)
+        if arrays:
+            result = arrays[0]
+            for other in arrays[1:]:
+                result = result[_members(result, other)]
+            for bitmap in bitmaps:
+                result = result[bitmap.contains(result)]
+            return result
+        result = bitmaps[0]
+        for bitmap in bitmaps[1:]:
+            result = result & bitmap
+        return self._adapt(result)
+
+    def union(self, lists):
+        """OR de n listes : fusion de tableaux, ou OR de bitmaps si le résultat est dense"""
+        if any(_is_bitmap(postings) for postings in lists) \
+                or self.is_dense(sum(len(postings) for postings in lists)):
+            result = self._roaring()
+            for postings in lists:
+                result = result | (postings if _is_bitmap(postings) else self._roaring.from_sorted(postings))
+            return self._adapt(result)
+        return np.unique(np.concatenate(lists)) if lists else EMPTY
+
+    def subtract(self, postings, excluded_lists):
+        """postings privée des documents de toutes les listes excluded_lists"""
+        if _is_bitmap(postings):
+            for excluded in excluded_lists:
+                if not _is_bitmap(excluded):
+                    excluded = self._roaring.from_sorted(excluded)
+                postings = postings - excluded
+            return self._adapt(postings)
+        for excluded in excluded_lists:
+            if _is_bitmap(excluded):
+                postings = postings[~excluded.contains(postings)]
+            else:
+                postings = postings[~_members(postings, excluded)]
+        return postings
+
+    def NOT(self, postings):
+        """Tous les documents sauf ceux de la liste"""
+        if self._roaring is None:
+            kept = np.ones(self.index.doc_count, dtype=bool)
+            kept[postings] = False
+            return np.flatnonzero(kept).astype(np.uint32)
+        if not _is_bitmap(postings):
+            postings = self._roaring.from_sorted(postings)
+        return self._adapt(postings.flip(self.index.doc_count))
+
+    def complement(self, postings):
+        """Doc ids absents de la liste, produits paresseusement (trous entre ses doc ids)"""
+        start = 0
+        for doc_number in (postings if _is_bitmap(postings) else postings.tolist()):
+            yield from range(start, doc_number)
+            start = doc_number + 1
+        yield from range(start, self.index.doc_count)
+
+    def match_positions(self, candidates, words, offsets, slop=0):
+        """
+        Candidats (qui contiennent déjà tous les mots) où les mots forment la phrase
+        (slop 0) ou tiennent dans une fenêtre de l'étendue de la phrase + slop
+        """
+        doc_numbers = self._doc_numbers(candidates)
+        if not doc_numbers:
+            return EMPTY
+        terms = [self._index_terms(word)[0] for word in words]
+        if slop:
+            distinct = list(dict.fromkeys(terms))
+            width = offsets[-1] - offsets[0] + slop
+            lists = [self.index.get_positions(term, doc_numbers) for term in distinct]
+            kept = [doc_number for doc_number, *positions in zip(doc_numbers, *lists)
+                    if min_window(positions, width) <= width]
+        else:
+            lists = {term: self.index.get_positions(term, doc_numbers) for term in set(terms)}
+            kept = [doc_number for i, doc_number in enumerate(doc_numbers)
+                    if match_phrase([lists[term][i] for term in terms], offsets)]
+        result = np.array(kept, dtype=np.uint32)
+        return self._roaring.from_sorted(result) if self.is_dense(len(result)) else result
+
+    def AND(self, list1_of_doc, list2_of_doc):
+        return self.intersect([list1_of_doc, list2_of_doc])
+
+    def OR(self, list1_of_doc, list2_of_doc):
+        return self.union([list1_of_doc, list2_of_doc])
+
+    def AND_NOT(self, list1_of_doc, list2_of_doc):
+        return self.subtract(list1_of_doc, [list2_of_doc])
+
+    def compile(self, query):
+        """Plan d'exécution de la requête (voir query_planner)"""
+        return Planner(self).compile(parse_query(query))
+
+    def explain(self, query):
+        """Affiche (et renvoie) le plan choisi pour la requête avec ses coûts estimés"""
+        plan = "\n".join(self.compile(query).lines())
+        print(plan)
+        return plan
+
+    def _doc_numbers(self, postings):
+        return (postings.to_array() if _is_bitmap(postings) else postings).tolist()
+
+    def parse_boolean_query(self, query):
+        """Docnos des documents de la requête, par doc id croissant"""
+        doc_ids = self.index.doc_ids
+        return [doc_ids[doc_number] for doc_number in self._doc_numbers(self.compile(query).evaluate(self))]
+
+    def iter_boolean_query(self, query):
+        """Docnos de la requête produits à la demande (un NOT reste paresseux)"""
+        doc_ids = self.index.doc_ids
+        for doc_number in self.compile(query).iterate(self):
+            yield doc_ids[doc_number]
+
+    def get_page(self, query, page=1, page_size=10):
+        """Page de résultats d'une requête (numérotée à partir de 1), sans calculer les suivantes"""
+        return list(islice(self.iter_boolean_query(query), (page - 1) * page_size, page * page_size))
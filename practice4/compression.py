@@ -0,0 +1,172 @@
+"""
+Codes d'entiers pour la compression des postings.
+
+Toutes les fonctions encodent une suite d'entiers positifs (>= 1 pour gamma et delta)
+en bytes, et les décodeurs sont des générateurs : une liste peut être parcourue
+sans jamais être décompressée entièrement (gamma et delta avancent un curseur de
+bits dans les octets, le début d'une liste ne coûte que les octets de ses codes).
+
+- vbyte : 7 bits utiles par octet, le bit de poids fort marque le dernier octet
+- gamma : Elias gamma, N zéros puis les N+1 bits de n (N = floor(log2 n))
+- delta : Elias delta, gamma(nombre de bits de n) puis les bits de n sans le 1 de tête
+"""
+
+
+def vbyte_encode(numbers):
+    """Variable byte : renvoie les entiers encodés en bytes"""
+    out = bytearray()
+    for n in numbers:
+        chunk = bytearray()
+        while True:
+            chunk.insert(0, n & 127)
+            if n < 128:
+                break
+            n >>= 7
+        chunk[-1] |= 128
+        out += chunk
+    return bytes(out)
+
+
+def vbyte_decode(data, count=None):
+    """Décode paresseusement au plus count entiers (tous si count vaut None)"""
+    if count == 0:
+        return
+    n = 0
+    for byte in data:
+        if byte < 128:
+            n = (n << 7) | byte
+        else:
+            yield (n << 7) | (byte - 128)
+            if count is not None:
+                count -= 1
+                if count == 0:
+                    return
+            n = 0
+
+
+def _bits_to_bytes(bits):
+    """Chaîne de '0'/'1' -> bytes (complétée par des zéros à droite)"""
+    bits += '0' * (-len(bits) % 8)
+    return int(bits, 2).to_bytes(len(bits) // 8, 'big') if bits else b''
+
+
+def _bytes_to_bits(data):
+    """Inverse de _bits_to_bytes (les zéros de complément restent en fin de chaîne)"""
+    return bin(int.from_bytes(data, 'big'))[2:].zfill(8 * len(data)) if data else ''
+
+
+def _gamma_bits(n):
+    binary = bin(n)[2:]
+    return '0' * (len(binary) - 1) + binary
+
+
+def gamma_encode(numbers):
+    """Elias gamma (n >= 1)"""
+    return _bits_to_bytes(''.join(_gamma_bits(n) for n in numbers))
+
+
+CHUNK = 8  # octets chargés à la fois dans le tampon des décodeurs bit à bit
+
+
+def _fill(data, position, buffer, size, need):
+    """
+    Recharge le tampon de bits (entier buffer de size bits, lus à partir de l'octet
+    position de data) CHUNK octets à la fois, jusqu'à ce qu'il ait au moins need bits
+    """
+    while size < need:
+        chunk = data[position:position + CHUNK]
+        if not chunk:
+            raise ValueError(f"Données compressées tronquées à l'octet {position}")
+        buffer = (buffer << 8 * len(chunk)) | int.from_bytes(chunk, 'big')
+        size += 8 * len(chunk)
+        position += CHUNK
+    return position, buffer, size
+
+
+def _elias_decode(data, count, delta):
+    """
+    Décodeur gamma (ou delta) avec un curseur de bits sur data : seuls les octets des
+    codes lus sont chargés, sans construire la chaîne de bits de toute la liste
+    """
+    position = buffer = size = 0
+    for _ in range(count):
+        # Zéros de tête : un tampon nul n'a que des zéros, on le vide et on recharge
+        zeros = 0
+        while buffer == 0:
+            zeros += size
+            position, buffer, size = _fill(data, position, 0, 0, 1)
+        top = buffer.bit_length()
+        zeros += size - top
+        size = top
+
+        # Les zeros + 1 bits qui suivent, à partir du 1 de tête
+        if size <= zeros:
+            position, buffer, size = _fill(data, position, buffer, size, zeros + 1)
+        size -= zeros + 1
+        n = buffer >> size
+        buffer &= (1 << size) - 1
+
+        if delta:
+            # n est le nombre de bits de l'entier, dont les n - 1 derniers suivent
+            length = n - 1
+            if size < length:
+                position, buffer, size = _fill(data, position, buffer, size, length)
+            size -= length
+            n = (1 << length) | (buffer >> size)
+            buffer &= (1 << size) - 1
+        yield n
+
+
+def gamma_decode(data, count):
+    """Décode paresseusement count entiers (le complément final est ignoré)"""
+    return _elias_decode(data, count, delta=False)
+
+
+def _delta_bits(n):
+    binary = bin(n)[2:]
+    return _gamma_bits(len(binary)) + binary[1:]
+
+
+def delta_encode(numbers):
+    """Elias delta (n >= 1)"""
+    return _bits_to_bytes(''.join(_delta_bits(n) for n in numbers))
+
+
+def delta_decode(data, count):
+    """Décode paresseusement count entiers (le complément final est ignoré)"""
+    return _elias_decode(data, count, delta=True)
+
+
+def _gamma_length(n):
+    return 2 * n.bit_length() - 1
+
+
+def _delta_length(n):
+    length = n.bit_length()
+    return _gamma_length(length) + length - 1
+
+
+def bit_length(numbers, encoding):
+    """Nombre de bits des codes gamma ou delta de numbers (sans le complément final)"""
+    return sum(map(BIT_LENGTHS[encoding], numbers))
+
+
+def append_bits(data, length, numbers, encoding):
+    """
+    Ajoute les codes gamma ou delta de numbers à la suite des length premiers bits de
+    data (bytearray, complément final à zéro) et renvoie la nouvelle longueur en bits.
+    Seul le dernier octet, s'il est incomplet, est réécrit.
+    """
+    bits = ''.join(map(BIT_CODES[encoding], numbers))
+    used = length % 8
+    if used:
+        bits = _bytes_to_bits(data[-1:])[:used] + bits
+        del data[-1]
+    data += _bits_to_bytes(bits)
+    return length - used + len(bits)
+
+
+ENCODERS = {'vbyte': vbyte_encode, 'gamma': gamma_encode, 'delta': delta_encode}
+DECODERS = {'vbyte': vbyte_decode, 'gamma': gamma_decode, 'delta': delta_decode}
+BIT_CODES = {'gamma': _gamma_bits, 'delta': _delta_bits}
+BIT_LENGTHS = {'gamma': _gamma_length, 'delta': _delta_length}
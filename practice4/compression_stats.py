@@ -0,0 +1,51 @@
+import contextlib
+import io
+import os
+
+from advanced_indexer import WeightedInvertedIndex
+from postings import CompressedPostingList
+
+
+PRACTICE2_DATA = "../practice2/data/Practice_02_data"
+ENCODINGS = ["vbyte", "gamma", "delta"]
+
+
+def measure_compression(filename):
+    """Indexe un fichier et mesure la taille des postings bruts et compressés"""
+    index = WeightedInvertedIndex(integer_postings=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        index.build_index(filename, is_zipped=True)
+
+    postings_count = sum(postings.document_frequency() for postings in index.dictionary.values())
+    sizes = {"raw": 8 * postings_count}  # deux uint32 par posting (doc id, tf)
+
+    for encoding in ENCODINGS:
+        total = 0
+        for postings in index.dictionary.values():
+            compressed = CompressedPostingList.from_postings(postings, encoding)
+            total += compressed.nbytes()
+        sizes[encoding] = total
+
+    return index.doc_count, postings_count, sizes
+
+
+def main():
+    """Compare la taille des postings bruts et compressés sur les collections de practice2"""
+    gz_files = sorted(f for f in os.listdir(PRACTICE2_DATA) if f.endswith('.gz'))
+
+    print("=" * 60)
+    print("COMPRESSION DES POSTINGS (écarts + tfs)")
+    print("=" * 60)
+
+    for i, filename in enumerate(gz_files, 1):
+        doc_count, postings_count, sizes = measure_compression(os.path.join(PRACTICE2_DATA, filename))
+        print(f"\nfile{i}: {doc_count} docs, {postings_count} postings")
+        print(f"- brut  : {sizes['raw']:>9} octets (64.00 bits/posting)")
+        for encoding in ENCODINGS:
+            ratio = sizes[encoding] / sizes['raw']
+            bits = 8 * sizes[encoding] / postings_count
+            print(f"- {encoding:<6}: {sizes[encoding]:>9} octets ({bits:5.2f} bits/posting, {ratio:.1%} du brut)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import contextlib
+import io
+import time
+
+from advanced_indexer import WeightedInvertedIndex
+from pruning_benchmark import CACHE_DIR, QUERIES, load_collection
+from ranked_retrieval_optimized import RankedRetrieval
+
+
+BUDGETS = [None, 4000, 2000, 1000, 500, 200]
+TOP_K = (10, 100)
+REPEAT = 5
+
+
+def latencies(search):
+    """Meilleur temps de chaque requête sur REPEAT passes (secondes)"""
+    best = [float('inf')] * len(QUERIES)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(REPEAT):
+            for i, query in enumerate(QUERIES):
+                start = time.perf_counter()
+                search(query)
+                best[i] = min(best[i], time.perf_counter() - start)
+    return best
+
+
+def overlap(results, reference):
+    """Part des documents du classement exact retrouvés (rappel du top-k exact)"""
+    expected = {doc_id for doc_id, _ in reference}
+    return len(expected & {doc_id for doc_id, _ in results}) / len(expected) if expected else 1.0
+
+
+def main():
+    """Score-at-a-time sur postings quantifiés : latence moyenne / pire cas et écart au classement exact"""
+    index = WeightedInvertedIndex(integer_postings=True)
+    index.add_documents(load_collection())
+    ranker = RankedRetrieval(index, cache_dir=CACHE_DIR)
+
+    print("=" * 60)
+    print(f"IMPACTS 8 BITS : {index.doc_count} documents, {len(QUERIES)} requêtes, sans stop words")
+    print("=" * 60)
+
+    for scheme in ("ltn", "bm25"):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            impact_index = ranker.build_impact_index(scheme)
+            build_time = time.perf_counter() - start
+            exact = {top_k: [ranker.search_query(query, scheme, top_k) for query in QUERIES] for top_k in TOP_K}
+
+        print(f"\n{scheme} : construction {build_time:.2f} s, {impact_index.posting_count()} postings, "
+              f"{impact_index.memory_size() / 1e6:.2f} Mo")
+        times = latencies(lambda query: ranker.search_query(query, scheme, 10))
+        print(f"- exact    : {sum(times) / len(times) * 1000:6.2f} ms/requête (pire {max(times) * 1000:6.2f} ms)")
+
+        for budget in BUDGETS:
+            times = latencies(lambda query: ranker.search_impacts(query, impact_index, 10, budget))
+            recalls = []
+            with contextlib.redirect_stdout(io.StringIO()):
+                for top_k in TOP_K:
+                    results = [ranker.search_impacts(query, impact_index, top_k, budget) for query in QUERIES]
+                    recalls.append(sum(map(overlap, results, exact[top_k])) / len(QUERIES))
+            label = "complet" if budget is None else f"{budget} p."
+            print(f"- {label:<9}: {sum(times) / len(times) * 1000:6.2f} ms/requête (pire {max(times) * 1000:6.2f} ms)"
+                  f"  rappel top 10 {recalls[0]:.3f}  top 100 {recalls[1]:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Postings ordonnés par impact, pour l'évaluation score-at-a-time (SAAT).
+
+Pour un schéma de pondération fixé (ltn, ltc ou bm25), le poids d'un posting ne
+dépend que de (term, document) : il est calculé une fois à la construction, puis
+quantifié sur 8 bits (impact entier de 1 à 255, même échelle pour tous les terms).
+Les postings d'un term sont regroupés en segments d'impact égal, rangés par impact
+décroissant (doc ids croissants dans un segment) :
+    impacts  array('B') : impact de chaque segment
+    ends     array('I') : fin de chaque segment dans doc_ids
+    doc_ids  array('I') : doc ids entiers de tous les segments
+
+Une requête traite les segments de tous ses terms par impact décroissant en
+ajoutant des entiers dans l'accumulateur. Les postings les plus utiles passent
+en premier : on peut s'arrêter après un budget de postings (requête « anytime »)
+et le coût d'une requête est borné quelle que soit la longueur des listes.
+
+Les scores sont approchés (quantification, poids négatifs de bm25 ignorés,
+égalités plus fréquentes) : impact_benchmark.py mesure l'écart au classement exact.
+"""
+
+import heapq
+from array import array
+
+
+class ImpactIndex:
+    """Postings quantifiés et triés par impact d'un index pour un schéma de pondération"""
+
+    def __init__(self, weighting_scheme, scale, bits=8):
+        self.weighting_scheme = weighting_scheme
+        self.scale = scale  # impact = poids * scale, arrondi
+        self.bits = bits
+        self.segments = {}  # term -> (impacts, ends, doc_ids)
+
+    @classmethod
+    def build(cls, ranker, weighting_scheme="bm25", bits=8):
+        """
+        Précalcule et quantifie les poids de tous les postings de l'index du ranker
+        (RankedRetrieval) avec ses formules. Les poids <= 0 sont ignorés.
+        """
+        if weighting_scheme == "ltc" and ranker._cosine_norms_cache is None:
+            ranker._load_or_compute_cosine_norms()
+        index = ranker.index
+        levels = (1 << bits) - 1
+
+        def weighted_postings(term):
+            postings = index.get_posting_list(term)
+            doc_numbers = postings.doc_ids()
+            return zip(doc_numbers, map(ranker.posting_weigher(term, weighting_scheme), doc_numbers, postings.tfs()))
+
+        # Première passe : plus grand poids de la collection, qui fixe l'échelle
+        max_weight = 0.0
+        for term in index.dictionary:
+            max_weight = max(max_weight, max((weight for _, weight in weighted_postings(term)), default=0.0))
+        impact_index = cls(weighting_scheme, levels / max_weight if max_weight > 0 else 0.0, bits)
+
+        for term in index.dictionary:
+            impacts = sorted((-min(levels, max(1, round(weight * impact_index.scale))), doc_number)
+                             for doc_number, weight in weighted_postings(term) if weight > 0)
+            if impacts:
+                impact_index.add_term(term, impacts)
+        return impact_index
+
+    def add_term(self, term, impacts):
+        """Range les couples (-impact, doc id entier), triés, d'un term en segments"""
+        segment_impacts = array('B')
+        ends = array('I')
+        doc_ids = array('I', (doc_number for _, doc_number in impacts))
+        for position, (negative_impact, _) in enumerate(impacts):
+            if not segment_impacts or segment_impacts[-1] != -negative_impact:
+                if segment_impacts:
+                    ends.append(position)
+                segment_impacts.append(-negative_impact)
+        ends.append(len(doc_ids))
+        self.segments[term] = (segment_impacts, ends, doc_ids)
+
+    def posting_count(self):
+        """Nombre de postings stockés (poids > 0)"""
+        return sum(len(doc_ids) for _, _, doc_ids in self.segments.values())
+
+    def memory_size(self):
+        """Taille en octets des tableaux de segments"""
+        return sum(impacts.itemsize * len(impacts) + ends.itemsize * len(ends) + doc_ids.itemsize * len(doc_ids)
+                   for impacts, ends, doc_ids in self.segments.values())
+
+    def search(self, terms, top_k=10, posting_budget=None):
+        """
+        Score-at-a-time : les segments des terms sont traités par impact décroissant
+        (à impact égal dans l'ordre des terms), au plus posting_budget postings si
+        un budget est donné. Renvoie (top-k [(doc id entier, score déquantifié)], compteurs) ;
+        à score égal le plus petit doc id passe devant.
+        """
+        segments = []
+        for term_position, term in enumerate(terms):
+            if term not in self.segments:
+                continue
+            impacts, ends, doc_ids = self.segments[term]
+            start = 0
+            for impact, end in zip(impacts, ends):
+                segments.append((-impact, term_position, start, end, doc_ids))
+                start = end
+        segments.sort(key=lambda segment: segment[:2])
+        total = sum(end - start for _, _, start, end, _ in segments)
+
+        accumulator = {}
+        get = accumulator.get
+        remaining = total if posting_budget is None else min(total, posting_budget)
+        processed = 0
+        for negative_impact, _, start, end, doc_ids in segments:
+            if remaining <= 0:
+                break
+            end = min(end, start + remaining)
+            for doc_number in doc_ids[start:end]:
+                accumulator[doc_number] = get(doc_number, 0) - negative_impact
+            remaining -= end - start
+            processed += end - start
+
+        top_docs = heapq.nlargest(top_k, accumulator.items(), key=lambda item: (item[1], -item[0]))
+        stats = {
+            'postings': total,  # postings des terms de la requête
+            'postings_scored': processed,  # postings ajoutés à l'accumulateur
+            'documents_scored': len(accumulator),
+        }
+        return [(doc_number, impact / self.scale) for doc_number, impact in top_docs], stats
@@ -0,0 +1,423 @@
+"""
+Format binaire d'un WeightedInvertedIndex sur disque.
+
+    [en-tête][table des sections][docnos][doc_lengths][terms][dfs][offsets][doc ids][tfs][tokens][stop words]
+    [normes][empreinte][sources]
+
+- docnos, terms, tokens et stop words : chaînes utf-8 séparées par '\\n'
+- terms est trié : la recherche d'un terme se fait par dichotomie, sans construire de dict
+- dfs (uint32) et offsets (uint64, V+1 valeurs) sont alignés sur terms
+- doc ids et tfs (uint32) sont deux tableaux contigus : les postings du terme i
+  occupent les positions offsets[i]..offsets[i+1] des deux tableaux
+- si les postings sont compressés (encodage noté dans l'en-tête), la section doc ids
+  contient à la place les listes compressées bout à bout (voir CompressedPostingList),
+  offsets est alors en octets et la section tfs est vide
+- un doc id est la position du document dans doc_ids (ordre d'ingestion)
+- normes : normes cosinus (ltc) des documents en float32, par doc id, présentes si
+  l'index les suit (drapeau FLAG_COSINE_NORMS) : ltc n'a pas à les recalculer au chargement
+- empreinte : empreinte du contenu de l'index (voir ContentFingerprint), indépendante
+  de l'encodage des postings ; elle identifie le contenu pour lequel les normes ont été calculées
+- sources : signatures (nom, taille, date de modification) des fichiers de la collection
+  indexés avec add_file, pour savoir si un index sauvegardé est encore à jour
+
+Les tableaux sont écrits dans l'ordre d'octets de la machine (noté dans l'en-tête).
+"""
+
+import hashlib
+import mmap
+import os
+import shutil
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from postings import CompressedPostingList, PostingList
+
+
+MAGIC = b'WIDX'
+VERSION = 4
+HEADER = struct.Struct('<4sHBBBIIQQQd')
+SECTIONS = ('docnos', 'doc_lengths', 'terms', 'dfs', 'offsets', 'doc_ids', 'tfs', 'tokens', 'stop_words',
+            'norms', 'fingerprint', 'sources')
+SECTION = struct.Struct('<QQ')  # (offset, taille) en octets
+ALIGNMENT = 8
+COPY_BUFFER_SIZE = 1 << 20
+
+FLAG_STOP_WORDS = 1
+FLAG_STEMMER = 2
+FLAG_INTEGER_POSTINGS = 4
+FLAG_COSINE_NORMS = 8
+
+ENCODINGS = (None, 'vbyte', 'gamma', 'delta')  # code de l'encodage dans l'en-tête
+
+
+def _encode_strings(strings):
+    """Concatène des chaînes en un bloc utf-8 séparé par des retours à la ligne"""
+    return '\n'.join(strings).encode('utf-8')
+
+
+def _decode_strings(data):
+    """Inverse de _encode_strings"""
+    data = bytes(data)
+    return data.decode('utf-8').split('\n') if data else []
+
+
+class ContentFingerprint:
+    """
+    Empreinte (blake2b, 128 bits) du contenu d'un index : docnos, longueurs des documents
+    puis, dans l'ordre des terms, chaque term avec ses doc ids et ses tfs bruts.
+    Deux index de même contenu ont la même empreinte, quels que soient leur mode
+    (entier ou dict) et l'encodage de leurs postings.
+    """
+
+    def __init__(self, doc_ids, doc_lengths):
+        self._hash = hashlib.blake2b(digest_size=16)
+        self._hash.update(_encode_strings(doc_ids))
+        self._hash.update(doc_lengths.tobytes())
+
+    def add_term(self, term, doc_ids, tfs):
+        """Ajoute un term et ses postings (array('I')) ; les terms doivent arriver triés"""
+        encoded = term.encode('utf-8')
+        self._hash.update(struct.pack('<II', len(encoded), len(doc_ids)))
+        self._hash.update(encoded)
+        self._hash.update(doc_ids.tobytes())
+        self._hash.update(tfs.tobytes())
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+def source_signature(path):
+    """Signature d'un fichier de la collection : nom, taille et date de modification (ns)"""
+    stat = os.stat(path)
+    return f"{os.path.basename(path)} {stat.st_size} {stat.st_mtime_ns}"
+
+
+def write_index(index, path, encoding=None):
+    """
+    Écrit l'index dans un fichier binaire (voir le format en tête de module).
+    encoding : None pour des postings bruts, sinon 'vbyte', 'gamma' ou 'delta'.
+    """
+    terms = sorted(index.dictionary.keys())
+
+    fingerprint = ContentFingerprint(index.doc_ids, index.get_doc_length_array())
+    dfs = array('I')
+    offsets = array('Q', [0])
+    posting_doc_ids = array('I')
+    posting_tfs = array('I')
+    compressed_postings = bytearray()
+    for term in terms:
+        postings = index.get_posting_list(term)
+        dfs.append(postings.document_frequency())
+        fingerprint.add_term(term, postings.doc_ids(), postings.tfs())
+        if encoding is None:
+            posting_doc_ids.extend(postings.doc_ids())
+            posting_tfs.extend(postings.tfs())
+            offsets.append(len(posting_doc_ids))
+        else:
+            if not (isinstance(postings, CompressedPostingList) and postings.encoding == encoding):
+                postings = CompressedPostingList.from_postings(postings, encoding)
+            compressed_postings += postings.data
+            offsets.append(len(compressed_postings))
+
+    write_sections(index, path, terms, dfs, offsets,
+                   posting_doc_ids.tobytes() if encoding is None else bytes(compressed_postings),
+                   posting_tfs.tobytes(), encoding,
+                   index.get_cosine_norm_array() if index.tracks_cosine_norms() else None,
+                   fingerprint.hexdigest())
+
+
+def write_sections(index, path, terms, dfs, offsets, posting_doc_ids, posting_tfs, encoding=None,
+                   norms=None, fingerprint=''):
+    """
+    Écrit le fichier d'index à partir du vocabulaire trié (terms, dfs, offsets) et des
+    sections de postings déjà encodées. posting_doc_ids et posting_tfs sont des bytes
+    ou des fichiers ouverts en lecture binaire, copiés par blocs : des postings plus
+    gros que la mémoire peuvent ainsi être écrits depuis un fichier temporaire.
+    Les autres sections (docnos, doc_lengths, tokens, stop words) viennent de index.
+    norms : array('f') des normes cosinus par doc id, ou None si l'index ne les suit pas ;
+    fingerprint : empreinte hexadécimale du contenu (ContentFingerprint).
+    """
+    blobs = {
+        'docnos': _encode_strings(index.doc_ids),
+        'doc_lengths': index.get_doc_length_array().tobytes(),
+        'terms': _encode_strings(terms),
+        'dfs': dfs.tobytes(),
+        'offsets': offsets.tobytes(),
+        'doc_ids': posting_doc_ids,
+        'tfs': posting_tfs,
+        'tokens': _encode_strings(sorted(index.distinct_tokens_bp)),
+        'stop_words': _encode_strings(sorted(index.stop_words_set)),
+        'norms': norms.tobytes() if norms is not None else b'',
+        'fingerprint': fingerprint.encode('ascii'),
+        'sources': _encode_strings(index.sources),
+    }
+
+    def blob_size(blob):
+        if isinstance(blob, (bytes, bytearray)):
+            return len(blob)
+        return os.fstat(blob.fileno()).st_size
+
+    flags = 0
+    if index.stop_word_active:
+        flags |= FLAG_STOP_WORDS
+    if index.stemmer_active:
+        flags |= FLAG_STEMMER
+    if index.integer_postings_active:
+        flags |= FLAG_INTEGER_POSTINGS
+    if norms is not None:
+        flags |= FLAG_COSINE_NORMS
+
+    header = HEADER.pack(MAGIC, VERSION, sys.byteorder == 'big', flags, ENCODINGS.index(encoding),
+                         len(index.doc_ids), len(terms),
+                         index.total_terms, index.total_tokens_bp, index.total_chars_tokens,
+                         index.avg_doc_length)
+
+    # Calcul des positions des sections (alignées pour les tableaux)
+    position = HEADER.size + SECTION.size * len(SECTIONS)
+    table = []
+    for name in SECTIONS:
+        position += -position % ALIGNMENT
+        table.append((position, blob_size(blobs[name])))
+        position += table[-1][1]
+
+    # Écriture dans un fichier temporaire puis remplacement : l'ancien fichier
+    # peut encore être mappé en mémoire par l'index que l'on sauvegarde
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(header)
+        for offset, size in table:
+            file.write(SECTION.pack(offset, size))
+        for name, (offset, size) in zip(SECTIONS, table):
+            file.write(b'\0' * (offset - file.tell()))
+            if isinstance(blobs[name], (bytes, bytearray)):
+                file.write(blobs[name])
+            else:
+                blobs[name].seek(0)
+                shutil.copyfileobj(blobs[name], file, COPY_BUFFER_SIZE)
+    os.replace(temp_path, path)
+
+
+class MappedDictionary(Mapping):
+    """
+    Dictionnaire term -> postings adossé à un fichier mmap.
+    Les postings sont décodés en PostingList (mode entier) ou en {doc_id: tf}.
+    Seules les listes de postings effectivement demandées sont décodées,
+    les dernières sont gardées dans un petit cache LRU.
+    Le fichier n'est jamais modifié : les documents ajoutés après le chargement
+    vont dans une couche en mémoire (additions) fusionnée à la lecture.
+    """
+
+    def __init__(self, mm, sections, terms, doc_ids, integer_postings, encoding=None, cache_size=1024):
+        self._mm = mm
+        self._view = memoryview(mm)
+        self.terms = terms
+        self.doc_ids = doc_ids
+        self.integer_postings = integer_postings
+        self.encoding = encoding
+        self.dfs = self._array(sections['dfs'], 'I')
+        self.offsets = self._array(sections['offsets'], 'Q')
+        # Postings compressés : octets bruts, sinon tableaux uint32
+        self.posting_doc_ids = self._array(sections['doc_ids'], 'B' if encoding else 'I')
+        self.posting_tfs = self._array(sections['tfs'], 'I')
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.additions = {}  # term -> postings ajoutés depuis le chargement
+        self._new_terms = 0  # terms des additions absents du fichier
+
+    def _array(self, section, typecode):
+        """Vue sans copie sur une section du fichier"""
+        offset, size = section
+        return self._view[offset:offset + size].cast(typecode)
+
+    def _position(self, term):
+        """Position du terme dans le vocabulaire trié, ou -1"""
+        i = bisect_left(self.terms, term)
+        if i < len(self.terms) and self.terms[i] == term:
+            return i
+        return -1
+
+    def _added_frequency(self, postings):
+        return postings.document_frequency() if self.integer_postings else len(postings)
+
+    def document_frequency(self, term):
+        """df lu directement dans le fichier (plus les ajouts), sans décoder les postings"""
+        i = self._position(term)
+        df = self.dfs[i] if i >= 0 else 0
+        if term in self.additions:
+            df += self._added_frequency(self.additions[term])
+        return df
+
+    def document_frequencies(self):
+        """Dictionnaire term -> df de tout le vocabulaire"""
+        dfs = dict(zip(self.terms, self.dfs))
+        for term, postings in self.additions.items():
+            dfs[term] = dfs.get(term, 0) + self._added_frequency(postings)
+        return dfs
+
+    def add_posting(self, term, doc_key, tf):
+        """Ajoute un posting (doc id entier ou docno selon le mode) dans la couche en mémoire"""
+        postings = self.additions.get(term)
+        if postings is None:
+            postings = self.additions[term] = PostingList() if self.integer_postings else {}
+            if self._position(term) < 0:
+                self._new_terms += 1
+        if self.integer_postings:
+            postings.add(doc_key, tf)
+        else:
+            postings[doc_key] = tf
+        self._cache.pop(term, None)
+
+    def _decode(self, i):
+        """Décode les postings du terme en position i du fichier"""
+        start, end = self.offsets[i], self.offsets[i + 1]
+        if self.encoding:
+            postings = CompressedPostingList(bytes(self.posting_doc_ids[start:end]), self.dfs[i], self.encoding)
+            if not self.integer_postings:
+                postings = {self.doc_ids[doc_position]: tf for doc_position, tf in postings.pairs()}
+        elif self.integer_postings:
+            postings = PostingList.from_arrays(self.posting_doc_ids[start:end], self.posting_tfs[start:end])
+        else:
+            doc_ids = self.doc_ids
+            postings = {doc_ids[doc_position]: tf for doc_position, tf
+                        in zip(self.posting_doc_ids[start:end], self.posting_tfs[start:end])}
+        return postings
+
+    def __getitem__(self, term):
+        if term in self._cache:
+            self._cache.move_to_end(term)
+            return self._cache[term]
+
+        i = self._position(term)
+        added = self.additions.get(term)
+        if i < 0 and added is None:
+            raise KeyError(term)
+
+        if added is None:
+            postings = self._decode(i)
+        elif self.integer_postings:
+            # Les doc ids ajoutés sont tous supérieurs à ceux du fichier
+            postings = PostingList()
+            if i >= 0:
+                stored = self._decode(i)
+                if isinstance(stored, CompressedPostingList):
+                    stored = stored.decompress()
+                postings.extend(stored)
+            postings.extend(added)
+        else:
+            postings = self._decode(i) if i >= 0 else {}
+            postings.update(added)
+
+        self._cache[term] = postings
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return postings
+
+    def __contains__(self, term):
+        return self._position(term) >= 0 or term in self.additions
+
+    def __iter__(self):
+        yield from self.terms
+        for term in self.additions:
+            if self._position(term) < 0:
+                yield term
+
+    def __len__(self):
+        return len(self.terms) + self._new_terms
+
+    def close(self):
+        """Libère les vues puis le fichier mappé"""
+        self._cache.clear()
+        for view in (self.dfs, self.offsets, self.posting_doc_ids, self.posting_tfs, self._view):
+            view.release()
+        self._mm.close()
+
+
+def _read_sections(mm):
+    """Table des sections : nom -> (offset, taille)"""
+    return {name: SECTION.unpack_from(mm, HEADER.size + i * SECTION.size) for i, name in enumerate(SECTIONS)}
+
+
+def map_dictionary(path, doc_ids):
+    """
+    Mappe seulement les postings d'un fichier écrit par write_index (MappedDictionary),
+    pour un index qui a déjà ses doc_ids et ses statistiques en mémoire
+    """
+    with open(path, 'rb') as file:
+        mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, big_endian, flags, encoding = HEADER.unpack_from(mm, 0)[:5]
+    if magic != MAGIC or version != VERSION or big_endian != (sys.byteorder == 'big'):
+        mm.close()
+        raise ValueError(f"{path} n'est pas un index au format {MAGIC.decode()} v{VERSION} de cette machine")
+    sections = _read_sections(mm)
+    offset, size = sections['terms']
+    terms = _decode_strings(mm[offset:offset + size])
+    return MappedDictionary(mm, sections, terms, doc_ids, bool(flags & FLAG_INTEGER_POSTINGS), ENCODINGS[encoding])
+
+
+def read_index(index_class, path):
+    """
+    Charge un fichier écrit par write_index dans un nouvel index de classe index_class.
+    Les postings restent dans le fichier mappé en mémoire (MappedDictionary).
+    """
+    with open(path, 'rb') as file:
+        mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    (magic, version, big_endian, flags, encoding, doc_count, term_count,
+     total_terms, total_tokens_bp, total_chars_tokens, avg_doc_length) = HEADER.unpack_from(mm, 0)
+
+    if magic != MAGIC or version != VERSION:
+        mm.close()
+        raise ValueError(f"{path} n'est pas un index au format {MAGIC.decode()} v{VERSION}")
+    if big_endian != (sys.byteorder == 'big'):
+        mm.close()
+        raise ValueError(f"{path} a été écrit avec un autre ordre d'octets")
+
+    sections = _read_sections(mm)
+
+    def blob(name):
+        offset, size = sections[name]
+        return mm[offset:offset + size]
+
+    integer_postings = bool(flags & FLAG_INTEGER_POSTINGS)
+    encoding = ENCODINGS[encoding]
+    index = index_class(integer_postings=integer_postings, cosine_norms=False)
+    index.postings_encoding = encoding if integer_postings else None
+
+    index.doc_ids = _decode_strings(blob('docnos'))
+    index.doc_index = {doc_id: i for i, doc_id in enumerate(index.doc_ids)}
+    doc_lengths = array('I')
+    doc_lengths.frombytes(blob('doc_lengths'))
+    index.doc_lengths = doc_lengths if integer_postings else dict(zip(index.doc_ids, doc_lengths))
+
+    terms = _decode_strings(blob('terms'))
+    if len(terms) != term_count or len(index.doc_ids) != doc_count:
+        mm.close()
+        raise ValueError(f"{path} est corrompu")
+
+    index.dictionary = MappedDictionary(mm, sections, terms, index.doc_ids, integer_postings, encoding)
+    index.distinct_tokens_bp = set(_decode_strings(blob('tokens')))
+    index.stop_words_set = set(_decode_strings(blob('stop_words')))
+    index.stop_word_active = bool(flags & FLAG_STOP_WORDS)
+    index.stemmer_active = bool(flags & FLAG_STEMMER)
+
+    index.doc_count = doc_count
+    index.total_terms = total_terms
+    index.total_tokens_bp = total_tokens_bp
+    index.total_chars_tokens = total_chars_tokens
+    index.avg_doc_length = avg_doc_length
+
+    # Normes écrites avec l'index : valables tant qu'aucun document n'est ajouté
+    if flags & FLAG_COSINE_NORMS:
+        index.stored_norms = array('f')
+        index.stored_norms.frombytes(blob('norms'))
+        if len(index.stored_norms) != doc_count:
+            mm.close()
+            raise ValueError(f"{path} est corrompu")
+    index.set_content_fingerprint(bytes(blob('fingerprint')).decode('ascii'))
+    index.sources = _decode_strings(blob('sources'))
+
+    return index
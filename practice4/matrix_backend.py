@@ -0,0 +1,145 @@
+"""
+Backend NumPy du ranker : l'index est exporté en matrice creuse terme-document.
+
+Format CSR (une ligne par terme, c'est-à-dire ses postings) :
+    indptr  int64   : la ligne du terme r occupe [indptr[r], indptr[r + 1])
+    indices int32   : doc ids entiers, croissants dans chaque ligne
+    tfs     float64 : tf de chaque posting
+avec les vecteurs df, idf (ltn / bm25) par terme et la longueur de chaque document.
+
+Les poids ltn, ltc et bm25 d'une ligne sont calculés d'un bloc (np.log10 sur la
+tranche de tfs) et ajoutés au vecteur des scores, terme par terme dans l'ordre
+de la requête comme en term-at-a-time : les classements sont les mêmes, les
+scores à quelques ulps près (np.log10 au lieu de math.log10).
+
+NumPy est une dépendance optionnelle : ce module n'est importé que si le
+ranker est créé avec backend="numpy".
+"""
+
+import numpy as np
+
+
+SCORES_BUDGET = 64 << 20  # octets de la matrice des scores d'un bloc de requêtes (search_batch)
+
+
+class TermDocumentMatrix:
+    """Matrice terme-document (tf) d'un WeightedInvertedIndex, au format CSR"""
+
+    def __init__(self, terms, indptr, indices, tfs, doc_lengths, avg_dl):
+        self.term_rows = {term: row for row, term in enumerate(terms)}
+        self.indptr = indptr
+        self.indices = indices
+        self.tfs = tfs
+        self.doc_lengths = doc_lengths
+        self.doc_count = len(doc_lengths)
+        self.avg_dl = avg_dl
+
+        # Vecteurs par terme, mêmes formules que RankedRetrieval
+        self.df = np.diff(indptr).astype(np.float64)
+        with np.errstate(divide='ignore'):
+            self.ltn_idf = np.where((self.df > 0) & (self.df < self.doc_count),
+                                    np.log10(self.doc_count / np.maximum(self.df, 1)), 0.0)
+        self.bm25_idf = np.log10((self.doc_count - self.df + 0.5) / (self.df + 0.5))
+        self._cosine_norms = None
+
+    @classmethod
+    def from_index(cls, index):
+        """Exporte les postings (quel que soit le mode de l'index) et les longueurs des documents"""
+        terms = list(index.dictionary)
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum([index.get_document_frequency(term) for term in terms], out=indptr[1:])
+        indices = np.empty(indptr[-1], dtype=np.int32)
+        tfs = np.empty(indptr[-1], dtype=np.float64)
+        for row, term in enumerate(terms):
+            postings = index.get_posting_list(term)
+            start, end = indptr[row], indptr[row + 1]
+            indices[start:end] = np.frombuffer(postings.doc_ids(), dtype=np.uint32)
+            tfs[start:end] = np.frombuffer(postings.tfs(), dtype=np.uint32)
+        doc_lengths = np.asarray(index.get_doc_length_array(), dtype=np.float64)
+        matrix = cls(terms, indptr, indices, tfs, doc_lengths, index.avg_doc_length)
+        if index.tracks_cosine_norms():
+            # Normes tenues par l'index : mêmes valeurs (float32) que le backend python
+            matrix._cosine_norms = np.asarray(index.get_cosine_norm_array(), dtype=np.float64)
+        return matrix
+
+    def memory_size(self):
+        """Taille en octets des tableaux de la matrice et des vecteurs"""
+        arrays = (self.indptr, self.indices, self.tfs, self.doc_lengths, self.df, self.ltn_idf, self.bm25_idf)
+        return sum(vector.nbytes for vector in arrays)
+
+    def cosine_norms(self):
+        """Normes cosinus (ltn) de tous les documents, calculées une fois sur toute la matrice"""
+        if self._cosine_norms is None:
+            idf = np.repeat(self.ltn_idf, np.diff(self.indptr))
+            weights = (1.0 + np.log10(self.tfs)) * idf
+            norms = np.sqrt(np.bincount(self.indices, weights * weights, minlength=self.doc_count))
+            norms[norms == 0] = 1.0
+            self._cosine_norms = norms
+        return self._cosine_norms
+
+    def row_weights(self, row, weighting_scheme="ltn", k1=1.2, b=0.75):
+        """(doc ids, poids) des postings d'une ligne"""
+        start, end = self.indptr[row], self.indptr[row + 1]
+        doc_numbers = self.indices[start:end]
+        tfs = self.tfs[start:end]
+        if weighting_scheme == "bm25":
+            length_norm = k1 * (1 - b + b * (self.doc_lengths[doc_numbers] / self.avg_dl))
+            return doc_numbers, self.bm25_idf[row] * ((tfs * (k1 + 1)) / (tfs + length_norm))
+        weights = (1.0 + np.log10(tfs)) * self.ltn_idf[row]
+        if weighting_scheme == "ltc":
+            weights /= self.cosine_norms()[doc_numbers]
+        return doc_numbers, weights
+
+    def scores(self, terms, weighting_scheme="ltn", k1=1.2, b=0.75):
+        """Vecteur des scores de tous les documents, lignes ajoutées dans l'ordre des termes"""
+        scores = np.zeros(self.doc_count)
+        for term in terms:
+            row = self.term_rows.get(term)
+            if row is not None:
+                doc_numbers, weights = self.row_weights(row, weighting_scheme, k1, b)
+                scores[doc_numbers] += weights
+        return scores
+
+    def search(self, terms, weighting_scheme="ltn", top_k=10, k1=1.2, b=0.75):
+        """Les top_k documents de la requête : [(doc id entier, score)]"""
+        return select_top_k(self.scores(terms, weighting_scheme, k1, b), top_k)
+
+    def search_batch(self, term_queries, query_count, weighting_scheme="ltn", top_k=10, k1=1.2, b=0.75):
+        """
+        Lot de requêtes : term_queries associe à chaque terme les positions des requêtes
+        qui le contiennent (matrice requête-terme creuse). Les poids d'une ligne sont
+        calculés une fois et ajoutés aux scores de chacune de ses requêtes ; les lignes
+        sont parcourues dans l'ordre trié des termes (celui des termes de chaque requête).
+        Les requêtes sont traitées par blocs dont la matrice des scores (requêtes x
+        documents, float64) tient dans SCORES_BUDGET octets.
+        """
+        block_size = max(1, SCORES_BUDGET // (8 * max(self.doc_count, 1)))
+        results = []
+        for first in range(0, query_count, block_size):
+            last = min(first + block_size, query_count)
+            scores = np.zeros((last - first, self.doc_count))
+            for term in sorted(term_queries):
+                positions = [position - first for position in term_queries[term] if first <= position < last]
+                row = self.term_rows.get(term)
+                if row is not None and positions:
+                    doc_numbers, weights = self.row_weights(row, weighting_scheme, k1, b)
+                    for position in positions:
+                        scores[position, doc_numbers] += weights
+            results.extend(select_top_k(query_scores, top_k) for query_scores in scores)
+        return results
+
+
+def select_top_k(scores, top_k):
+    """
+    Les top_k documents de score > 0 d'un vecteur de scores : [(doc id entier, score)],
+    par score décroissant puis doc id croissant comme scoring.select_top_k
+    """
+    candidates = np.flatnonzero(scores > 0)
+    if top_k <= 0 or len(candidates) == 0:
+        return []
+    if len(candidates) > top_k:
+        # Seuil = k-ième score ; les égalités au seuil sont départagées par le tri
+        kth = np.partition(scores[candidates], len(candidates) - top_k)[len(candidates) - top_k]
+        candidates = candidates[scores[candidates] >= kth]
+    order = np.lexsort((candidates, -scores[candidates]))[:top_k]
+    return [(int(doc_number), float(scores[doc_number])) for doc_number in candidates[order]]
@@ -0,0 +1,59 @@
+import contextlib
+import io
+import time
+
+from advanced_indexer import WeightedInvertedIndex
+from pruning_benchmark import CACHE_DIR, QUERIES, load_collection
+from ranked_retrieval_optimized import RankedRetrieval
+
+
+REPEAT = 5
+TOLERANCE = 1e-9
+
+
+def run(ranker, scheme, top_k):
+    """Meilleur temps moyen par requête sur REPEAT passes et résultats"""
+    times = []
+    results = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(REPEAT):
+            start = time.perf_counter()
+            results = [ranker.search_query(query, scheme, top_k) for query in QUERIES]
+            times.append(time.perf_counter() - start)
+    return min(times) / len(QUERIES), results
+
+
+def same_ranking(results, reference):
+    """Mêmes documents dans le même ordre, scores égaux à TOLERANCE près (relative)"""
+    return all(len(got) == len(expected)
+               and all(doc_id == expected_doc and abs(score - expected_score) <= TOLERANCE * abs(expected_score)
+                       for (doc_id, score), (expected_doc, expected_score) in zip(got, expected))
+               for got, expected in zip(results, reference))
+
+
+def main():
+    """Latence du term-at-a-time Python et du backend NumPy (matrice terme-document)"""
+    index = WeightedInvertedIndex(integer_postings=True)
+    index.add_documents(load_collection())
+    python_ranker = RankedRetrieval(index, cache_dir=CACHE_DIR)
+    start = time.perf_counter()
+    numpy_ranker = RankedRetrieval(index, cache_dir=CACHE_DIR, backend="numpy")
+    export_time = time.perf_counter() - start
+
+    print("=" * 60)
+    print(f"BACKEND NUMPY : {index.doc_count} documents, {len(QUERIES)} requêtes, sans stop words")
+    print("=" * 60)
+    print(f"\nExport de la matrice : {export_time:.2f} s, {numpy_ranker.matrix.memory_size() / 1e6:.2f} Mo")
+
+    for scheme in ("ltn", "ltc", "bm25"):
+        for top_k in (10, 1000):
+            python_time, reference = run(python_ranker, scheme, top_k)
+            numpy_time, results = run(numpy_ranker, scheme, top_k)
+            identical = "identique" if same_ranking(results, reference) else "DIFFÉRENT"
+            print(f"\n{scheme}, top {top_k} ({identical})")
+            print(f"- python : {python_time * 1000:6.2f} ms/requête")
+            print(f"- numpy  : {numpy_time * 1000:6.2f} ms/requête  accélération x{python_time / numpy_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import contextlib
+import io
+import os
+import pickle
+import sys
+import time
+
+import advanced_indexer
+from advanced_indexer import WeightedInvertedIndex
+
+
+PRACTICE2_DATA = "../practice2/data/Practice_02_data"
+STOP_WORDS_FILE = "data/stop-words-english4.txt"
+
+
+def load_collection():
+    """Tous les documents des fichiers de practice2 (couples (docno, texte))"""
+    reader = WeightedInvertedIndex()
+    documents = []
+    for filename in sorted(f for f in os.listdir(PRACTICE2_DATA) if f.endswith('.gz')):
+        documents.extend(reader.read_documents(os.path.join(PRACTICE2_DATA, filename), is_zipped=True))
+    return documents
+
+
+def build(documents, workers):
+    """Index stop words + stemming, en série (workers = 0) ou sur workers processus"""
+    index = WeightedInvertedIndex(integer_postings=True)
+    index.stop_word_active = True
+    index.stemmer_active = True
+    with contextlib.redirect_stdout(io.StringIO()):
+        index.load_stop_words(STOP_WORDS_FILE)
+
+    start = time.perf_counter()
+    if workers == 0:
+        index.add_documents(documents)
+    else:
+        index.add_documents_parallel(documents, workers)
+    return index, time.perf_counter() - start
+
+
+def same_index(a, b):
+    """Mêmes doc ids, doc_lengths, postings (dans le même ordre) et statistiques"""
+    return (a.doc_ids == b.doc_ids
+            and a.doc_lengths == b.doc_lengths
+            and list(a.dictionary) == list(b.dictionary)
+            and all(a.dictionary[term] == b.dictionary[term] for term in a.dictionary)
+            and a.get_collection_statistics(0) == b.get_collection_statistics(0))
+
+
+def serial_fraction(documents, batch_size=200):
+    """
+    Décompose le travail de add_documents_parallel, exécuté dans ce processus :
+    renvoie (temps parallélisable = analyse + inversion + sérialisation des lots,
+    temps série = désérialisation + fusion dans l'index)
+    """
+    index, _ = build([], 0)
+    advanced_indexer._init_worker(True, index.stop_words_set, index.stemmer)
+
+    start = time.perf_counter()
+    shards = [pickle.dumps(advanced_indexer._invert_batch(batch))
+              for batch in advanced_indexer._split_batches(documents, 0, batch_size, False)]
+    parallel = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for shard in shards:
+        index._merge_shard(pickle.loads(shard))
+    return parallel, time.perf_counter() - start
+
+
+def main(worker_counts):
+    """Accélération de add_documents_parallel selon le nombre de workers"""
+    documents = load_collection()
+    serial_index, serial_time = build(documents, 0)
+
+    print("=" * 60)
+    print(f"CONSTRUCTION PARALLÈLE : {len(documents)} documents, {os.cpu_count()} coeur(s)")
+    print("=" * 60)
+    print(f"\n- série      : {serial_time:6.3f} s")
+    for workers in worker_counts:
+        index, seconds = build(documents, workers)
+        identical = "identique" if same_index(serial_index, index) else "DIFFÉRENT"
+        print(f"- {workers:>2} worker(s): {seconds:6.3f} s  accélération x{serial_time / seconds:.2f}  ({identical})")
+
+    # Loi d'Amdahl : seule la fusion reste dans le processus principal
+    parallel, serial = serial_fraction(documents)
+    print(f"\nPart parallélisable : {parallel:.3f} s, part série (fusion) : {serial:.3f} s")
+    for cores in (2, 4, 8, 16):
+        estimate = serial_time / (serial + parallel / cores)
+        print(f"- {cores:>2} coeurs : accélération estimée x{estimate:.2f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1, 2, 4, 8])
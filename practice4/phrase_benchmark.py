@@ -0,0 +1,93 @@
+import contextlib
+import io
+import time
+
+from advanced_indexer import WeightedInvertedIndex
+from boolean_search import BooleanSearch
+from pruning_benchmark import CACHE_DIR, QUERIES, load_collection
+from ranked_retrieval_optimized import PROXIMITY_DEPTH, RankedRetrieval
+
+
+REPEAT = 5
+PHRASES = [
+    "notting hill",
+    "olive oil",
+    "new york",
+    "united states",
+    "the united states",
+    "information retrieval",
+    "machine learning",
+    "mutual exclusion",
+    "history of the war",
+]
+SLOP = 5
+PROXIMITY = 1.0
+SCHEME = "bm25"
+
+
+def best_time(function):
+    """Meilleur temps sur REPEAT essais et résultat de function()"""
+    result = function()
+    best = float('inf')
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def build(documents, positions):
+    index = WeightedInvertedIndex(integer_postings=True, positions=positions)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        index.add_documents(documents)
+    return index, time.perf_counter() - start
+
+
+def main():
+    """Coût de la couche positionnelle, phrases et proximité booléennes, bonus de proximité du classement"""
+    documents = load_collection()
+    plain, plain_time = build(documents, positions=False)
+    index, positional_time = build(documents, positions=True)
+    postings_size = sum(postings.buffer_info()[1] * postings.itemsize for postings in index.dictionary.values())
+    positions_size = sum(positions.nbytes() for positions in index.positions.values())
+
+    print("=" * 60)
+    print(f"INDEX POSITIONNEL : {index.doc_count} documents, {index.total_terms} positions")
+    print("=" * 60)
+    print(f"indexation : {plain_time:.2f} s sans positions, {positional_time:.2f} s avec "
+          f"(x{positional_time / plain_time:.2f})")
+    print(f"postings {postings_size / 1e6:.2f} Mo, positions {positions_size / 1e6:.2f} Mo "
+          f"({8 * positions_size / index.total_terms:.1f} bits par position)")
+
+    print("\nRequêtes booléennes (listes des termes déjà en cache)")
+    search = BooleanSearch(index)
+    for phrase in PHRASES:
+        conjunction = " and ".join(f"({word})" for word in phrase.split())
+        and_time, and_results = best_time(lambda: search.parse_boolean_query(conjunction))
+        phrase_time, phrase_results = best_time(lambda: search.parse_boolean_query(f'"{phrase}"'))
+        near_time, near_results = best_time(lambda: search.parse_boolean_query(f'"{phrase}"~{SLOP}'))
+        # Listes de positions décodées (survivants du AND) / toutes celles des mots
+        words = [word for word, _ in search.phrase_words(phrase)]
+        decoded = len(and_results) * len(words)
+        available = sum(search.document_frequency(word) for word in words)
+        print(f"- {phrase:<22} AND {len(and_results):4d} docs {and_time * 1000:6.2f} ms | "
+              f"phrase {len(phrase_results):4d} docs {phrase_time * 1000:6.2f} ms | "
+              f"~{SLOP} {len(near_results):4d} docs {near_time * 1000:6.2f} ms | "
+              f"positions {decoded}/{available}")
+    print("\nplan de '\"new york\" and (city or state) and not \"york times\"~3' :")
+    search.explain('"new york" and (city or state) and not "york times"~3')
+
+    print(f"\nClassement {SCHEME} top 10, bonus de proximité {PROXIMITY} sur les {PROXIMITY_DEPTH} premiers")
+    ranker = RankedRetrieval(index, cache_dir=CACHE_DIR)
+    for query in QUERIES:
+        with contextlib.redirect_stdout(io.StringIO()):
+            base_time, base = best_time(lambda: ranker.search_query(query, SCHEME, 10))
+            boost_time, boosted = best_time(lambda: ranker.search_query(query, SCHEME, 10, proximity=PROXIMITY))
+        kept = len({doc_id for doc_id, _ in base} & {doc_id for doc_id, _ in boosted})
+        first = f"{base[0][0]} -> {boosted[0][0]}" if base else "-"
+        print(f"- {query:<46} {base_time * 1000:6.2f} ms -> {boost_time * 1000:6.2f} ms  "
+              f"{kept}/10 communs, premier {first}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+import heapq
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from itertools import accumulate
+
+from compression import DECODERS, ENCODERS, append_bits, bit_length, vbyte_decode, vbyte_encode
+
+
+class PostingList(array):
+    """
+    Liste de postings en espace de doc ids entiers.
+    Les couples (doc_id, tf) sont rangés à plat dans un seul array('I') :
+    [doc_0, tf_0, doc_1, tf_1, ...], triés par doc_id croissant.
+    Un seul objet Python par terme (au lieu d'un dict avec une entrée par document).
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, initial=()):
+        return super().__new__(cls, 'I', initial)
+
+    @classmethod
+    def from_arrays(cls, doc_ids, tfs):
+        """Construit la liste depuis deux tableaux parallèles doc ids / tfs"""
+        postings = cls()
+        postings.frombytes(bytes(8 * len(doc_ids)))
+        postings[0::2] = array('I', doc_ids)
+        postings[1::2] = array('I', tfs)
+        return postings
+
+    def add(self, doc_id, tf):
+        """Ajoute un posting (doc_id doit être supérieur au dernier)"""
+        self.append(doc_id)
+        self.append(tf)
+
+    def document_frequency(self):
+        """df = nombre de postings"""
+        return len(self) // 2
+
+    def doc_ids(self):
+        """Tableau des doc ids"""
+        return self[0::2]
+
+    def tfs(self):
+        """Tableau des tfs, aligné sur doc_ids()"""
+        return self[1::2]
+
+    def pairs(self):
+        """Itère sur les couples (doc_id, tf)"""
+        it = iter(self)
+        return zip(it, it)
+
+    def get_tf(self, doc_id):
+        """tf du document (recherche dichotomique), 0 s'il est absent"""
+        low, high = 0, len(self) // 2
+        while low < high:
+            middle = (low + high) // 2
+            if self[2 * middle] < doc_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self) // 2 and self[2 * low] == doc_id:
+            return self[2 * low + 1]
+        return 0
+
+
+TAIL_RATIO = 0.5  # queue rangée dans le tableau dès qu'elle atteint la moitié de ses postings
+
+
+class PostingStore(Mapping):
+    """
+    Dictionnaire term -> postings du mode entier, rangé à plat (CSR) :
+        - terms : vocabulaire trié (recherche par dichotomie, comme MappedDictionary)
+        - offsets (uint64, V+1 valeurs) : les postings du term i sont les couples
+          offsets[i]..offsets[i+1] d'une seule PostingList globale [doc, tf, doc, tf, ...]
+    Aucun objet Python par term en dehors de sa chaîne. Les postings ajoutés vont dans
+    une queue (term -> PostingList) que compact() range dans le tableau en un passage ;
+    avec compact(TAIL_RATIO) après chaque lot, le coût amorti d'un lot reste
+    proportionnel à sa taille. Lire un term renvoie une PostingList (copie de sa
+    tranche suivie de la queue) : les ajouts passent par add_document / add_postings.
+    """
+
+    def __init__(self, items=()):
+        self.clear()
+        for term, postings in items:
+            self.add_postings(term, postings)
+        self.compact()
+
+    def clear(self):
+        self.terms = []
+        self.offsets = array('Q', [0])
+        self.postings = PostingList()
+        self.tail = {}  # term -> PostingList des postings pas encore rangés
+        self.tail_postings = 0
+        self._new_terms = 0  # terms de la queue absents du tableau (None : à recompter)
+
+    def _position(self, term):
+        """Position du terme dans le vocabulaire trié du tableau, ou -1"""
+        i = bisect_left(self.terms, term)
+        if i < len(self.terms) and self.terms[i] == term:
+            return i
+        return -1
+
+    def _new_tail(self, term):
+        """PostingList de la queue pour un term qui n'en a pas encore"""
+        postings = self.tail[term] = PostingList()
+        self._new_terms = None
+        return postings
+
+    def add_document(self, doc_id, term_freq):
+        """Ajoute les postings d'un document (term -> tf), doc_id supérieur à tous ceux déjà présents"""
+        tail = self.tail
+        for term, tf in term_freq.items():
+            postings = tail.get(term)
+            if postings is None:
+                postings = self._new_tail(term)
+            postings.append(doc_id)
+            postings.append(tf)
+        self.tail_postings += len(term_freq)
+
+    def add_postings(self, term, postings):
+        """Ajoute des postings à plat [doc, tf, ...] (array('I') ou PostingList) à la fin de ceux du term"""
+        added = self.tail.get(term)
+        if added is None:
+            added = self._new_tail(term)
+        added.extend(postings)
+        self.tail_postings += len(postings) // 2
+
+    def compact(self, ratio=0.0):
+        """
+        Range la queue dans le tableau si elle contient au moins ratio fois ses
+        postings (toujours avec ratio=0). Les terms inchangés entre deux terms de la
+        queue sont recopiés d'un bloc.
+        """
+        if not self.tail or self.tail_postings < ratio * (len(self.postings) // 2):
+            return
+        old_terms, old_offsets, old_postings = self.terms, self.offsets, self.postings
+        terms = []
+        offsets = array('Q', [0])
+        postings = PostingList()
+        start = 0  # premier term de l'ancien tableau pas encore recopié
+        for term in sorted(self.tail):
+            i = bisect_left(old_terms, term, start)
+            end = i + 1 if i < len(old_terms) and old_terms[i] == term else i
+            if end > start:
+                shift = len(postings) // 2 - old_offsets[start]
+                postings.extend(old_postings[2 * old_offsets[start]:2 * old_offsets[end]])
+                terms.extend(old_terms[start:end])
+                offsets.extend(offset + shift for offset in old_offsets[start + 1:end + 1])
+            if end == i:
+                terms.append(term)
+                offsets.append(0)
+            postings.extend(self.tail[term])
+            offsets[-1] = len(postings) // 2
+            start = end
+        shift = len(postings) // 2 - old_offsets[start]
+        postings.extend(old_postings[2 * old_offsets[start]:])
+        terms.extend(old_terms[start:])
+        offsets.extend(offset + shift for offset in old_offsets[start + 1:])
+
+        self.terms, self.offsets, self.postings = terms, offsets, postings
+        self.tail = {}
+        self.tail_postings = 0
+        self._new_terms = 0
+
+    def document_frequency(self, term):
+        """df du terme sans construire sa PostingList"""
+        i = self._position(term)
+        df = self.offsets[i + 1] - self.offsets[i] if i >= 0 else 0
+        if term in self.tail:
+            df += self.tail[term].document_frequency()
+        return df
+
+    def document_frequencies(self):
+        """Dictionnaire term -> df de tout le vocabulaire"""
+        offsets = self.offsets
+        dfs = {term: offsets[i + 1] - offsets[i] for i, term in enumerate(self.terms)}
+        for term, postings in self.tail.items():
+            dfs[term] = dfs.get(term, 0) + postings.document_frequency()
+        return dfs
+
+    def get_tf(self, term, doc_id):
+        """tf du terme dans le document (dichotomie dans sa tranche), 0 s'il est absent"""
+        i = self._position(term)
+        if i >= 0:
+            postings = self.postings
+            low, high = self.offsets[i], self.offsets[i + 1]
+            end = high
+            while low < high:
+                middle = (low + high) // 2
+                if postings[2 * middle] < doc_id:
+                    low = middle + 1
+                else:
+                    high = middle
+            if low < end and postings[2 * low] == doc_id:
+                return postings[2 * low + 1]
+        added = self.tail.get(term)
+        return added.get_tf(doc_id) if added is not None else 0
+
+    def __getitem__(self, term):
+        i = self._position(term)
+        added = self.tail.get(term)
+        if i < 0:
+            if added is None:
+                raise KeyError(term)
+            return PostingList(added)
+        postings = PostingList(self.postings[2 * self.offsets[i]:2 * self.offsets[i + 1]])
+        if added is not None:
+            postings.extend(added)
+        return postings
+
+    def __contains__(self, term):
+        return term in self.tail or self._position(term) >= 0
+
+    def __iter__(self):
+        """Vocabulaire dans l'ordre trié (terms du tableau et terms de la queue fusionnés)"""
+        new_terms = sorted(term for term in self.tail if self._position(term) < 0)
+        return heapq.merge(self.terms, new_terms)
+
+    def __len__(self):
+        if self._new_terms is None:
+            # Compté à la demande : pas de dichotomie par posting ajouté pendant l'indexation
+            self._new_terms = sum(self._position(term) < 0 for term in self.tail) if self.terms else len(self.tail)
+        return len(self.terms) + self._new_terms
+
+
+class CompressedPostingList:
+    """
+    Liste de postings compressée : les écarts entre doc ids successifs (le premier
+    écart part de -1, tous valent donc au moins 1) et les tfs sont entrelacés puis
+    encodés avec un des codes de compression.py.
+    Même interface de lecture que PostingList, le décodage se fait à la volée.
+    En gamma et delta, bit_length est le nombre de bits utiles de data (None tant
+    qu'il n'est pas connu, calculé au premier ajout).
+    """
+
+    __slots__ = ('data', 'df', 'encoding', 'last_doc_id', 'bit_length')
+
+    def __init__(self, data=b'', df=0, encoding='vbyte', last_doc_id=None):
+        if encoding not in ENCODERS:
+            raise ValueError(f"Encodage inconnu : {encoding}")
+        self.data = data
+        self.df = df
+        self.encoding = encoding
+        self.last_doc_id = last_doc_id
+        self.bit_length = None
+
+    @classmethod
+    def from_postings(cls, postings, encoding='vbyte'):
+        """Compresse une PostingList (ou toute liste exposant pairs())"""
+        values = []
+        previous = -1
+        for doc_id, tf in postings.pairs():
+            values.append(doc_id - previous)
+            values.append(tf)
+            previous = doc_id
+        return cls(ENCODERS[encoding](values), len(values) // 2, encoding, previous)
+
+    def add(self, doc_id, tf):
+        """
+        Ajoute un posting (doc_id doit être supérieur au dernier) à la fin des données :
+        en vbyte on concatène, en gamma et delta seul le dernier octet incomplet est
+        réécrit. data devient un bytearray au premier ajout, les suivants sont amortis.
+        """
+        bit_coded = self.encoding != 'vbyte'
+        if self.last_doc_id is None or (bit_coded and self.bit_length is None):
+            # Liste relue depuis le disque (ou compressée d'un bloc) : une passe de décodage
+            values = list(DECODERS[self.encoding](self.data, 2 * self.df))
+            self.last_doc_id = sum(values[::2]) - 1
+            if bit_coded:
+                self.bit_length = bit_length(values, self.encoding)
+        if not isinstance(self.data, bytearray):
+            self.data = bytearray(self.data)
+
+        values = (doc_id - self.last_doc_id, tf)
+        if bit_coded:
+            self.bit_length = append_bits(self.data, self.bit_length, values, self.encoding)
+        else:
+            self.data += vbyte_encode(values)
+        self.df += 1
+        self.last_doc_id = doc_id
+
+    def __len__(self):
+        # Même convention que PostingList : deux valeurs par posting
+        return 2 * self.df
+
+    def document_frequency(self):
+        """df = nombre de postings"""
+        return self.df
+
+    def pairs(self):
+        """Décode paresseusement les couples (doc_id, tf)"""
+        values = DECODERS[self.encoding](self.data, 2 * self.df)
+        doc_id = -1
+        for gap, tf in zip(values, values):
+            doc_id += gap
+            yield doc_id, tf
+
+    def decompress(self):
+        """Renvoie la PostingList non compressée"""
+        postings = PostingList()
+        for doc_id, tf in self.pairs():
+            postings.add(doc_id, tf)
+        return postings
+
+    def doc_ids(self):
+        """Tableau des doc ids"""
+        return array('I', (doc_id for doc_id, _ in self.pairs()))
+
+    def tfs(self):
+        """Tableau des tfs, aligné sur doc_ids()"""
+        return array('I', (tf for _, tf in self.pairs()))
+
+    def get_tf(self, doc_id):
+        """tf du document (parcours séquentiel arrêté dès qu'on dépasse doc_id), 0 s'il est absent"""
+        for current, tf in self.pairs():
+            if current >= doc_id:
+                return tf if current == doc_id else 0
+        return 0
+
+    def nbytes(self):
+        """Taille des données compressées en octets"""
+        return len(self.data)
+
+
+# Table translate d'un octet vbyte terminal (bit de poids fort à 1) vers sa valeur
+VBYTE_LOW_BITS = bytes(byte & 127 for byte in range(256))
+
+
+class PositionalPostings:
+    """
+    Positions d'un terme, alignées sur ses postings : pour le i-ème document de la
+    liste, les écarts entre positions successives (le premier depuis 0) sont encodés
+    en vbyte dans data[offsets[i]:offsets[i + 1]]. Une liste de positions n'est
+    décodée que pour les documents demandés.
+    """
+
+    __slots__ = ('offsets', 'data')
+
+    def __init__(self):
+        self.offsets = array('I', [0])
+        self.data = bytearray()
+
+    def add(self, positions):
+        """Ajoute les positions (croissantes) du document suivant de la liste"""
+        previous = 0
+        gaps = []
+        for position in positions:
+            gaps.append(position - previous)
+            previous = position
+        self.data += vbyte_encode(gaps)
+        self.offsets.append(len(self.data))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def positions(self, index):
+        """Positions du index-ième document de la liste"""
+        data = self.data[self.offsets[index]:self.offsets[index + 1]]
+        if min(data) >= 128:
+            # Tous les écarts tiennent sur un octet : décodage sans boucle Python
+            return array('I', accumulate(data.translate(VBYTE_LOW_BITS)))
+        return array('I', accumulate(vbyte_decode(data)))
+
+    def nbytes(self):
+        """Taille des positions encodées et de leurs offsets en octets"""
+        return len(self.data) + self.offsets.itemsize * len(self.offsets)
+
+
+BLOCK_SIZE = 64
+
+
+class BlockMaxes:
+    """
+    Métadonnées block-max d'une liste de postings pour un schéma de pondération :
+    la liste est découpée en blocs de block_size postings, chaque bloc garde son
+    dernier doc id et le poids maximal (>= 0) de ses postings.
+    """
+
+    __slots__ = ('last_doc_ids', 'max_weights', 'block_size')
+
+    def __init__(self, last_doc_ids, max_weights, block_size=BLOCK_SIZE):
+        self.last_doc_ids = last_doc_ids
+        self.max_weights = max_weights
+        self.block_size = block_size
+
+    @classmethod
+    def from_weights(cls, doc_ids, weights, block_size=BLOCK_SIZE):
+        """Construit les blocs depuis les doc ids et les poids (alignés) des postings"""
+        last_doc_ids = array('I', doc_ids[block_size - 1::block_size])
+        if len(doc_ids) % block_size:
+            last_doc_ids.append(doc_ids[-1])
+        max_weights = array('d', (max(0.0, max(weights[start:start + block_size]))
+                                  for start in range(0, len(weights), block_size)))
+        return cls(last_doc_ids, max_weights, block_size)
+
+    def __len__(self):
+        return len(self.last_doc_ids)
+
+    def max_weight(self):
+        """Borne du terme sur toute la liste"""
+        return max(self.max_weights, default=0.0)
@@ -0,0 +1,82 @@
+import contextlib
+import io
+import os
+import tempfile
+import tracemalloc
+
+from advanced_indexer import WeightedInvertedIndex
+from index_storage import HEADER, SECTION, SECTIONS
+from postings import CompressedPostingList, PostingList, PostingStore
+from pruning_benchmark import load_collection
+
+
+ENCODINGS = ["vbyte", "gamma", "delta"]
+TARGET = 10  # réduction visée par rapport aux dicts {docno: tf}
+
+
+def allocated(build):
+    """Octets encore alloués par le résultat de build() (mesure tracemalloc)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def file_postings_size(index, encoding):
+    """Octets des sections de postings (dfs, offsets, doc ids, tfs) du fichier d'index"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "index.idx")
+        index.save(path, encoding)
+        with open(path, 'rb') as file:
+            data = file.read(HEADER.size + SECTION.size * len(SECTIONS))
+    sizes = {name: SECTION.unpack_from(data, HEADER.size + i * SECTION.size)[1] for i, name in enumerate(SECTIONS)}
+    return sum(sizes[name] for name in ('dfs', 'offsets', 'doc_ids', 'tfs'))
+
+
+def main():
+    """Octets par posting du dictionnaire selon sa représentation, comparés à l'objectif x10"""
+    documents = load_collection()
+    dict_index = WeightedInvertedIndex(cosine_norms=False)
+    integer_index = WeightedInvertedIndex(integer_postings=True, cosine_norms=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        dict_index.add_documents(documents)
+        integer_index.add_documents(documents)
+    postings_count = sum(postings.document_frequency() for postings in integer_index.dictionary.values())
+    terms = len(integer_index.dictionary)
+
+    print("=" * 60)
+    print(f"MÉMOIRE DES POSTINGS : {integer_index.doc_count} documents, {terms} terms, "
+          f"{postings_count} postings (df moyen {postings_count / terms:.1f})")
+    print("=" * 60)
+
+    # Même vocabulaire (chaînes partagées) dans toutes les mesures : seules les listes comptent
+    sizes = {
+        "dict {docno: tf}": allocated(lambda: {term: dict(postings) for term, postings in dict_index.dictionary.items()}),
+        "PostingList par term": allocated(
+            lambda: {term: PostingList(postings) for term, postings in integer_index.dictionary.items()}),
+        "PostingStore (CSR)": allocated(lambda: PostingStore(integer_index.dictionary.items())),
+    }
+    for encoding in ENCODINGS:
+        sizes[f"compressée {encoding}"] = allocated(
+            lambda: {term: CompressedPostingList.from_postings(postings, encoding)
+                     for term, postings in integer_index.dictionary.items()})
+    sizes["fichier brut (mmap)"] = file_postings_size(integer_index, None)
+    for encoding in ENCODINGS:
+        sizes[f"fichier {encoding} (mmap)"] = file_postings_size(integer_index, encoding)
+
+    reference = sizes["dict {docno: tf}"] / postings_count
+    for label, size in sizes.items():
+        per_posting = size / postings_count
+        reduction = reference / per_posting
+        if size == sizes["dict {docno: tf}"]:
+            verdict = "référence"
+        else:
+            verdict = f"objectif x{TARGET} {'atteint' if reduction >= TARGET else 'non atteint'}"
+        print(f"- {label:<22}: {per_posting:6.2f} octets/posting  x{reduction:5.1f}  ({verdict})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,73 @@
 import os
 import time
 
-from advanced_indexer import WeightedInvertedIndex
+from advanced_indexer import WeightedInvertedIndex, derive
+from index_storage import source_signature
+from porterstemmer import stem_word
 from ranked_retrieval_optimized import RankedRetrieval
+from trec_run import next_run_id, run_file_name, write_run
 
 
-def compute_statistics(exercise_num, file_name, use_stop_words=False, use_stemmer=False):
-    """Calcule et affiche les statistiques de la collection pour différents réglages."""
+INDEX_DIR = "data/index_cache"
+
+
+def compute_statistics(exercise_num, file_name, use_stop_words=False, use_stemmer=False, base_index=None):
+    """
+    Calcule et affiche les statistiques de la collection pour différents réglages.
+    Si base_index (index sans stop-words ni stemming) est fourni, la variante est
+    dérivée de son vocabulaire au lieu de réindexer la collection.
+    """
 
     print("\n" + "=" * 60)
     print(f"EXERCICE {exercise_num}: {'AVEC' if use_stop_words else 'SANS'} STOP-WORDS ET STEMMING")
     print("=" * 60)
 
-    index = WeightedInvertedIndex()
-    index.stop_word_active = use_stop_words
-    index.stemmer_active = use_stemmer
-
-    if use_stop_words:
-        index.load_stop_words()
-
-    # Construction de l'index
-    indexing_time = index.build_index("data/" + file_name, False)
+    # Un index déjà construit pour ces réglages est rechargé depuis le disque,
+    # sauf si le fichier de la collection a changé depuis (taille ou date de modification)
+    source_path = "data/" + file_name
+    index_path = os.path.join(INDEX_DIR, f"{file_name}_{'stop' if use_stop_words else 'nostop'}"
+                                         f"_{'porter' if use_stemmer else 'nostem'}.idx")
+    index = None
+    if os.path.exists(index_path):
+        start_time = time.time()
+        try:
+            index = WeightedInvertedIndex.load(index_path)
+            indexing_time = time.time() - start_time
+            print(f"Index chargé depuis {index_path}")
+        except ValueError as e:
+            print(f"- Index sur disque ignoré: {e}")
+        if index is not None and index.sources != [source_signature(source_path)]:
+            print(f"- Index sur disque ignoré: {source_path} a changé depuis sa construction")
+            index.close()
+            index = None
+
+    if index is None and base_index is not None:
+        start_time = time.time()
+        stop_words = None
+        if use_stop_words:
+            stop_words_loader = WeightedInvertedIndex()
+            stop_words_loader.load_stop_words()
+            stop_words = stop_words_loader.stop_words_set
+        index = derive(base_index, stop_words=stop_words, stemmer=stem_word if use_stemmer else None)
+        indexing_time = time.time() - start_time
+        print(f"Index dérivé de l'index de base en {indexing_time:.2f} secondes")
+
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        index.save(index_path)
+
+    if index is None:
+        index = WeightedInvertedIndex(integer_postings=True)
+        index.stop_word_active = use_stop_words
+        index.stemmer_active = use_stemmer
+
+        if use_stop_words:
+            index.load_stop_words()
+
+        # Construction de l'index
+        indexing_time = index.build_index(source_path, False)
+
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        index.save(index_path)
 
     if indexing_time is None:
         print("Échec lors de la construction de l'index.")
@@ -42,69 +89,52 @@ def compute_statistics(exercise_num, file_name, use_stop_words=False, use_stemme
     return index
 
 
-def run_weighting_experiment(index, query_id, weighting_scheme, query_request, run_id):
-    """Lance un test complet de pondération avec mesure précise du temps."""
-
-    print("\n" + "=" * 60)
-    print(f"{query_id}: {weighting_scheme.upper()} WEIGHTING")
-    print("=" * 60)
+def run_weighting_experiment(index, queries, weighting_scheme, run_id):
+    """Lance toutes les requêtes d'un schéma de pondération en un lot, avec mesure précise du temps."""
 
     # Démarrage de la mesure de temps
     start_time = time.time()
 
-    # Initialisation du moteur de recherche pondéré
+    # Un seul moteur de recherche pondéré pour toutes les requêtes
     ranker = RankedRetrieval(index, cache_dir="data/norm_cache")
 
-    # Prétraitement des termes de la requête
-    query_terms = ranker.process_query_terms(query_request)
-
-    # Exemple: récupération du poids d'un terme dans un document spécifique
-    term = query_terms[1]  # terme après traitement
-    ranking_weight = ranker.get_term_weight(term, "23724", weighting_scheme)
-
-    # Calcul du RSV du document #23724
-    doc_score = 0.0
-    for term in query_terms:
-        term_weight = ranker.get_term_weight(term, "23724", weighting_scheme)
-        doc_score += term_weight
-
-    # Recherche du Top-10 pour affichage
-    top_docs = ranker.search_query(query_request, weighting_scheme, top_k=10)
+    # Recherche étendue du lot pour génération des fichiers run (le top-10 en est le début)
+    results = ranker.search_batch(list(queries.values()), weighting_scheme, top_k=1500)
 
     # Temps total écoulé
     weighting_time = time.time() - start_time
+    print(f"- Temps total de pondération ({len(queries)} requêtes, {weighting_scheme.upper()}): "
+          f"{weighting_time:.2f} secondes")
 
-    print(f"- Temps total de pondération: {weighting_time:.2f} secondes")
-    print(f"- Poids du terme 'ranking' dans le document #23724: {ranking_weight:.6f}")
-    print(f"- RSV du document #23724: {doc_score:.6f}")
+    # Écriture du run au format TREC
+    write_run("runs/" + run_file_name(index, weighting_scheme, run_id), zip(queries, results), mode="a")
 
-    print("- TOP-10 DOCUMENTS:")
-    for i, (doc_id, score) in enumerate(top_docs, 1):
-        print(f"  {i:2d}. Doc {doc_id}: {score:.6f}")
+    for (query_id, query_request), top_docs in zip(queries.items(), results):
+        print("\n" + "=" * 60)
+        print(f"{query_id}: {weighting_scheme.upper()} WEIGHTING")
+        print("=" * 60)
 
-    # Recherche étendue pour génération du fichier run
-    top_docs = ranker.search_query(query_request, weighting_scheme, top_k=1500)
+        # Prétraitement des termes de la requête
+        query_terms = ranker.process_query_terms(query_request)
 
-    # Construction du nom du fichier run
-    file_name = f"AlphaAnaClement_{run_id}_test_{weighting_scheme}_article"
-    file_name += "_stop671" if index.stop_word_active else "_nostop"
-    file_name += "_porter" if index.stemmer_active else "_nostem"
-    if weighting_scheme == "bm25":
-        file_name += "_k1.2_b0.75"
-    file_name += ".txt"
+        # Exemple: récupération du poids d'un terme dans un document spécifique
+        term = query_terms[1]  # terme après traitement
+        ranking_weight = ranker.get_term_weight(term, "23724", weighting_scheme)
 
-    # Création du fichier si nécessaire
-    full_path = "runs/" + file_name
-    if not os.path.exists(full_path):
-        with open(full_path, "w", encoding="utf-8") as f:
-            f.write("")
+        # Calcul du RSV du document #23724
+        doc_score = 0.0
+        for term in query_terms:
+            term_weight = ranker.get_term_weight(term, "23724", weighting_scheme)
+            doc_score += term_weight
 
-    # Écriture du run au format TREC
-    for i, (doc_id, score) in enumerate(top_docs, 1):
-        with open(full_path, "a", encoding="utf-8") as f:
-            f.write(f"{query_id} Q0 {doc_id} {i} {score} AlphaAnaClement /article[1]\n")
+        print(f"- Poids du terme 'ranking' dans le document #23724: {ranking_weight:.6f}")
+        print(f"- RSV du document #23724: {doc_score:.6f}")
+
+        print("- TOP-10 DOCUMENTS:")
+        for i, (doc_id, score) in enumerate(top_docs[:10], 1):
+            print(f"  {i:2d}. Doc {doc_id}: {score:.6f}")
 
-    return weighting_time, ranking_weight, doc_score, top_docs
+    return weighting_time, results
 
 
 def main():
@@ -123,30 +153,28 @@ def main():
     # Construction des différents index selon les options
     index_no_stop_no_stem = compute_statistics(1, "Text_Only_Ascii_Coll_NoSem",
                                                use_stop_words=False, use_stemmer=False)
+    # Les variantes sont dérivées de l'index de base (une seule passe d'indexation)
     index_stop_no_stem = compute_statistics(1, "Text_Only_Ascii_Coll_NoSem",
-                                            use_stop_words=True, use_stemmer=False)
+                                            use_stop_words=True, use_stemmer=False,
+                                            base_index=index_no_stop_no_stem)
     index_stop_stem = compute_statistics(1, "Text_Only_Ascii_Coll_NoSem",
-                                         use_stop_words=True, use_stemmer=True)
+                                         use_stop_words=True, use_stemmer=True,
+                                         base_index=index_no_stop_no_stem)
     index_no_stop_stem = compute_statistics(1, "Text_Only_Ascii_Coll_NoSem",
-                                            use_stop_words=False, use_stemmer=True)
+                                            use_stop_words=False, use_stemmer=True,
+                                            base_index=index_no_stop_no_stem)
 
     # Première série de runs avec LTN
-    run_id = len([f for f in os.listdir("runs")
-                  if os.path.isfile(os.path.join("runs", f))])
-    for query_id, query_request in queries.items():
-        run_weighting_experiment(index_no_stop_no_stem, query_id, "ltn", query_request, run_id)
+    run_id = next_run_id()
+    run_weighting_experiment(index_no_stop_no_stem, queries, "ltn", run_id)
 
     # Série LTH
-    run_id = len([f for f in os.listdir("runs")
-                  if os.path.isfile(os.path.join("runs", f))])
-    for query_id, query_request in queries.items():
-        run_weighting_experiment(index_no_stop_no_stem, query_id, "ltc", query_request, run_id)
+    run_id = next_run_id()
+    run_weighting_experiment(index_no_stop_no_stem, queries, "ltc", run_id)
 
     # Série BM25
-    run_id = len([f for f in os.listdir("runs")
-                  if os.path.isfile(os.path.join("runs", f))])
-    for query_id, query_request in queries.items():
-        run_weighting_experiment(index_no_stop_no_stem, query_id, "bm25", query_request, run_id)
+    run_id = next_run_id()
+    run_weighting_experiment(index_no_stop_no_stem, queries, "bm25", run_id)
 
     # Séries complémentaires avec combinaisons stopwords/stemming
     algorithms = ["ltn", "ltc", "bm25"]
@@ -154,10 +182,8 @@ def main():
 
     for index in indexers:
         for algorithm in algorithms:
-            run_id = len([f for f in os.listdir("runs")
-                          if os.path.isfile(os.path.join("runs", f))])
-            for query_id, query_request in queries.items():
-                run_weighting_experiment(index, query_id, algorithm, query_request, run_id)
+            run_id = next_run_id()
+            run_weighting_experiment(index, queries, algorithm, run_id)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,47 @@
+"""
+Correspondance de positions pour les phrases et la proximité.
+
+Les positions sont les rangs des mots dans le document, stop words compris
+(voir Analyzer.analyze_positions) : une phrase dont un stop word a été retiré
+garde son écart. Les terms d'une phrase sont décrits par leur décalage (offset)
+dans la phrase (rang du mot, stop words compris, comme dans les documents).
+    - phrase exacte : p_i - p_0 = offset_i - offset_0 pour tous les terms
+    - proximité ~k : une fenêtre contenant une occurrence de chaque term, dans
+      n'importe quel ordre, de largeur au plus (étendue de la phrase) + k
+"""
+
+import heapq
+
+
+def match_phrase(position_lists, offsets):
+    """Vrai si les terms (listes de positions triées) se suivent avec ces décalages"""
+    order = sorted(range(len(position_lists)), key=lambda i: len(position_lists[i]))
+    first = order[0]
+    starts = {position - offsets[first] for position in position_lists[first]}
+    for i in order[1:]:
+        starts.intersection_update(position - offsets[i] for position in position_lists[i])
+        if not starts:
+            return False
+    return True
+
+
+def min_window(position_lists, limit=-1):
+    """
+    Largeur (dernière - première position) de la plus petite fenêtre contenant une
+    position de chaque liste : fusion des listes par tas, la fenêtre avance en
+    remplaçant sa plus petite position par la suivante de la même liste.
+    Le parcours s'arrête dès qu'une fenêtre de largeur au plus limit est trouvée.
+    """
+    heap = [(positions[0], i, 0) for i, positions in enumerate(position_lists)]
+    heapq.heapify(heap)
+    high = max(positions[0] for positions in position_lists)
+    best = high - heap[0][0]
+    while True:
+        low, i, j = heapq.heappop(heap)
+        best = min(best, high - low)
+        if best <= limit or j + 1 == len(position_lists[i]):
+            return best
+        following = position_lists[i][j + 1]
+        high = max(high, following)
+        heapq.heappush(heap, (following, i, j + 1))
+
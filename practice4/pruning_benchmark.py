@@ -0,0 +1,94 @@
+import contextlib
+import io
+import os
+import time
+
+from advanced_indexer import WeightedInvertedIndex
+from ranked_retrieval_optimized import RankedRetrieval
+
+
+# Chemins relatifs à practice4 : les benchmarks peuvent être lancés depuis n'importe quel dossier
+HERE = os.path.dirname(os.path.abspath(__file__))
+PRACTICE2_DATA = os.path.join(HERE, "..", "practice2", "data", "Practice_02_data")
+CACHE_DIR = os.path.join(HERE, "data", "norm_cache")
+QUERIES = [
+    "olive oil health benefit",
+    "notting hill film actors",
+    "probabilistic models in information retrieval",
+    "web link network analysis",
+    "web ranking scoring algorithm",
+    "supervised machine learning algorithm",
+    "operating system mutual exclusion",
+    # Termes fréquents de l'index sans stop words
+    "history of the war in europe",
+    "the city of new york in the united states",
+    "a list of the people in the world",
+]
+METHODS = [("taat", False), ("maxscore", "maxscore"), ("bmw", "bmw")]
+BM25_PARAMETERS = (2.0, 0.3)  # (k1, b) fixés sur le ranker après les mesures bm25 par défaut
+REPEAT = 5
+
+
+def load_collection():
+    """Tous les documents des fichiers de practice2 (couples (docno, texte))"""
+    reader = WeightedInvertedIndex()
+    documents = []
+    for filename in sorted(f for f in os.listdir(PRACTICE2_DATA) if f.endswith('.gz')):
+        documents.extend(reader.read_documents(os.path.join(PRACTICE2_DATA, filename), is_zipped=True))
+    return documents
+
+
+def run(ranker, scheme, top_k, pruning):
+    """Meilleur temps moyen par requête sur REPEAT passes, résultats et postings dont le poids est calculé"""
+    times = []
+    results = []
+    scored = 0
+    for _ in range(REPEAT):
+        results = []
+        scored = 0
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for query in QUERIES:
+                results.append(ranker.search_query(query, scheme, top_k, pruning=pruning))
+                if pruning:
+                    scored += ranker.pruning_stats['postings_scored']
+            times.append(time.perf_counter() - start)
+    return min(times) / len(QUERIES), results, scored
+
+
+def main():
+    """Latence et postings évalués : term-at-a-time, MaxScore, block-max WAND"""
+    index = WeightedInvertedIndex(integer_postings=True)
+    index.add_documents(load_collection())
+    ranker = RankedRetrieval(index, cache_dir=CACHE_DIR)
+
+    print("=" * 60)
+    print(f"ÉLAGAGE DYNAMIQUE : {index.doc_count} documents, {len(QUERIES)} requêtes, sans stop words")
+    print("=" * 60)
+
+    for scheme in ("ltn", "ltc", "bm25"):
+        # Normes, bornes et blocs calculés avant les mesures
+        run(ranker, scheme, 10, "bmw")
+        postings = sum(ranker.index.get_document_frequency(term)
+                       for query in QUERIES for term in ranker.process_query_terms(query) if term in ranker.df)
+        for top_k in (10, 100, 1000):
+            print(f"\n{scheme}, top {top_k}")
+            reference = None
+            for label, pruning in METHODS:
+                seconds, results, scored = run(ranker, scheme, top_k, pruning)
+                reference = reference or results
+                identical = "identique" if results == reference else "DIFFÉRENT"
+                scored = f"{scored:6d} postings" if pruning else f"{postings:6d} postings"
+                print(f"- {label:<8}: {seconds * 1000:6.2f} ms/requête  {scored}  ({identical})")
+
+    # Les bornes déjà calculées pour bm25 ne doivent pas servir avec d'autres (k1, b)
+    ranker.k1, ranker.b = BM25_PARAMETERS
+    print(f"\nbm25 avec k1 = {ranker.k1} et b = {ranker.b} (bornes par défaut déjà en cache), top 10")
+    _, reference, _ = run(ranker, "bm25", 10, False)
+    for label, pruning in METHODS[1:]:
+        _, results, _ = run(ranker, "bm25", 10, pruning)
+        print(f"- {label:<8}: {'identique' if results == reference else 'DIFFÉRENT'} au term-at-a-time")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import math
-from collections import defaultdict
+
+from scoring import accumulate, select_top_k
 
 class RankedRetrieval:
     def __init__(self, index):
@@ -8,21 +9,26 @@ class RankedRetrieval:
         self.avg_dl = index.avg_doc_length
         
         # Pré-calculer df pour tous les termes
-        self.df = {}
-        for term, doc_dict in index.dictionary.items():
-            self.df[term] = len(doc_dict)
+        self.df = index.get_document_frequencies()
+
+        # Longueurs des documents par doc id entier (pour le parcours des postings)
+        self.doc_lengths = index.get_doc_length_array()
         
         # Cache optionnel pour les normes (vide au début)
         self._doc_norms_cache = {}
     
     def _compute_document_norm(self, doc_id):
         """Calcule la norme cosinus d'un document spécifique"""
+        # Normes suivies par l'index pendant l'indexation
+        if self.index.tracks_cosine_norms():
+            return self.index.get_cosine_norm(doc_id)
+
         sum_of_squares = 0.0
         
         # Parcourir tous les termes de ce document
-        for term, doc_dict in self.index.dictionary.items():
-            if doc_id in doc_dict:
-                tf = doc_dict[doc_id]
+        for term in self.index.dictionary:
+            tf = self.index.get_tf(term, doc_id)
+            if tf > 0:
                 df = self.df[term]
                 
                 # Calcul du poids brut pour chaque terme
@@ -39,10 +45,10 @@ class RankedRetrieval:
         """SMART ltn weighting: logarithmic tf, idf, pad de normalization"""
         # ltn: (1 + log(tf)) * log(N/df)
 
-        if term not in self.index.dictionary or doc_id not in self.index.dictionary[term]:
+        tf = self.index.get_tf(term, doc_id)
+        if tf == 0:
             return 0.0
 
-        tf = self.index.dictionary[term][doc_id]
         df = self.df[term]
          
         w_tf = 1.0 + math.log10(tf) if tf > 0 else 0.0
@@ -55,10 +61,10 @@ class RankedRetrieval:
         # ltn_values = 1 + log(tf)) * log(N/df)
         # ltc: ltn_values / sqrt(sum_of_squares(ltn_values)) 
 
-        if term not in self.index.dictionary or doc_id not in self.index.dictionary[term]:
+        tf = self.index.get_tf(term, doc_id)
+        if tf == 0:
             return 0.0
         
-        tf = self.index.dictionary[term][doc_id]
         df = self.df[term]
         
         # Calcul du poids brut (identique à ltn)
@@ -66,15 +72,16 @@ class RankedRetrieval:
         w_idf = math.log10(self.doc_count / df) if df > 0 and self.doc_count > df else 0.0
         raw_weight = w_tf * w_idf
         
-        # Calcul de la norme avec cache optionnel
-        if use_cache:
-            if doc_id not in self._doc_norms_cache:
-                self._doc_norms_cache[doc_id] = self._compute_document_norm(doc_id)
-            doc_norm = self._doc_norms_cache[doc_id]
-        else:
-            doc_norm = self._compute_document_norm(doc_id)
-        
+        doc_norm = self._get_document_norm(doc_id, use_cache)
         return raw_weight / doc_norm if doc_norm > 0 else 0.0
+
+    def _get_document_norm(self, doc_id, use_cache=True):
+        """Norme cosinus d'un document, avec cache optionnel"""
+        if not use_cache:
+            return self._compute_document_norm(doc_id)
+        if doc_id not in self._doc_norms_cache:
+            self._doc_norms_cache[doc_id] = self._compute_document_norm(doc_id)
+        return self._doc_norms_cache[doc_id]
     
     def bm25_weighting(self, term, doc_id, k1=1.2, b=0.75):
         """BM25 weighting avec paramètres standard"""
@@ -85,12 +92,12 @@ class RankedRetrieval:
         # - k1 = paramètre de saturation TF (valeur par défaut: 1.2)
         # - b = paramètre de normalisation longueur (valeur par défaut: 0.75)
 
-        if term not in self.index.dictionary or doc_id not in self.index.dictionary[term]:
+        tf = self.index.get_tf(term, doc_id)
+        if tf == 0:
             return 0.0
         
-        tf = self.index.dictionary[term][doc_id]
         df = self.df[term]
-        doc_length = self.index.doc_lengths[doc_id]
+        doc_length = self.index.get_doc_length(doc_id)
         
         # Calcul BM25
         idf = math.log10((self.doc_count - df + 0.5) / (df + 0.5))
@@ -104,6 +111,34 @@ class RankedRetrieval:
         tokens = self.index.process_tokens(tokens)
         return list(set(tokens)) # termes uniques
 
+    def weighted_postings(self, term, weighting_scheme="ltn", k1=1.2, b=0.75):
+        """
+        Couples (doc id entier, poids) des postings d'un terme, avec les mêmes
+        calculs que smart_ltn_weighting, smart_ltc_weighting et bm25_weighting
+        """
+        if term not in self.df:
+            return
+        df = self.df[term]
+        postings = self.index.get_posting_list(term).pairs()
+
+        if weighting_scheme == "bm25":
+            idf = math.log10((self.doc_count - df + 0.5) / (df + 0.5))
+            for doc_number, tf in postings:
+                doc_length = self.doc_lengths[doc_number]
+                tf_component = (tf * (k1 + 1)) / (tf + k1 * (1 - b + b * (doc_length / self.avg_dl)))
+                yield doc_number, idf * tf_component
+            return
+
+        w_idf = math.log10(self.doc_count / df) if df > 0 and self.doc_count > df else 0.0
+        for doc_number, tf in postings:
+            raw_weight = (1.0 + math.log10(tf)) * w_idf
+            if weighting_scheme == "ltc":
+                # Norme calculée seulement pour les documents qui contiennent un terme de la requête
+                doc_norm = self._get_document_norm(self.index.doc_ids[doc_number])
+                yield doc_number, raw_weight / doc_norm if doc_norm > 0 else 0.0
+            else:
+                yield doc_number, raw_weight
+
     def search_query(self, query, weighting_scheme="ltn", top_k=10):
         """Recherche une requête avec le schéma de pondération spécifié"""
         # Traitement de la requête
@@ -111,30 +146,12 @@ class RankedRetrieval:
         
         print(f" * Recherche: '{query}' -> termes: {query_terms}")
         
-        # Calcul des scores pour tous les documents
-        doc_scores = defaultdict(float)
-        
-        for doc_id in self.index.doc_ids:
-            score = 0.0
-            for term in query_terms:
-                if weighting_scheme == "ltn":
-                    term_weight = self.smart_ltn_weighting(term, doc_id)
-                elif weighting_scheme == "ltc":
-                    term_weight = self.smart_ltc_weighting(term, doc_id)
-                elif weighting_scheme == "bm25":
-                    term_weight = self.bm25_weighting(term, doc_id)
-                else:
-                    term_weight = self.smart_ltn_weighting(term, doc_id)
-                
-                score += term_weight
-            
-            if score > 0:
-                doc_scores[doc_id] = score
-        
-        # Tri par score décroissant
-        sorted_docs = sorted(doc_scores.items(), key=lambda x: x[1], reverse=True)
+        # Scores term-at-a-time : seuls les postings des termes de la requête sont parcourus
+        accumulator = accumulate(self.weighted_postings(term, weighting_scheme) for term in query_terms)
         
-        return sorted_docs[:top_k]
+        # Top-k par score décroissant
+        doc_ids = self.index.doc_ids
+        return [(doc_ids[doc_number], score) for doc_number, score in select_top_k(accumulator, top_k)]
     
     def get_term_weight(self, term, doc_id, weighting_scheme):
         """Retourne le poids d'un terme spécifique dans un document"""
@@ -1,11 +1,21 @@
 import math
 import pickle
 import os
-from collections import defaultdict
+
+from impacts import ImpactIndex
+from postings import BlockMaxes
+from proximity import min_window
+from scoring import accumulate, accumulate_batch, block_max_wand_top_k, max_score_top_k, select_top_k
+from weight_tables import LOG_TF_SIZE, WeightTables
+
+PROXIMITY_DEPTH = 100  # meilleurs documents reclassés par le bonus de proximité
 
 class RankedRetrieval:
-    def __init__(self, index, cache_dir="data/norm_cache"):
+    def __init__(self, index, cache_dir="data/norm_cache", backend="python", result_cache=None, k1=1.2, b=0.75):
         self.index = index
+        # Paramètres de bm25 des recherches (et de la clé du cache des résultats)
+        self.k1 = k1
+        self.b = b
         self.doc_count = index.doc_count
         self.avg_dl = index.avg_doc_length
         self.cache_dir = cache_dir
@@ -15,29 +25,54 @@ class RankedRetrieval:
             os.makedirs(cache_dir)
         
         # Pré-calculer df pour tous les termes
-        self.df = {}
-        for term, doc_dict in index.dictionary.items():
-            self.df[term] = len(doc_dict)
+        self.df = index.get_document_frequencies()
+
+        # Longueurs des documents par doc id entier (pour le parcours des postings)
+        self.doc_lengths = index.get_doc_length_array()
+
+        # Tables de poids (idf, log-tf, normalisation de longueur), construites au premier
+        # besoin pour l'état de l'index noté dans _generation (voir weight_tables())
+        self._tables = None
+        self._generation = index.generation
         
         # Initialiser le cache des normes cosine (vide au début)
         self._cosine_norms_cache = None
+
+        # Bornes supérieures des poids par (schéma, terme[, k1, b]), pour l'élagage MaxScore / BMW
+        self._max_scores = {}
+        self._block_maxes = {}
+        self.pruning_stats = None
+
+        # Backend "numpy" : scores calculés sur la matrice terme-document exportée
+        # (NumPy n'est importé que dans ce cas)
+        if backend not in ("python", "numpy"):
+            raise ValueError(f"Backend inconnu : {backend}")
+        self.backend = backend
+        self.matrix = None
+        if backend == "numpy":
+            from matrix_backend import TermDocumentMatrix
+            self.matrix = TermDocumentMatrix.from_index(index)
+
+        # Cache optionnel des résultats (ResultCache), partagé par search_query et search_batch
+        # (et éventuellement par les rankers d'autres index)
+        self.result_cache = result_cache
+        self._result_fingerprint = None  # empreinte de l'index lors de la dernière requête en cache
     
     def _get_cosine_norms_cache_filename(self):
-        """Génère un nom de fichier de cache basé sur les caractéristiques de l'index"""
-        index_hash = hash((
-            self.doc_count,
-            self.index.total_terms,
-            len(self.index.dictionary),
-            self.index.stop_word_active,
-            self.index.stemmer_active
-        ))
-        return os.path.join(self.cache_dir, f"cosine_norms_{abs(index_hash)}.pkl")
+        """Génère un nom de fichier de cache à partir de l'empreinte du contenu de l'index"""
+        return os.path.join(self.cache_dir, f"cosine_norms_{self.index.content_fingerprint()}.pkl")
     
     def _load_or_compute_cosine_norms(self):
         """Charge les normes cosine depuis le cache ou les calcule si nécessaire"""
         # Si déjà chargé, retourner le cache
         if self._cosine_norms_cache is not None:
             return self._cosine_norms_cache
+
+        # Normes suivies pendant l'indexation (ou relues avec l'index) : pas de calcul ni de fichier cache
+        if self.index.tracks_cosine_norms():
+            norms = dict(zip(self.index.doc_ids, self.index.get_cosine_norm_array()))
+            self._cosine_norms_cache = norms
+            return norms
             
         cache_file = self._get_cosine_norms_cache_filename()
         
@@ -73,13 +108,12 @@ class RankedRetrieval:
         doc_norms = {doc_id: 0.0 for doc_id in self.index.doc_ids}
         
         # Parcourir chaque terme une seule fois
-        for term, doc_dict in self.index.dictionary.items():
-            df = len(doc_dict)
-            w_idf = math.log10(self.doc_count / df) if df > 0 and self.doc_count > df else 0.0
+        tables = self.weight_tables()
+        for term in self.index.dictionary:
+            w_idf = tables.ltn_idf[term]
             
-            for doc_id, tf in doc_dict.items():
-                w_tf = 1.0 + math.log10(tf) if tf > 0 else 0.0
-                raw_weight = w_tf * w_idf
+            for doc_id, tf in self.index.iter_postings(term):
+                raw_weight = tables.log_tf_weight(tf) * w_idf
                 doc_norms[doc_id] += raw_weight ** 2
         
         # Prendre la racine carrée
@@ -91,51 +125,70 @@ class RankedRetrieval:
 
     def smart_ltn_weighting(self, term, doc_id):
         """SMART ltn weighting: logarithmic tf, idf, pas de normalization"""
-        if term not in self.index.dictionary or doc_id not in self.index.dictionary[term]:
+        tables = self.weight_tables()
+        tf = self.index.get_tf(term, doc_id)
+        if tf == 0:
             return 0.0
 
-        tf = self.index.dictionary[term][doc_id]
-        df = self.df[term]
-         
-        w_tf = 1.0 + math.log10(tf) if tf > 0 else 0.0
-        w_idf = math.log10(self.doc_count / df) if df > 0 and self.doc_count > df else 0.0
-        
-        return w_tf * w_idf
+        return tables.log_tf_weight(tf) * tables.ltn_idf[term]
 
     def smart_ltc_weighting(self, term, doc_id):
         """SMART ltc weighting: logarithmic tf, idf, normalization cosinus"""
-        if term not in self.index.dictionary or doc_id not in self.index.dictionary[term]:
+        tables = self.weight_tables()
+        tf = self.index.get_tf(term, doc_id)
+        if tf == 0:
             return 0.0
         
         # Charger les normes cosine seulement si nécessaire (lazy loading)
         if self._cosine_norms_cache is None:
             self._load_or_compute_cosine_norms()
         
-        tf = self.index.dictionary[term][doc_id]
-        df = self.df[term]
-        
-        w_tf = 1.0 + math.log10(tf) if tf > 0 else 0.0
-        w_idf = math.log10(self.doc_count / df) if df > 0 and self.doc_count > df else 0.0
-        raw_weight = w_tf * w_idf
+        raw_weight = tables.log_tf_weight(tf) * tables.ltn_idf[term]
         
         # Utilise la norme cosine pré-calculée
         doc_norm = self._cosine_norms_cache.get(doc_id, 1.0)
         return raw_weight / doc_norm if doc_norm > 0 else 0.0
     
-    def bm25_weighting(self, term, doc_id, k1=1.2, b=0.75):
-        """BM25 weighting avec paramètres standard"""
-        if term not in self.index.dictionary or doc_id not in self.index.dictionary[term]:
+    def bm25_weighting(self, term, doc_id, k1=None, b=None):
+        """BM25 weighting, avec les paramètres du ranker par défaut"""
+        k1 = self.k1 if k1 is None else k1
+        b = self.b if b is None else b
+        tables = self.weight_tables()
+        tf = self.index.get_tf(term, doc_id)
+        if tf == 0:
             return 0.0
         
-        tf = self.index.dictionary[term][doc_id]
-        df = self.df[term]
-        doc_length = self.index.doc_lengths[doc_id]
+        length_norm = tables.length_norms(k1, b)[self.index.doc_index[doc_id]]
+        tf_component = (tf * (k1 + 1)) / (tf + length_norm)
         
-        idf = math.log10((self.doc_count - df + 0.5) / (df + 0.5))
-        tf_component = (tf * (k1 + 1)) / (tf + k1 * (1 - b + b * (doc_length / self.avg_dl)))
-        
-        return idf * tf_component
+        return tables.bm25_idf[term] * tf_component
     
+    def weight_tables(self):
+        """
+        Tables de poids de l'état courant de l'index. Si l'index a été modifié
+        (index.generation), les statistiques gardées par le ranker (N, avgdl, df,
+        longueurs), les tables, les normes cosinus et les bornes d'élagage sont recalculées.
+        """
+        if self._generation != self.index.generation:
+            self.doc_count = self.index.doc_count
+            self.avg_dl = self.index.avg_doc_length
+            self.df = self.index.get_document_frequencies()
+            self.doc_lengths = self.index.get_doc_length_array()
+            self._cosine_norms_cache = None
+            self._max_scores = {}
+            self._block_maxes = {}
+            self._tables = None
+            if self.matrix is not None:
+                self.matrix = type(self.matrix).from_index(self.index)
+            self._generation = self.index.generation
+        if self._tables is None:
+            self._tables = WeightTables(self.doc_count, self.avg_dl, self.df, self.doc_lengths)
+        return self._tables
+
+    def memory_usage(self):
+        """Octets occupés par les tables de poids (voir WeightTables.memory_usage)"""
+        return self.weight_tables().memory_usage()
+
     def process_query_terms(self, query):
         """Traiter la requête pour extraire les termes"""
         tokens = self.index.apply_tokenization(query)
@@ -143,38 +196,259 @@ class RankedRetrieval:
         #return list(set(tokens))
         return sorted(set(tokens))  # termes uniques triés
 
-    def search_query(self, query, weighting_scheme="ltn", top_k=10):
-        """Recherche une requête avec le schéma de pondération spécifié"""
+    def posting_weigher(self, term, weighting_scheme="ltn", k1=None, b=None):
+        """
+        Fonction (doc id entier, tf) -> poids d'un posting du terme, avec les mêmes
+        calculs que smart_ltn_weighting, smart_ltc_weighting et bm25_weighting
+        (k1 et b du ranker par défaut).
+        """
+        k1 = self.k1 if k1 is None else k1
+        b = self.b if b is None else b
+        tables = self.weight_tables()
+
+        if weighting_scheme == "bm25":
+            idf = tables.bm25_idf[term]
+            length_norms = tables.length_norms(k1, b)
+            k1_plus_1 = k1 + 1
+
+            def weigh(doc_number, tf):
+                tf_component = (tf * k1_plus_1) / (tf + length_norms[doc_number])
+                return idf * tf_component
+            return weigh
+
+        w_idf = tables.ltn_idf[term]
+        log_tf = tables.log_tf
+        if weighting_scheme == "ltc":
+            doc_ids = self.index.doc_ids
+            norms = self._cosine_norms_cache
+
+            def weigh(doc_number, tf):
+                doc_norm = norms.get(doc_ids[doc_number], 1.0)
+                raw_weight = (log_tf[tf] if tf < LOG_TF_SIZE else 1.0 + math.log10(tf)) * w_idf
+                return raw_weight / doc_norm if doc_norm > 0 else 0.0
+            return weigh
+
+        def weigh(doc_number, tf):
+            return (log_tf[tf] if tf < LOG_TF_SIZE else 1.0 + math.log10(tf)) * w_idf
+        return weigh
+
+    def weighted_postings(self, term, weighting_scheme="ltn"):
+        """Couples (doc id entier, poids) des postings d'un terme"""
+        if term not in self.df:
+            return iter(())
+        postings = self.index.get_posting_list(term)
+        doc_numbers = postings.doc_ids()
+        return zip(doc_numbers, map(self.posting_weigher(term, weighting_scheme), doc_numbers, postings.tfs()))
+
+    def block_maxes(self, term, weighting_scheme="ltn"):
+        """
+        Métadonnées block-max (dernier doc id et poids maximal de chaque bloc de
+        postings.BLOCK_SIZE postings) du terme pour le schéma (et les k1, b courants
+        du ranker pour bm25), calculées au premier besoin puis gardées pour les
+        requêtes suivantes
+        """
+        key = self._bound_key(term, weighting_scheme)
+        if key not in self._block_maxes:
+            postings = self.index.get_posting_list(term)
+            doc_numbers = postings.doc_ids()
+            weights = list(map(self.posting_weigher(term, weighting_scheme), doc_numbers, postings.tfs()))
+            self._block_maxes[key] = BlockMaxes.from_weights(doc_numbers, weights)
+        return self._block_maxes[key]
+
+    def _bound_key(self, term, weighting_scheme):
+        """Clé des bornes d'un terme : les poids bm25 dépendent aussi de k1 et b (modifiables)"""
+        if weighting_scheme == "bm25":
+            return (weighting_scheme, term, self.k1, self.b)
+        return (weighting_scheme, term)
+
+    def max_score(self, term, weighting_scheme="ltn"):
+        """Borne supérieure du poids d'un terme sur tous ses postings (0 au minimum)"""
+        key = self._bound_key(term, weighting_scheme)
+        if key not in self._max_scores:
+            self._max_scores[key] = self.block_maxes(term, weighting_scheme).max_weight()
+        return self._max_scores[key]
+
+    def search_query(self, query, weighting_scheme="ltn", top_k=10, pruning=False, proximity=None):
+        """
+        Recherche une requête avec le schéma de pondération spécifié.
+        pruning : False (term-at-a-time, ou matrice si backend="numpy"), "maxscore"
+        (ou True) ou "bmw" (block-max WAND) ; mêmes résultats, les documents non compétitifs
+        sont ignorés et les compteurs de la dernière requête sont dans self.pruning_stats
+        proximity : poids du bonus de proximité (voir proximity_rerank), None = pas de
+        bonus ; les max(top_k, PROXIMITY_DEPTH) meilleurs documents sont reclassés
+        """
         query_terms = self.process_query_terms(query) 
         
         print(f" * Recherche: '{query}' -> termes: {query_terms}")
+
+        if proximity is not None and not self.index.has_positions():
+            raise ValueError("Le bonus de proximité nécessite un index positionnel (positions=True)")
+        requested_k = top_k
+        if proximity is not None:
+            top_k = max(top_k, PROXIMITY_DEPTH)
+
+        cache_key = None
+        if self.result_cache is not None:
+            cache_key = self._result_cache_key(query_terms, weighting_scheme, requested_k, proximity)
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                self.pruning_stats = None
+                return cached
+
+        self.weight_tables()
         
-        # Précharger les normes cosine seulement si nécessaire pour LTC
-        if weighting_scheme == "ltc" and self._cosine_norms_cache is None:
+        # Précharger les normes cosine seulement si nécessaire pour LTC (le backend
+        # numpy calcule les siennes sur la matrice)
+        if weighting_scheme == "ltc" and self._cosine_norms_cache is None and (pruning or self.matrix is None):
             self._load_or_compute_cosine_norms()
         
-        doc_scores = defaultdict(float)
-        
-        for doc_id in self.index.doc_ids:
-            score = 0.0
-            for term in query_terms:
-                if weighting_scheme == "ltn":
-                    term_weight = self.smart_ltn_weighting(term, doc_id)
-                elif weighting_scheme == "ltc":
-                    term_weight = self.smart_ltc_weighting(term, doc_id)
-                elif weighting_scheme == "bm25":
-                    term_weight = self.bm25_weighting(term, doc_id)
-                else:
-                    term_weight = self.smart_ltn_weighting(term, doc_id)
-                
-                score += term_weight
-            
-            if score > 0:
-                doc_scores[doc_id] = score
+        if pruning:
+            # Document par document, avec les bornes des termes (dans l'ordre de la requête)
+            terms = [term for term in query_terms if term in self.df]
+            postings = [self.index.get_posting_list(term) for term in terms]
+            arguments = ([p.doc_ids() for p in postings], [p.tfs() for p in postings],
+                         [self.posting_weigher(term, weighting_scheme) for term in terms],
+                         [self.max_score(term, weighting_scheme) for term in terms])
+            if pruning == "bmw":
+                top_docs, self.pruning_stats = block_max_wand_top_k(
+                    *arguments, [self.block_maxes(term, weighting_scheme) for term in terms], top_k)
+            elif pruning is True or pruning == "maxscore":
+                top_docs, self.pruning_stats = max_score_top_k(*arguments, top_k)
+            else:
+                raise ValueError(f"Élagage inconnu : {pruning}")
+        elif self.matrix is not None:
+            # Lignes des termes de la requête, poids vectorisés
+            top_docs = self.matrix.search(query_terms, weighting_scheme, top_k, self.k1, self.b)
+        else:
+            # Term-at-a-time : seuls les postings des termes de la requête sont parcourus
+            accumulator = accumulate(self.weighted_postings(term, weighting_scheme) for term in query_terms)
+            top_docs = select_top_k(accumulator, top_k)
+
+        if proximity is not None:
+            top_docs = self.proximity_rerank(query_terms, top_docs, proximity, requested_k)
         
-        sorted_docs = sorted(doc_scores.items(), key=lambda x: x[1], reverse=True)
-        return sorted_docs[:top_k]
+        doc_ids = self.index.doc_ids
+        results = [(doc_ids[doc_number], score) for doc_number, score in top_docs]
+        if cache_key is not None:
+            self.result_cache.put(cache_key, results)
+        return results
+
+    def _result_cache_key(self, query_terms, weighting_scheme, top_k, proximity=None):
+        """
+        Clé d'une requête dans le cache des résultats. L'élagage n'en fait pas partie
+        (mêmes résultats) ; bm25 dépend des paramètres k1 et b du ranker.
+        """
+        params = (self.k1, self.b) if weighting_scheme == "bm25" else ()
+        if proximity is not None:
+            params += (("proximity", proximity, PROXIMITY_DEPTH),)
+        return (self._result_cache_fingerprint(), tuple(query_terms), weighting_scheme, params, top_k, self.backend)
+
+    def _result_cache_fingerprint(self):
+        """
+        Empreinte de l'index pour les clés du cache des résultats. Si elle a changé depuis
+        la dernière requête, les entrées de l'ancien état sont invalidées dans le cache
+        (celles des autres index qui le partagent sont gardées).
+        """
+        fingerprint = self.index.content_fingerprint()
+        if fingerprint != self._result_fingerprint:
+            if self._result_fingerprint is not None:
+                self.result_cache.invalidate(self._result_fingerprint)
+            self._result_fingerprint = fingerprint
+        return fingerprint
     
+    def proximity_rerank(self, query_terms, top_docs, proximity, top_k):
+        """
+        Reclasse des couples (doc id entier, score) avec score * (1 + proximity * c) :
+        parmi les n terms de la requête présents dans l'index, le document en contient m,
+        tenant dans une fenêtre de largeur w (voir proximity.min_window), et
+        c = (m - 1) / (n - 1) * (m - 1) / w vaut 1 quand tous les terms se suivent.
+        Les positions ne sont décodées que pour les documents reclassés.
+        """
+        terms = [term for term in query_terms if term in self.df]
+        if len(terms) < 2:
+            return top_docs[:top_k]
+
+        doc_numbers = sorted(doc_number for doc_number, _ in top_docs)
+        positions = {}  # term -> {doc id entier: positions} des documents qui le contiennent
+        for term in terms:
+            postings = self.index.get_posting_list(term)
+            present = [doc_number for doc_number in doc_numbers if postings.get_tf(doc_number)]
+            positions[term] = dict(zip(present, self.index.get_positions(term, present)))
+
+        boosted = {}
+        for doc_number, score in top_docs:
+            lists = [positions[term][doc_number] for term in terms if doc_number in positions[term]]
+            closeness = 0.0
+            if len(lists) > 1:
+                closeness = (len(lists) - 1) / (len(terms) - 1) * (len(lists) - 1) / min_window(lists)
+            boosted[doc_number] = score * (1 + proximity * closeness)
+        return select_top_k(boosted, top_k)
+
+    def search_batch(self, queries, weighting_scheme="ltn", top_k=10):
+        """
+        Recherche d'un lot de requêtes en une passe : résultats alignés sur queries,
+        identiques à search_query() pour chacune. La liste de postings d'un terme
+        commun à plusieurs requêtes n'est lue et pondérée qu'une fois.
+        """
+        query_terms = [self.process_query_terms(query) for query in queries]
+
+        # Requêtes déjà en cache : seules les autres sont calculées
+        results = [None] * len(queries)
+        cache_keys = None
+        if self.result_cache is not None:
+            cache_keys = [self._result_cache_key(terms, weighting_scheme, top_k) for terms in query_terms]
+            results = [self.result_cache.get(key) for key in cache_keys]
+        missing = [position for position, cached in enumerate(results) if cached is None]
+        query_terms = [query_terms[position] for position in missing]
+
+        # Matrice requête-terme creuse : terme -> positions des requêtes qui le contiennent
+        term_queries = {}
+        for position, terms in enumerate(query_terms):
+            for term in terms:
+                term_queries.setdefault(term, []).append(position)
+
+        print(f" * Recherche de {len(queries)} requêtes ({len(term_queries)} termes distincts)")
+        if not missing:
+            return results
+        self.weight_tables()
+
+        if self.matrix is not None:
+            top_docs = self.matrix.search_batch(term_queries, len(missing), weighting_scheme, top_k,
+                                                self.k1, self.b)
+        else:
+            if weighting_scheme == "ltc" and self._cosine_norms_cache is None:
+                self._load_or_compute_cosine_norms()
+            # Les termes de chaque requête sont triés : l'ordre trié global garde, pour
+            # chaque requête, l'ordre d'addition de search_query()
+            accumulators = accumulate_batch(((term_queries[term], self.weighted_postings(term, weighting_scheme))
+                                             for term in sorted(term_queries)), len(missing))
+            top_docs = [select_top_k(accumulator, top_k) for accumulator in accumulators]
+
+        doc_ids = self.index.doc_ids
+        for position, query_docs in zip(missing, top_docs):
+            results[position] = [(doc_ids[doc_number], score) for doc_number, score in query_docs]
+            if cache_keys is not None:
+                self.result_cache.put(cache_keys[position], results[position])
+        return results
+
+    def build_impact_index(self, weighting_scheme="bm25", bits=8):
+        """Postings de l'index pondérés avec ce schéma, quantifiés et triés par impact"""
+        return ImpactIndex.build(self, weighting_scheme, bits)
+
+    def search_impacts(self, query, impact_index, top_k=10, posting_budget=None):
+        """
+        Recherche score-at-a-time sur un index d'impacts construit par build_impact_index().
+        posting_budget : nombre maximal de postings traités (les plus forts impacts d'abord) ;
+        scores approchés, les compteurs de la dernière requête sont dans self.pruning_stats
+        """
+        query_terms = self.process_query_terms(query)
+
+        print(f" * Recherche: '{query}' -> termes: {query_terms}")
+
+        top_docs, self.pruning_stats = impact_index.search(query_terms, top_k, posting_budget)
+        doc_ids = self.index.doc_ids
+        return [(doc_ids[doc_number], score) for doc_number, score in top_docs]
+
     def get_term_weight(self, term, doc_id, weighting_scheme):
         """Retourne le poids d'un terme spécifique dans un document"""
         # Précharger les normes cosine seulement si nécessaire pour LTC
@@ -196,4 +470,7 @@ class RankedRetrieval:
         if os.path.exists(cache_file):
             os.remove(cache_file)
             self._cosine_norms_cache = None
+            # Les bornes ltc dépendent des normes
+            self._max_scores = {key: bound for key, bound in self._max_scores.items() if key[0] != "ltc"}
+            self._block_maxes = {key: blocks for key, blocks in self._block_maxes.items() if key[0] != "ltc"}
             print("Cache des normes cosine effacé!")
\ No newline at end of file
@@ -0,0 +1,139 @@
+"""
+Cache des résultats de requêtes à deux niveaux.
+
+Une entrée est identifiée par (empreinte du contenu de l'index, terms traités triés,
+schéma, paramètres, top k, backend) : deux requêtes dont le texte diffère mais qui
+donnent les mêmes terms partagent leur résultat, et un index modifié a une autre
+empreinte, donc aucune entrée calculée sur l'ancien état ne peut être relue.
+Un même cache peut servir plusieurs index : leurs entrées cohabitent et vieillissent
+dans le même LRU. Le ranker qui voit changer l'empreinte de son index appelle
+invalidate() pour jeter tout de suite les entrées de l'ancien état.
+    - mémoire : LRU (OrderedDict) borné par un budget en octets (taille estimée des résultats)
+    - disque (optionnel) : un fichier pickle par entrée dans cache_dir/<empreinte>/,
+      qui survit au redémarrage du programme ; pas d'éviction, clear() vide le dossier
+"""
+
+import hashlib
+import os
+import pickle
+import shutil
+import sys
+from collections import OrderedDict
+
+
+def result_size(results):
+    """Taille estimée en octets d'une liste de résultats [(docno, score), ...]"""
+    size = sys.getsizeof(results)
+    for doc_id, score in results:
+        size += sys.getsizeof((doc_id, score)) + sys.getsizeof(doc_id) + sys.getsizeof(score)
+    return size
+
+
+class ResultCache:
+    """Résultats de recherche mis en cache en mémoire (LRU) et, si cache_dir est donné, sur disque"""
+
+    def __init__(self, memory_budget=16 << 20, cache_dir=None):
+        self.memory_budget = memory_budget
+        self.cache_dir = cache_dir
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+        self._entries = OrderedDict()  # clé -> (résultats, taille estimée)
+        self.memory_size = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def invalidate(self, fingerprint):
+        """
+        Index modifié : ses entrées en mémoire (empreinte fingerprint) ne seront plus
+        jamais demandées, elles sont jetées. Les entrées des autres index sont gardées.
+        """
+        stale = [key for key in self._entries if key[0] == fingerprint]
+        for key in stale:
+            _, size = self._entries.pop(key)
+            self.memory_size -= size
+        self.invalidations += len(stale)
+
+    def _path(self, key):
+        """Fichier de l'entrée sur disque, rangé sous l'empreinte de l'index (key[0])"""
+        name = hashlib.blake2b(repr(key[1:]).encode('utf-8'), digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, key[0], f"{name}.pkl")
+
+    def _keep_in_memory(self, key, results):
+        """Ajoute une entrée au LRU puis évince les plus anciennes jusqu'à tenir dans le budget"""
+        size = result_size(results)
+        if size > self.memory_budget:
+            return
+        self._entries[key] = (results, size)
+        self.memory_size += size
+        while self.memory_size > self.memory_budget:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.memory_size -= evicted_size
+            self.evictions += 1
+
+    def get(self, key):
+        """Résultats de l'entrée key, ou None ; key[0] est l'empreinte de l'index"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.memory_hits += 1
+            return list(entry[0])
+
+        if self.cache_dir is not None:
+            path = self._path(key)
+            if os.path.exists(path):
+                try:
+                    with open(path, 'rb') as file:
+                        stored_key, results = pickle.load(file)
+                except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+                    stored_key = None  # fichier tronqué : l'entrée sera recalculée et réécrite
+                if stored_key == key:
+                    self.disk_hits += 1
+                    self._keep_in_memory(key, results)
+                    return list(results)
+
+        self.misses += 1
+        return None
+
+    def put(self, key, results):
+        """Enregistre les résultats d'une requête calculée après un get() manqué"""
+        if key in self._entries:
+            return
+        results = list(results)
+        self._keep_in_memory(key, results)
+
+        if self.cache_dir is not None:
+            # Fichier temporaire puis remplacement : pas d'entrée à moitié écrite
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = path + '.tmp'
+            with open(temp_path, 'wb') as file:
+                pickle.dump((key, results), file)
+            os.replace(temp_path, path)
+
+    def clear(self):
+        """Vide les deux niveaux (et remet les compteurs à zéro)"""
+        self._entries.clear()
+        self.memory_size = 0
+        self.memory_hits = self.disk_hits = self.misses = self.evictions = self.invalidations = 0
+        if self.cache_dir is not None:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def stats(self):
+        """Compteurs du cache depuis sa création (ou le dernier clear())"""
+        hits = self.memory_hits + self.disk_hits
+        requests = hits + self.misses
+        return {
+            'hits': hits,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': hits / requests if requests else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'entries': len(self._entries),
+            'memory_size': self.memory_size,
+        }
@@ -0,0 +1,116 @@
+import contextlib
+import io
+import random
+import shutil
+import tempfile
+import time
+
+from advanced_indexer import WeightedInvertedIndex, derive
+from batch_benchmark import make_topics
+from porterstemmer import stem_word
+from pruning_benchmark import CACHE_DIR, load_collection
+from ranked_retrieval_optimized import RankedRetrieval
+from result_cache import ResultCache
+
+
+TOPIC_COUNT = 200
+TRAFFIC = 3000
+TOP_K = 100
+SCHEME = "bm25"
+
+
+def make_traffic(topics, count, seed=0):
+    """Trafic répétitif : la i-ème requête la plus populaire est tirée avec une probabilité en 1 / i"""
+    generator = random.Random(seed)
+    return generator.choices(topics, weights=[1 / rank for rank in range(1, len(topics) + 1)], k=count)
+
+
+def replay(ranker, traffic):
+    """Temps total et résultats de la série de requêtes"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        results = [ranker.search_query(query, SCHEME, TOP_K) for query in traffic]
+    return time.perf_counter() - start, results
+
+
+def replay_alternated(rankers, traffic):
+    """Comme replay(), chaque requête étant envoyée tour à tour à chacun des rankers"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        results = [ranker.search_query(query, SCHEME, TOP_K) for query in traffic for ranker in rankers]
+    return time.perf_counter() - start, results
+
+
+def report(label, elapsed, reference_time, results, expected, cache):
+    stats = cache.stats() if cache is not None else None
+    identical = "identique" if results == expected else "DIFFÉRENT"
+    line = f"- {label:<26}: {elapsed:6.3f} s  {len(results) / elapsed:8.1f} requêtes/s  x{reference_time / elapsed:5.1f}  {identical}"
+    print(line)
+    if stats:
+        print(f"    succès {stats['hit_rate']:.1%} (mémoire {stats['memory_hits']}, disque {stats['disk_hits']}), "
+              f"échecs {stats['misses']}, évictions {stats['evictions']}, invalidations {stats['invalidations']}, "
+              f"{stats['entries']} entrées / {stats['memory_size'] / 1e6:.2f} Mo")
+
+
+def main():
+    """Débit d'un trafic répétitif sans cache, avec le cache mémoire seul, puis avec le niveau disque"""
+    documents = load_collection()
+    index = WeightedInvertedIndex(integer_postings=True)
+    index.add_documents(documents)
+    topics = make_topics(documents, TOPIC_COUNT)
+    traffic = make_traffic(topics, TRAFFIC)
+
+    print("=" * 60)
+    print(f"CACHE DE RÉSULTATS : {index.doc_count} documents, {TRAFFIC} requêtes "
+          f"({len(set(traffic))} distinctes), {SCHEME} top {TOP_K}")
+    print("=" * 60)
+
+    # Empreinte de l'index (clé du cache) : calculée une fois par état de l'index
+    start = time.perf_counter()
+    index.content_fingerprint()
+    print(f"empreinte de l'index : {time.perf_counter() - start:.3f} s")
+
+    reference_time, expected = replay(RankedRetrieval(index, cache_dir=CACHE_DIR), traffic)
+    report("sans cache", reference_time, reference_time, expected, expected, None)
+
+    for budget in (64 << 20, 1 << 20, 256 << 10):
+        cache = ResultCache(memory_budget=budget)
+        elapsed, results = replay(RankedRetrieval(index, cache_dir=CACHE_DIR, result_cache=cache), traffic)
+        report(f"mémoire {budget >> 10} Ko", elapsed, reference_time, results, expected, cache)
+
+    # Cache partagé par deux index (de base et stemmé), requêtes alternées entre les deux
+    with contextlib.redirect_stdout(io.StringIO()):
+        stemmed = derive(index, stemmer=stem_word)
+    rankers = [RankedRetrieval(index, cache_dir=CACHE_DIR), RankedRetrieval(stemmed, cache_dir=CACHE_DIR)]
+    alternated_time, alternated_expected = replay_alternated(rankers, traffic)
+    cache = ResultCache(memory_budget=64 << 20)
+    rankers = [RankedRetrieval(other, cache_dir=CACHE_DIR, result_cache=cache) for other in (index, stemmed)]
+    elapsed, results = replay_alternated(rankers, traffic)
+    report("2 index alternés, partagé", elapsed, alternated_time, results, alternated_expected, cache)
+
+    disk_dir = tempfile.mkdtemp(prefix='result-cache-')
+    try:
+        cache = ResultCache(memory_budget=256 << 10, cache_dir=disk_dir)
+        elapsed, results = replay(RankedRetrieval(index, cache_dir=CACHE_DIR, result_cache=cache), traffic)
+        report("mémoire 256 Ko + disque", elapsed, reference_time, results, expected, cache)
+
+        # Redémarrage : nouveau cache (mémoire vide) sur le même dossier
+        cache = ResultCache(memory_budget=256 << 10, cache_dir=disk_dir)
+        ranker = RankedRetrieval(index, cache_dir=CACHE_DIR, result_cache=cache)
+        elapsed, results = replay(ranker, traffic)
+        report("après redémarrage", elapsed, reference_time, results, expected, cache)
+
+        # Index modifié : nouvelle empreinte, les entrées existantes ne sont plus relues
+        # et le ranker invalide celles de l'ancien état en mémoire
+        with contextlib.redirect_stdout(io.StringIO()):
+            index.add_documents([("CACHE-TEST", documents[0][1])])
+        index.content_fingerprint()
+        elapsed, results = replay(ranker, traffic)
+        _, expected = replay(RankedRetrieval(index, cache_dir=CACHE_DIR), traffic)
+        report("après ajout d'un document", elapsed, reference_time, results, expected, cache)
+    finally:
+        shutil.rmtree(disk_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
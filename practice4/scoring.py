@@ -0,0 +1,310 @@
+"""
+Évaluation term-at-a-time (TAAT) des requêtes.
+
+Au lieu de calculer le score de chaque document de la collection, on parcourt
+seulement les postings des termes de la requête, terme par terme, en ajoutant
+le poids de chaque posting dans un accumulateur (doc id entier -> score).
+Le coût dépend de la longueur des listes de postings, pas du nombre de documents.
+
+Les poids sont ajoutés dans l'ordre des termes de la requête, comme dans la
+boucle document par document : les scores obtenus sont identiques au bit près.
+"""
+
+import heapq
+from bisect import bisect_left
+
+
+def accumulate(weighted_postings):
+    """
+    weighted_postings : pour chaque terme de la requête, un itérable de couples
+    (doc id entier, poids). Renvoie l'accumulateur {doc id entier: score}.
+    """
+    accumulator = {}
+    get = accumulator.get
+    for postings in weighted_postings:
+        for doc_number, weight in postings:
+            accumulator[doc_number] = get(doc_number, 0.0) + weight
+    return accumulator
+
+
+def accumulate_batch(shared_postings, query_count):
+    """
+    Accumulateurs d'un lot de requêtes. shared_postings : pour chaque terme du lot,
+    dans l'ordre des termes de chaque requête, un couple (positions des requêtes qui
+    le contiennent, couples (doc id entier, poids)). Les postings d'un terme partagé
+    sont lus et pondérés une seule fois.
+    """
+    accumulators = [{} for _ in range(query_count)]
+    for positions, postings in shared_postings:
+        if len(positions) > 1:
+            postings = list(postings)
+        for position in positions:
+            accumulator = accumulators[position]
+            get = accumulator.get
+            for doc_number, weight in postings:
+                accumulator[doc_number] = get(doc_number, 0.0) + weight
+    return accumulators
+
+
+def select_top_k(accumulator, top_k):
+    """
+    Les top_k documents de score strictement positif, par score décroissant puis
+    doc id croissant (l'ordre de sorted(..., reverse=True) sur les documents pris
+    dans l'ordre d'ingestion). Tas borné à top_k éléments : O(n log k).
+    """
+    return heapq.nlargest(top_k,
+                          ((doc_number, score) for doc_number, score in accumulator.items() if score > 0),
+                          key=lambda item: (item[1], -item[0]))
+
+
+# Marges des comparaisons de bornes : une somme de bornes n'est pas calculée dans
+# le même ordre que le score exact et peut en différer de quelques ulps
+BOUND_MARGIN = 1e-9
+ABSOLUTE_MARGIN = 1e-12
+
+
+def _can_reach(bound, threshold):
+    """Un document de borne bound peut-il dépasser le seuil (avec marge de sécurité) ?"""
+    return bound + BOUND_MARGIN * (abs(bound) + abs(threshold)) + ABSOLUTE_MARGIN > threshold
+
+
+def _bound_can_enter(bound, threshold):
+    """
+    Variante de _can_reach pour une somme de bornes (toutes >= 0) : une somme nulle
+    ne donne jamais un score > 0 (termes dont tous les poids sont <= 0)
+    """
+    return bound > 0 and _can_reach(bound, threshold)
+
+
+def _push(heap, top_k, score, doc_number):
+    """Ajoute (score, doc) au tas du top-k ; renvoie le nouveau seuil (0 tant que le tas n'est pas plein)"""
+    if len(heap) < top_k:
+        heapq.heappush(heap, (score, -doc_number))
+    else:
+        heapq.heapreplace(heap, (score, -doc_number))
+    return heap[0][0] if len(heap) == top_k else 0.0
+
+
+def max_score_top_k(doc_ids, tfs, weighers, max_scores, top_k):
+    """
+    Évaluation document-at-a-time avec élagage dynamique MaxScore.
+
+    Pour chaque terme de la requête, dans l'ordre de la requête : doc_ids et tfs de
+    ses postings (tableaux triés par doc id), weighers sa fonction (doc id, tf) -> poids
+    et max_scores la borne supérieure (>= 0) de ses poids.
+
+    Les termes sont rangés par borne croissante ; les premiers, dont la somme des
+    bornes ne peut pas atteindre le seuil (score du k-ième document), sont « non
+    essentiels » : un document qui n'apparaît que dans leurs postings ne peut pas
+    entrer dans le top-k et n'est jamais visité. Les candidats viennent des termes
+    essentiels, les postings non essentiels sont seulement sondés par dichotomie,
+    et un candidat est abandonné dès que sa borne tombe sous le seuil.
+
+    Le score d'un document retenu est la somme de ses poids dans l'ordre de la
+    requête : le résultat est identique à select_top_k(accumulate(...), top_k).
+    Renvoie (top-k, compteurs).
+    """
+    if top_k <= 0:
+        return [], {'documents': 0, 'candidates': 0, 'documents_scored': 0, 'documents_skipped': 0,
+                    'postings_scored': 0}
+    term_count = len(doc_ids)
+    order = sorted(range(term_count), key=lambda term: max_scores[term])
+    bound_prefix = [0.0]  # bound_prefix[i] = somme des bornes des i termes de plus faible borne
+    for term in order:
+        bound_prefix.append(bound_prefix[-1] + max_scores[term])
+
+    lengths = [len(term_doc_ids) for term_doc_ids in doc_ids]
+    positions = [0] * term_count
+    heap = []  # (score, -doc id) : heap[0] est le moins bon du top-k
+    threshold = 0.0  # seuls les scores > 0 sont retenus
+    first_essential = 0  # order[first_essential:] sont les termes essentiels
+    while first_essential < term_count and not _bound_can_enter(bound_prefix[first_essential + 1], threshold):
+        first_essential += 1
+    candidates = scored = weighted = 0
+
+    while True:
+        # Prochain candidat : plus petit doc id courant parmi les termes essentiels
+        candidate = None
+        for i in range(first_essential, term_count):
+            term = order[i]
+            if positions[term] < lengths[term]:
+                doc_number = doc_ids[term][positions[term]]
+                if candidate is None or doc_number < candidate:
+                    candidate = doc_number
+        if candidate is None:
+            break
+        candidates += 1
+
+        # Poids exacts des termes essentiels, bornes des non essentiels
+        found = []
+        bound = bound_prefix[first_essential]
+        for i in range(first_essential, term_count):
+            term = order[i]
+            position = positions[term]
+            if position < lengths[term] and doc_ids[term][position] == candidate:
+                weight = weighers[term](candidate, tfs[term][position])
+                found.append((term, weight))
+                weighted += 1
+                bound += weight
+                positions[term] = position + 1
+        if not _can_reach(bound, threshold):
+            continue
+
+        # Sondage des non essentiels par borne décroissante, abandon dès que possible
+        competitive = True
+        for i in range(first_essential - 1, -1, -1):
+            term = order[i]
+            bound -= max_scores[term]
+            position = bisect_left(doc_ids[term], candidate, positions[term])
+            if position < lengths[term] and doc_ids[term][position] == candidate:
+                weight = weighers[term](candidate, tfs[term][position])
+                found.append((term, weight))
+                weighted += 1
+                bound += weight
+                position += 1
+            positions[term] = position
+            if not _can_reach(bound, threshold):
+                competitive = False
+                break
+        if not competitive:
+            continue
+
+        # Score exact, poids additionnés dans l'ordre de la requête
+        score = 0.0
+        for _, weight in sorted(found):
+            score += weight
+        scored += 1
+
+        # Un document plus loin dans la collection ne gagne pas une égalité de score
+        if score > threshold:
+            threshold = _push(heap, top_k, score, candidate)
+            if len(heap) == top_k:
+                while (first_essential < term_count
+                       and not _bound_can_enter(bound_prefix[first_essential + 1], threshold)):
+                    first_essential += 1
+
+    documents = len(set().union(*doc_ids))
+    stats = {
+        'documents': documents,  # documents contenant au moins un terme de la requête
+        'candidates': candidates,  # documents visités depuis les termes essentiels
+        'documents_scored': scored,  # documents dont le score complet a été calculé
+        'documents_skipped': documents - scored,
+        'postings_scored': weighted,  # postings dont le poids a été calculé
+    }
+    return [(-negative_doc, score) for score, negative_doc in sorted(heap, reverse=True)], stats
+
+
+def block_max_wand_top_k(doc_ids, tfs, weighers, max_scores, block_maxes, top_k):
+    """
+    Évaluation document-at-a-time block-max WAND (BMW).
+
+    Mêmes arguments que max_score_top_k, plus block_maxes : les postings.BlockMaxes
+    de chaque terme pour le même schéma de pondération.
+
+    Les curseurs des termes sont triés par doc id courant ; le pivot est le premier
+    document où la somme des bornes globales des termes déjà passés peut atteindre
+    le seuil (WAND). On vérifie ensuite la somme des bornes des blocs qui contiennent
+    le pivot : si elle ne l'atteint pas, aucun document jusqu'à la fin du plus court
+    de ces blocs ne peut entrer dans le top-k et tous leurs curseurs sautent après.
+    Sur les termes fréquents (« of », « in » sans stop words), les bornes globales
+    sont faibles mais ce sont les bornes par bloc qui permettent de sauter.
+
+    Le résultat est identique à select_top_k(accumulate(...), top_k).
+    Renvoie (top-k, compteurs).
+    """
+    if top_k <= 0:
+        return [], {'documents': 0, 'candidates': 0, 'documents_scored': 0, 'documents_skipped': 0,
+                    'postings_scored': 0, 'block_skips': 0}
+    lengths = [len(term_doc_ids) for term_doc_ids in doc_ids]
+    positions = [0] * len(doc_ids)
+    blocks = [0] * len(doc_ids)  # bloc courant de chaque terme
+    block_last_doc_ids = [term_blocks.last_doc_ids for term_blocks in block_maxes]
+    block_weights = [term_blocks.max_weights for term_blocks in block_maxes]
+    block_counts = [len(term_blocks) for term_blocks in block_maxes]
+    live = [term for term in range(len(doc_ids)) if lengths[term]]
+    heap = []  # (score, -doc id) : heap[0] est le moins bon du top-k
+    threshold = 0.0
+    candidates = scored = weighted = block_skips = 0
+
+    def current(term):
+        return doc_ids[term][positions[term]]
+
+    while live:
+        live.sort(key=current)
+
+        # Pivot : premier préfixe de termes dont les bornes globales peuvent atteindre le seuil
+        bound = 0.0
+        pivot = None
+        for i, term in enumerate(live):
+            bound += max_scores[term]
+            if _bound_can_enter(bound, threshold):
+                pivot = i
+                break
+        if pivot is None:
+            break
+        pivot_doc = current(live[pivot])
+        while pivot + 1 < len(live) and current(live[pivot + 1]) == pivot_doc:
+            pivot += 1
+        candidates += 1
+
+        # Bornes des blocs contenant le pivot (un terme déjà au-delà de son dernier bloc ne compte pas)
+        block_bound = 0.0
+        block_end = None  # plus petit dernier doc id de ces blocs
+        for term in live[:pivot + 1]:
+            block = blocks[term] = bisect_left(block_last_doc_ids[term], pivot_doc, blocks[term])
+            if block < block_counts[term]:
+                block_bound += block_weights[term][block]
+                last_doc = block_last_doc_ids[term][block]
+                if block_end is None or last_doc < block_end:
+                    block_end = last_doc
+
+        if not _bound_can_enter(block_bound, threshold):
+            # Aucun document de [pivot, block_end] ne peut entrer : saut après les blocs
+            block_skips += 1
+            target = block_end + 1
+            if pivot + 1 < len(live):
+                target = min(target, current(live[pivot + 1]))
+            for term in live[:pivot + 1]:
+                positions[term] = bisect_left(doc_ids[term], target, positions[term])
+        elif current(live[0]) == pivot_doc:
+            # Tous les termes du préfixe sont sur le pivot : la borne du bloc de chaque
+            # terme est remplacée par son poids, abandon dès qu'elle tombe sous le seuil
+            weights = {}
+            for term in live[:pivot + 1]:
+                weight = weighers[term](pivot_doc, tfs[term][positions[term]])
+                positions[term] += 1
+                weights[term] = weight
+                weighted += 1
+                if blocks[term] < block_counts[term]:
+                    block_bound += weight - block_weights[term][blocks[term]]
+                if not _can_reach(block_bound, threshold):
+                    break
+            else:
+                # Score exact, poids additionnés dans l'ordre de la requête
+                score = 0.0
+                for term in sorted(weights):
+                    score += weights[term]
+                scored += 1
+                # Un document plus loin dans la collection ne gagne pas une égalité de score
+                if score > threshold:
+                    threshold = _push(heap, top_k, score, pivot_doc)
+            for term in live[:pivot + 1]:
+                if term not in weights:
+                    positions[term] += 1
+        else:
+            # Les documents avant le pivot ne peuvent pas atteindre le seuil
+            for term in live[:pivot]:
+                positions[term] = bisect_left(doc_ids[term], pivot_doc, positions[term])
+
+        live = [term for term in live if positions[term] < lengths[term]]
+
+    documents = len(set().union(*doc_ids))
+    stats = {
+        'documents': documents,  # documents contenant au moins un terme de la requête
+        'candidates': candidates,  # pivots examinés
+        'documents_scored': scored,  # documents dont le score complet a été calculé
+        'documents_skipped': documents - scored,
+        'postings_scored': weighted,  # postings dont le poids a été calculé
+        'block_skips': block_skips,  # sauts déclenchés par les bornes des blocs
+    }
+    return [(-negative_doc, score) for score, negative_doc in sorted(heap, reverse=True)], stats
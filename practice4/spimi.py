@@ -0,0 +1,175 @@
+"""
+Indexation SPIMI (single-pass in-memory indexing) à mémoire bornée.
+
+Les documents sont inversés dans un dictionnaire en mémoire (un bloc) ; quand
+la taille estimée du bloc dépasse le budget, ses terms sont triés et le bloc
+est écrit dans un fichier de run, puis vidé. À la fin, les runs sont fusionnés
+(fusion k-voies sur les terms) directement dans le fichier d'index binaire de
+index_storage : les postings ne sont jamais tous en mémoire en même temps.
+
+Format d'un run : suite d'enregistrements triés par term
+    [longueur du term (uint32)][df (uint32)][term utf-8][df couples (doc id, tf) en uint32]
+Les doc ids d'un run sont tous supérieurs à ceux des runs précédents : pour un
+même term, concaténer les postings dans l'ordre des runs garde la liste triée.
+"""
+
+import heapq
+import math
+import os
+import shutil
+import struct
+import tempfile
+from array import array
+from itertools import groupby
+from operator import itemgetter
+
+from postings import CompressedPostingList, PostingList
+from index_storage import ContentFingerprint, write_sections
+
+
+RECORD = struct.Struct('<II')  # (longueur du term en octets, df)
+BUFFER_SIZE = 1 << 20
+
+# Estimation de la mémoire d'un bloc (mesurée sur les collections de practice2) :
+# un term coûte sa chaîne, sa PostingList vide et son entrée de dict,
+# un posting deux uint32 plus la marge de réallocation de l'array
+TERM_BYTES = 160
+POSTING_BYTES = 10
+
+
+def estimate_block_size(term_count, posting_count):
+    """Taille estimée en octets d'un bloc de term_count terms et posting_count postings"""
+    return term_count * TERM_BYTES + posting_count * POSTING_BYTES
+
+
+def write_run(block, path):
+    """Écrit un bloc (term -> PostingList) trié par term dans un fichier de run"""
+    with open(path, 'wb', buffering=BUFFER_SIZE) as file:
+        for term in sorted(block):
+            postings = block[term]
+            encoded = term.encode('utf-8')
+            file.write(RECORD.pack(len(encoded), postings.document_frequency()))
+            file.write(encoded)
+            postings.tofile(file)
+
+
+def read_run(path, buffer_size=BUFFER_SIZE):
+    """Relit un run en flux : générateur de couples (term, PostingList)"""
+    with open(path, 'rb', buffering=buffer_size) as file:
+        while True:
+            record = file.read(RECORD.size)
+            if not record:
+                return
+            length, df = RECORD.unpack(record)
+            term = file.read(length).decode('utf-8')
+            postings = PostingList()
+            postings.fromfile(file, 2 * df)
+            yield term, postings
+
+
+def merge_runs(paths):
+    """
+    Fusion k-voies des runs : générateur de couples (term, PostingList) dans
+    l'ordre des terms. heapq.merge est stable : à term égal les runs sortent
+    dans leur ordre, donc les postings restent triés par doc id.
+    Les tampons de lecture se partagent BUFFER_SIZE octets.
+    """
+    buffer_size = max(1 << 14, BUFFER_SIZE // max(1, len(paths)))
+    runs = [read_run(path, buffer_size) for path in paths]
+    for term, group in groupby(heapq.merge(*runs, key=itemgetter(0)), key=itemgetter(0)):
+        postings = PostingList()
+        for _, run_postings in group:
+            postings.extend(run_postings)
+        yield term, postings
+
+
+def write_merged_index(index, run_paths, path, encoding=None):
+    """
+    Fusionne les runs dans le fichier d'index path. Seul le vocabulaire (terms,
+    dfs, offsets) est gardé en mémoire ; les postings passent par deux fichiers
+    temporaires recopiés ensuite dans leurs sections.
+    Chaque term fusionné a son df final : si l'index suit les normes cosinus, leurs
+    sommes de carrés sont accumulées pendant la fusion et les normes écrites dans le
+    fichier. Renvoie ces normes (array('f')), ou None.
+    """
+    tracking_norms = index.tracks_cosine_norms()
+    doc_count = len(index.doc_ids)
+    log_n = math.log10(doc_count) if doc_count > 0 else 0.0
+    sums_of_squares = array('d', bytes(8 * doc_count)) if tracking_norms else None
+    fingerprint = ContentFingerprint(index.doc_ids, index.get_doc_length_array())
+    terms = []
+    dfs = array('I')
+    offsets = array('Q', [0])
+    with tempfile.TemporaryFile() as doc_ids_file, tempfile.TemporaryFile() as tfs_file:
+        written = 0
+        for term, postings in merge_runs(run_paths):
+            terms.append(term)
+            dfs.append(postings.document_frequency())
+            doc_numbers, tfs = postings.doc_ids(), postings.tfs()
+            fingerprint.add_term(term, doc_numbers, tfs)
+            if tracking_norms:
+                w_idf = log_n - math.log10(postings.document_frequency())
+                for doc_number, tf in zip(doc_numbers, tfs):
+                    sums_of_squares[doc_number] += ((1.0 + math.log10(tf)) * w_idf) ** 2
+            if encoding is None:
+                doc_numbers.tofile(doc_ids_file)
+                tfs.tofile(tfs_file)
+                written += postings.document_frequency()
+            else:
+                data = CompressedPostingList.from_postings(postings, encoding).data
+                doc_ids_file.write(data)
+                written += len(data)
+            offsets.append(written)
+        doc_ids_file.flush()
+        tfs_file.flush()
+        norms = None
+        if tracking_norms:
+            norms = array('f', (math.sqrt(total) if total > 1e-12 else 1.0 for total in sums_of_squares))
+        write_sections(index, path, terms, dfs, offsets, doc_ids_file, tfs_file, encoding,
+                       norms, fingerprint.hexdigest())
+    return norms
+
+
+class SpimiBuilder:
+    """
+    Construit l'index d'un WeightedInvertedIndex (vide, en mode entier) bloc par bloc.
+    Les statistiques, doc ids et doc_lengths restent dans l'index ; seul son
+    dictionnaire est vidé dans un run à chaque dépassement du budget.
+    """
+
+    def __init__(self, index, memory_budget, run_dir=None):
+        self.index = index
+        self.memory_budget = memory_budget
+        self.run_dir = tempfile.mkdtemp(prefix='spimi-', dir=run_dir)
+        self.run_paths = []
+        self.block_postings = 0
+
+    def add_documents(self, documents):
+        """Inverse les documents, en vidant le bloc dans un run dès que le budget est atteint"""
+        for doc_id, doc_text in documents:
+            term_freq = self.index.add_document(doc_id, doc_text)
+            self.block_postings += len(term_freq)
+            if estimate_block_size(len(self.index.dictionary), self.block_postings) >= self.memory_budget:
+                self.flush()
+
+    def flush(self):
+        """Écrit le bloc courant dans un nouveau run et le vide"""
+        if not self.index.dictionary:
+            return
+        path = os.path.join(self.run_dir, f"run{len(self.run_paths):05d}.bin")
+        write_run(self.index.dictionary, path)
+        self.run_paths.append(path)
+        self.index.dictionary.clear()
+        self.block_postings = 0
+
+    def finish(self, path, encoding=None):
+        """
+        Vide le dernier bloc, fusionne les runs dans le fichier path et supprime les runs.
+        Renvoie le nombre de runs et les normes cosinus calculées à la fusion (ou None).
+        """
+        self.flush()
+        try:
+            norms = write_merged_index(self.index, self.run_paths, path, encoding)
+        finally:
+            shutil.rmtree(self.run_dir, ignore_errors=True)
+        return len(self.run_paths), norms
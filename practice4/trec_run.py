@@ -0,0 +1,33 @@
+"""
+Fichiers run au format TREC (un par série de requêtes) :
+    <query id> Q0 <docno> <rang> <score> AlphaAnaClement /article[1]
+nommés AlphaAnaClement_<run id>_test_<schéma>_article_<stop words>_<stemming>[_k<k1>_b<b>].txt
+"""
+
+import os
+
+
+RUN_TAG = "AlphaAnaClement"
+
+
+def next_run_id(run_dir="runs"):
+    """Identifiant du prochain run : nombre de fichiers déjà dans run_dir"""
+    return len([f for f in os.listdir(run_dir) if os.path.isfile(os.path.join(run_dir, f))])
+
+
+def run_file_name(index, weighting_scheme, run_id, k1=1.2, b=0.75):
+    """Nom du fichier run d'une série (les paramètres bm25 font partie du nom)"""
+    file_name = f"{RUN_TAG}_{run_id}_test_{weighting_scheme}_article"
+    file_name += "_stop671" if index.stop_word_active else "_nostop"
+    file_name += "_porter" if index.stemmer_active else "_nostem"
+    if weighting_scheme == "bm25":
+        file_name += f"_k{k1}_b{b}"
+    return file_name + ".txt"
+
+
+def write_run(path, results, mode="w"):
+    """Écrit (ou ajoute, mode="a") les résultats [(query id, [(docno, score), ...]), ...]"""
+    with open(path, mode, encoding="utf-8") as f:
+        for query_id, top_docs in results:
+            for i, (doc_id, score) in enumerate(top_docs, 1):
+                f.write(f"{query_id} Q0 {doc_id} {i} {score} {RUN_TAG} /article[1]\n")
@@ -0,0 +1,64 @@
+"""
+Tables de poids précalculées pour un état de l'index.
+
+Les pondérations ltn, ltc et bm25 recalculaient à chaque posting log10(N/df),
+1 + log10(tf) et la normalisation de longueur bm25 k1 (1 - b + b dl/avgdl).
+Ces facteurs ne dépendent que de l'index (et de (k1, b)) : ils sont calculés une
+fois, avec les mêmes expressions, donc les poids restent identiques au bit près.
+    - idf ltn et idf bm25 : un dict term -> idf par schéma
+    - log-tf : table des 1 + log10(tf) pour tf < LOG_TF_SIZE (les tfs plus grands,
+      rares, sont calculés à la volée)
+    - normalisation de longueur : un array('d') par doc id entier et par (k1, b)
+"""
+
+import math
+import sys
+from array import array
+
+
+LOG_TF_SIZE = 256
+
+
+class WeightTables:
+    """Facteurs des poids d'un index : construits par le ranker, jetés quand l'index change"""
+
+    def __init__(self, doc_count, avg_dl, dfs, doc_lengths):
+        self.doc_count = doc_count
+        self.avg_dl = avg_dl
+        self.doc_lengths = doc_lengths
+        self.log_tf = [0.0] + [1.0 + math.log10(tf) for tf in range(1, LOG_TF_SIZE)]
+        self.ltn_idf = {term: math.log10(doc_count / df) if df > 0 and doc_count > df else 0.0
+                        for term, df in dfs.items()}
+        self.bm25_idf = {term: math.log10((doc_count - df + 0.5) / (df + 0.5)) for term, df in dfs.items()}
+        self._length_norms = {}  # (k1, b) -> array('d') par doc id entier
+
+    def log_tf_weight(self, tf):
+        """1 + log10(tf), lu dans la table pour les petits tfs"""
+        return self.log_tf[tf] if tf < LOG_TF_SIZE else 1.0 + math.log10(tf)
+
+    def length_norms(self, k1=1.2, b=0.75):
+        """k1 (1 - b + b dl / avgdl) de chaque document, calculé une fois par (k1, b)"""
+        key = (k1, b)
+        if key not in self._length_norms:
+            avg_dl = self.avg_dl
+            self._length_norms[key] = array('d', (k1 * (1 - b + b * (doc_length / avg_dl))
+                                                  for doc_length in self.doc_lengths))
+        return self._length_norms[key]
+
+    def discard_length_norms(self, k1, b):
+        """Libère la normalisation de longueur d'un (k1, b) (balayage de paramètres)"""
+        self._length_norms.pop((k1, b), None)
+
+    def memory_usage(self):
+        """Octets occupés par chaque table (les chaînes des terms appartiennent à l'index)"""
+        def dict_size(idf):
+            return sys.getsizeof(idf) + sum(sys.getsizeof(value) for value in idf.values())
+
+        usage = {
+            'log_tf': sys.getsizeof(self.log_tf) + sum(sys.getsizeof(value) for value in self.log_tf),
+            'ltn_idf': dict_size(self.ltn_idf),
+            'bm25_idf': dict_size(self.bm25_idf),
+            'length_norms': sum(norms.itemsize * len(norms) for norms in self._length_norms.values()),
+        }
+        usage['total'] = sum(usage.values())
+        return usage